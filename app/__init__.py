@@ -1,23 +1,54 @@
 from flask import Flask,redirect,url_for
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_restx import abort
 from app.libs import *
 # DB MODELS
 from app.models import *
 # API BP
 from .apis import api_bp
+# LOGS
+from .common.logs import logs_writer
+# CACHE USUARIOS
+from .common.usuarios import usuarios_cache
+# SEGURIDAD
+from .common.seguridad import password_pool, login_throttle
+# METRICAS
+from .common.metricas import metricas
+# CLI
+from .commands import planillas_cli, clientes_cli, facturacion_cli, configuracion_cli, indices_cli, logs_cli, notificaciones_cli, pagos_cli
 
 
 def create_app(settings_module):
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_object(settings_module)
 
+    # N° de proxies de confianza que agregan X-Forwarded-For (0 sin proxy)
+    proxies = app.config.get('PROXY_FIX_X_FOR', 0)
+    if proxies > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
+
     # Libraries initialization
     db.init_app(app)
     login_manager.init_app(app)
+    logs_writer.init_app(app)
+    usuarios_cache.init_app(app)
+    password_pool.init_app(app)
+    login_throttle.init_app(app)
+    metricas.init_app(app)
 
     # API initialize
     app.register_blueprint(api_bp)
 
+    # CLI commands
+    app.cli.add_command(planillas_cli)
+    app.cli.add_command(clientes_cli)
+    app.cli.add_command(facturacion_cli)
+    app.cli.add_command(configuracion_cli)
+    app.cli.add_command(indices_cli)
+    app.cli.add_command(logs_cli)
+    app.cli.add_command(notificaciones_cli)
+    app.cli.add_command(pagos_cli)
+
     # MAIN ROUTE REDIRECTION
     @app.route('/')
     def main_redirect():
@@ -11,9 +11,16 @@ from .planillas import api as api_planillas_ns
 from .configuracion import api as api_config_ns
 from .pagos_conexion import api as api_pagos_conexion_ns
 from .notificaciones import api as api_notificaciones_ns
+from .facturacion import api as api_facturacion_ns
+from .metricas import api as api_metricas_ns
+from app.common.metricas import metricas
+from app.common.usuarios import verificar_scopes
 
 
 api_bp = Blueprint('api_bp', __name__, url_prefix='/api')
+api_bp.before_request(metricas.before_request)
+api_bp.after_request(metricas.after_request)
+api_bp.before_request(verificar_scopes)
 
 api.version = '1.0'
 api.title = 'API DOCS'
@@ -34,3 +41,5 @@ api.add_namespace(api_planillas_ns, path='/planillas')
 api.add_namespace(api_config_ns, path='/configuracion')
 api.add_namespace(api_pagos_conexion_ns, path='/pagos')
 api.add_namespace(api_notificaciones_ns, path='/notificaciones')
+api.add_namespace(api_facturacion_ns, path='/facturacion')
+api.add_namespace(api_metricas_ns, path='/metrics')
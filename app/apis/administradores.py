@@ -2,6 +2,7 @@ from flask_restx import Namespace,Resource,fields,abort
 from flask_login import login_required, current_user
 from app.libs import db
 from app.models import Usuarios
+from app.common.usuarios import usuarios_cache
 from app.common.api_utils import (
     error_message,
     success_message,
@@ -23,7 +24,7 @@ class GetAdminAll(Resource):
         Lista de administradores del sistema
         """
         try:
-            admins = db.session.query(Usuarios).filter(Usuarios.id != 1).all()
+            admins = db.session.query(Usuarios.id, Usuarios.username).filter(Usuarios.id != 1).all()
             results = []
             for item in admins:
                 results.append({
@@ -37,6 +38,34 @@ class GetAdminAll(Resource):
             abort(code=400, error='No fue posible obtener los registros')
 
 
+@api.route('/get/cache')
+class GetCacheUsuarios(Resource):
+    cache = api.model('CacheUsuarios', {
+        'hits': fields.Integer(readonly=True, title='Aciertos', description='N° de usuarios obtenidos desde la cache'),
+        'misses': fields.Integer(readonly=True, title='Fallos', description='N° de usuarios consultados en la DB'),
+        'hit_rate': fields.Float(readonly=True, title='Tasa de aciertos'),
+        'size': fields.Integer(readonly=True, title='Usuarios en cache'),
+        'max_size': fields.Integer(readonly=True, title='Tamaño maximo de la cache'),
+        'ttl': fields.Integer(readonly=True, title='Tiempo de vida en segundos')
+    })
+
+    estado_cache = api.model('EstadoCacheUsuarios', {
+        'success': fields.Nested(cache)
+    })
+
+    @api.response(200, 'OK', estado_cache)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def get(self):
+        """
+        Estado de la cache de usuarios autenticados del proceso actual
+        """
+        try:
+            return {'success':usuarios_cache.get_stats()},200
+        except Exception:
+            abort(code=400, error='No fue posible obtener el estado de la cache')
+
+
 # -------------------------------------- POST -----------------------------------------
 @api.route('/new')
 class NewAdmin(Resource):
@@ -123,6 +152,7 @@ class ResetPassword(Resource):
                 raise Exception('No existe el usuario')
             user.password = user.hash_password(new_password)
             db.session.commit()
+            usuarios_cache.invalidate(id_user)
             return {'success': 'Contraseña restablecida'}
         except Exception as e:
             db.session.rollback()
@@ -148,6 +178,7 @@ class DeleteAdmin(Resource):
                 raise Exception('Usuario no encontrado')
             db.session.delete(admin)
             db.session.commit()
+            usuarios_cache.invalidate(id_admin)
             return {'success': 'Usuario eliminado'}
         except Exception as e:
             db.session.rollback()
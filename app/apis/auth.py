@@ -1,7 +1,11 @@
+from flask import request, current_app
 from flask_restx import Namespace,Resource,fields,abort
 from flask_login import login_user,login_required,logout_user
 from app.libs import db
-from app.models import Usuarios,Logs
+from app.models import Usuarios
+from app.common.logs import LogsServices
+from app.common.seguridad import login_throttle, LimiteExcedido
+from app.common.usuarios import UsuarioSesion, generar_token, get_sello, API_SCOPES
 from app.common.enums import logsCategories
 
 
@@ -30,6 +34,7 @@ class SignIn(Resource):
     @api.expect(signIn_model)
     @api.response(200, 'OK', success_message)
     @api.response(400, 'Bad Request', error_message)
+    @api.response(429, 'Too Many Requests', error_message)
     def post(self):
         """
         Inicio de sesión con credenciales del usuario
@@ -40,24 +45,83 @@ class SignIn(Resource):
             data = api.payload
             username = data['username']
             password = data['password']
+            ip = request.remote_addr or ''
+            login_throttle.verificar(username, ip)
             user = Usuarios.query.filter_by(username=username).first()
-            if user is None: raise Exception("Usuario o contraseña incorrecta")
-            if not user.check_password(user.password,password):
+            if user is None or not user.check_password(user.password,password):
+                login_throttle.registrar_fallo(username, ip)
                 raise Exception("Usuario o contraseña incorrecta")
             login_user(user)
-            new_log = Logs()
-            new_log.id_usuario = user.id
-            new_log.categoria = logsCategories.login
-            db.session.add(new_log)
-            db.session.commit()
+            LogsServices(db.session).new_log(logsCategories.login, user.id)
             return {
                 'success':'Inicio de sesión exitoso'
             },200
+        except LimiteExcedido as e:
+            db.session.rollback()
+            abort(429, error='No se pudo iniciar la sesión: '+str(e))
         except Exception as e:
             db.session.rollback()
             abort(400, error='No se pudo iniciar la sesión: '+str(e))
 
 
+@api.route('/token')
+class Token(Resource):
+    token_model = api.model('Solicitud de token',{
+        'username':fields.String(required=True, description='Nombre del usuario'),
+        'password':fields.String(required=True, description='Contraseña de la cuenta del usuario'),
+        'scopes':fields.List(
+            fields.String(enum=list(API_SCOPES)),
+            required=False,
+            description='Permisos del token: lectura (GET), escritura (POST, PUT, DELETE) y administracion (/admin). Por defecto lectura'
+        )
+    })
+
+    token_response = api.model('Token Response',{
+        'token':fields.String(readonly=True, description='Token firmado. Enviar en el header Authorization: Bearer <token>'),
+        'expira_en':fields.Integer(readonly=True, description='Segundos de vigencia del token')
+    })
+
+    @api.expect(token_model)
+    @api.response(200, 'OK', token_response)
+    @api.response(400, 'Bad Request', error_message)
+    @api.response(429, 'Too Many Requests', error_message)
+    def post(self):
+        """
+        Obtener un token de acceso para dispositivos e integraciones
+
+        Emite un token firmado de corta duración con el id del usuario y sus permisos.
+        Los endpoints que requieren sesión aceptan el token en el header Authorization
+        sin necesidad de la cookie de sesión, según sus permisos (403 si no los tiene).
+        El token deja de ser válido si el usuario se elimina o cambia su contraseña.
+        """
+        try:
+            data = api.payload
+            username = data['username']
+            password = data['password']
+            scopes = sorted(set(data.get('scopes') or ['lectura']))
+            invalidos = [item for item in scopes if item not in API_SCOPES]
+            if len(invalidos) > 0:
+                raise Exception('Permisos no validos: ' + ', '.join(invalidos))
+            ip = request.remote_addr or ''
+            login_throttle.verificar(username, ip)
+            user = Usuarios.query.filter_by(username=username).first()
+            if user is None or not user.check_password(user.password,password):
+                login_throttle.registrar_fallo(username, ip)
+                raise Exception("Usuario o contraseña incorrecta")
+            token = generar_token(UsuarioSesion(user.id, user.username, sello=get_sello(user.password)), scopes)
+            LogsServices(db.session).new_log(logsCategories.login, user.id, 'Token de API')
+            return {
+                'token':token,
+                'expira_en':current_app.config['API_TOKEN_TTL']
+            },200
+        except LimiteExcedido as e:
+            db.session.rollback()
+            abort(429, error='No se pudo emitir el token: '+str(e))
+        except Exception as e:
+            db.session.rollback()
+            abort(400, error='No se pudo emitir el token: '+str(e))
+
+
 @api.route('/logout')
 class Logout(Resource):
     @api.response(200, 'OK', success_message)
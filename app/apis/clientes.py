@@ -1,4 +1,4 @@
-from flask_restx import Namespace,Resource,fields,abort
+from flask_restx import Namespace,Resource,fields,abort,inputs
 from flask_login import login_required,current_user
 from app.libs import db
 from app.common.api_utils import (
@@ -6,11 +6,15 @@ from app.common.api_utils import (
     error_message,
     item_cliente,
     nullable,
-    is_not_null_empty
+    is_not_null_empty,
+    stream_success
 )
 from app.common.logs import LogsServices
+from app.common.cobros import ResumenCobrosServices
+from app.common.clientes import ClientesServices
 from app.common.enums import logsCategories
 from app.models import Clientes
+from datetime import datetime
 
 
 api = Namespace('Clientes', description='Endpoints para la gestion de clientes')
@@ -33,7 +37,48 @@ class GetClientes(Resource):
         Obtiene la lista de todos los clientes registrados.
         """
         try:
-            clientes = Clientes.query.all()
+            clientes = db.session.query(
+                Clientes.id,
+                Clientes.cedula,
+                Clientes.nombres,
+                Clientes.apellidos,
+                Clientes.telefono
+            ).order_by(Clientes.id)
+            return stream_success(clientes, lambda item: {
+                'id':item.id,
+                'cedula':item.cedula,
+                'nombres':item.nombres,
+                'apellidos':item.apellidos,
+                'telefono':item.telefono
+            })
+        except Exception:
+            abort(400, eror='No se pudo obtener los registros')
+
+
+@api.route('/buscar')
+class BuscarClientes(Resource):
+    resultados_busqueda = api.model('Busqueda clientes', {
+        'success':fields.List(fields.Nested(item_cliente))
+    })
+
+    filtros = api.parser()
+    filtros.add_argument('q', type=str, location='args', required=True, help='Inicio de la cedula, nombres o apellidos')
+    filtros.add_argument('limite', type=inputs.int_range(1, 100), location='args', default=20, help='N° maximo de resultados')
+
+    @api.expect(filtros)
+    @api.response(200, 'OK', resultados_busqueda)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def get(self):
+        """
+        Buscar clientes
+
+        Busca los clientes cuya cédula, nombres o apellidos empiecen por el texto buscado,
+        sin distinguir mayúsculas ni tildes. Los resultados se ordenan por coincidencia.
+        """
+        try:
+            args = self.filtros.parse_args()
+            clientes = ClientesServices(db.session).buscar(args['q'], args['limite'])
             results = []
             for item in clientes:
                 results.append({
@@ -46,8 +91,8 @@ class GetClientes(Resource):
             return {
                 'success':results
             },200
-        except Exception:
-            abort(400, eror='No se pudo obtener los registros')
+        except Exception as e:
+            abort(400, error='No fue posible buscar los clientes: ' + str(e))
 
 
 @api.route('/get/<int:id_cliente>')
@@ -66,7 +111,15 @@ class GetCliente(Resource):
         Obtener los datos e información acerca del cliente
         """
         try:
-            cliente = Clientes.query.get(id_cliente)
+            cliente = db.session.query(
+                Clientes.id,
+                Clientes.cedula,
+                Clientes.nombres,
+                Clientes.apellidos,
+                Clientes.telefono
+            ).filter(
+                Clientes.id == id_cliente
+            ).first()
             if cliente is None: raise Exception('No se encontro al cliente')
             return {
                 'success':{
@@ -81,6 +134,137 @@ class GetCliente(Resource):
             abort(400, error='No fue posible obtener la información del cliente: ' + str(e))
 
 
+@api.route('/get/estado/<int:id_cliente>')
+class GetEstadoCuentaCliente(Resource):
+    planilla_pendiente = api.model('Planilla pendiente', {
+        'id':fields.Integer(readonly=True, title='Id de planilla'),
+        'fecha_emision':fields.String(readonly=True, title='Fecha de emisión', example='dd/mm/yyyy'),
+        'lectura_anterior':fields.Integer(readonly=True, title='Lectura anterior'),
+        'lectura_actual':fields.Integer(readonly=True, title='Lectura actual'),
+        'consumo_total':fields.Integer(readonly=True, title='Consumo total en m³'),
+        'valor_consumo_total':fields.Float(readonly=True, title='Valor de consumo total')
+    })
+
+    notificacion_pendiente = api.model('Notificacion pendiente', {
+        'id':fields.Integer(readonly=True, title='Id de notificacion'),
+        'fecha_emision':fields.String(readonly=True, title='Fecha de emisión', example='dd/mm/yyyy'),
+        'total':fields.Float(readonly=True, title='Total en $')
+    })
+
+    saldo_financiamiento = api.model('Saldo financiamiento', {
+        'total_pagar':fields.Float(readonly=True, title='Total a pagar'),
+        'entrada':fields.Float(readonly=True, title='Entrada pagada'),
+        'total_cuotas':fields.Float(readonly=True, title='Total pagado en cuotas'),
+        'restante_pagar':fields.Float(readonly=True, title='Valor restante por cobrar')
+    })
+
+    servicio_estado_cuenta = api.model('Servicio estado de cuenta', {
+        'id':fields.Integer(readonly=True, title='ID'),
+        'n_conexion':fields.Integer(readonly=True, title='Numero de conexion'),
+        'n_medidor':fields.Integer(readonly=True, title='Numero de medidor'),
+        'direccion':fields.String(readonly=True, title='Direccion del servicio'),
+        'estado':fields.Boolean(readonly=True, title='Estado de servicio'),
+        'lectura_anterior':fields.Integer(readonly=True, title='Lectura anterior medidor'),
+        'planillas':fields.List(fields.Nested(planilla_pendiente), title='Planillas sin pagar'),
+        'notificaciones':fields.List(fields.Nested(notificacion_pendiente), title='Notificaciones pendientes'),
+        'financiamiento':fields.Nested(saldo_financiamiento, allow_null=True, title='Saldo del financiamiento de conexion'),
+        'total_planillas':fields.Float(readonly=True, title='Total adeudado en planillas'),
+        'total_notificaciones':fields.Float(readonly=True, title='Total adeudado en notificaciones'),
+        'total_pagar':fields.Float(readonly=True, title='Total adeudado por el servicio')
+    })
+
+    estado_cuenta = api.model('Estado de cuenta', {
+        'cliente':fields.Nested(item_cliente),
+        'servicios':fields.List(fields.Nested(servicio_estado_cuenta)),
+        'total_planillas':fields.Float(readonly=True, title='Total adeudado en planillas'),
+        'total_notificaciones':fields.Float(readonly=True, title='Total adeudado en notificaciones'),
+        'total_financiamiento':fields.Float(readonly=True, title='Saldo total de financiamientos'),
+        'total_pagar':fields.Float(readonly=True, title='Total adeudado por el cliente')
+    })
+
+    info_estado_cuenta = api.model('Información estado de cuenta', {
+        'success':fields.Nested(estado_cuenta)
+    })
+
+    @api.response(200, 'OK', info_estado_cuenta)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def get(self, id_cliente):
+        """
+        Estado de cuenta del cliente
+
+        Obtiene el cliente, sus servicios, planillas sin pagar, notificaciones pendientes
+        y saldo de financiamiento de conexion junto a los totales adeudados.
+        """
+        try:
+            cliente, servicios, planillas, notificaciones = ClientesServices(db.session).get_estado_cuenta(id_cliente)
+            results = {}
+            for item in servicios:
+                financiamiento = None
+                restante_financiamiento = 0
+                if item.financiamientos > 0:
+                    restante_financiamiento = item.total_financiamiento - item.entrada_financiamiento - item.cuotas_financiamiento
+                    financiamiento = {
+                        'total_pagar':item.total_financiamiento,
+                        'entrada':item.entrada_financiamiento,
+                        'total_cuotas':item.cuotas_financiamiento,
+                        'restante_pagar':restante_financiamiento
+                    }
+                results[item.id] = {
+                    'id':item.id,
+                    'n_conexion':item.n_conexion,
+                    'n_medidor':item.n_medidor,
+                    'direccion':item.direccion,
+                    'estado':item.estado,
+                    'lectura_anterior':item.lectura_anterior,
+                    'planillas':[],
+                    'notificaciones':[],
+                    'financiamiento':financiamiento,
+                    'total_planillas':item.deuda_planillas,
+                    'total_notificaciones':item.deuda_notificaciones,
+                    'total_pagar':item.deuda_planillas + item.deuda_notificaciones + restante_financiamiento
+                }
+            for item in planillas:
+                results[item.id_servicio]['planillas'].append({
+                    'id':item.id,
+                    'fecha_emision':datetime.strftime(item.fecha_emision, '%d/%m/%Y'),
+                    'lectura_anterior':item.lectura_anterior,
+                    'lectura_actual':item.lectura_actual,
+                    'consumo_total':item.consumo_total,
+                    'valor_consumo_total':item.valor_consumo_total
+                })
+            for item in notificaciones:
+                results[item.id_servicio]['notificaciones'].append({
+                    'id':item.id,
+                    'fecha_emision':datetime.strftime(item.fecha_emision, '%d/%m/%Y'),
+                    'total':item.total
+                })
+            total_planillas = sum(item.deuda_planillas for item in servicios)
+            total_notificaciones = sum(item.deuda_notificaciones for item in servicios)
+            total_financiamiento = sum(
+                item['financiamiento']['restante_pagar'] for item in results.values()
+                if item['financiamiento'] is not None
+            )
+            return {
+                'success':{
+                    'cliente':{
+                        'id':cliente.id,
+                        'cedula':cliente.cedula,
+                        'nombres':cliente.nombres,
+                        'apellidos':cliente.apellidos,
+                        'telefono':cliente.telefono
+                    },
+                    'servicios':list(results.values()),
+                    'total_planillas':total_planillas,
+                    'total_notificaciones':total_notificaciones,
+                    'total_financiamiento':total_financiamiento,
+                    'total_pagar':total_planillas + total_notificaciones + total_financiamiento
+                }
+            },200
+        except Exception as e:
+            abort(400, error='No fue posible obtener el estado de cuenta: ' + str(e))
+
+
 # ----------------------------------------- POST -----------------------------------
 @api.route('/new')
 class NewCliente(Resource):
@@ -233,6 +417,7 @@ class DeleteCliente(Resource):
         try:
             cliente = Clientes.query.get(id_cliente)
             if cliente is None: raise Exception('No se encontro al cliente')
+            ResumenCobrosServices(db.session).quitar_cliente(cliente.id)
             db.session.delete(cliente)
             db.session.commit()
             LogsServices(db.session).new_log(logsCategories.cliente_deleted, current_user.id)
@@ -1,8 +1,8 @@
 from flask_restx import Namespace,Resource,fields,abort
 from flask_login import login_required
-from sqlalchemy import extract
 from app.models import Configuracion,Planillas
 from app.libs import db
+from app.common.configuracion import configuracion_cache
 from app.common.api_utils import (
     success_message,
     error_message,
@@ -59,7 +59,7 @@ class GetDefault(Resource):
         Devuelve los valores por defecto de la configuración
         """
         try:
-            configuracion = Configuracion.query.first()
+            configuracion = configuracion_cache.get_configuracion()
             if configuracion is None:
                 raise Exception('No existen valores predeterminados')
             return {
@@ -75,6 +75,46 @@ class GetDefault(Resource):
             abort(400, error='No fue posible obtener la configuracion: ' + str(e))
 
 
+@api.route('/get/cache')
+class GetCacheConfiguracion(Resource):
+    cache = api.model('Cache configuracion', {
+        'hits':fields.Integer(
+            readonly = True,
+            title = 'Aciertos',
+            description = 'N° de consultas de la configuracion resueltas desde la cache'
+        ),
+        'misses':fields.Integer(
+            readonly = True,
+            title = 'Fallos',
+            description = 'N° de consultas de la configuracion que se cargaron desde la DB'
+        ),
+        'version':nullable(
+            fields.Integer,
+            readonly = True,
+            title = 'Version',
+            description = 'Version de la configuracion en cache'
+        )
+    })
+
+    estado_cache = api.model('Estado cache configuracion', {
+        'success':fields.Nested(cache)
+    })
+
+    @api.response(200, 'OK', estado_cache)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def get(self):
+        """
+        Obtener estado de la cache de configuracion
+
+        Devuelve los aciertos y fallos de la cache de configuracion del proceso actual
+        """
+        try:
+            return {'success':configuracion_cache.get_stats()},200
+        except Exception:
+            abort(400, error='No fue posible obtener el estado de la cache')
+
+
 # ----------------------------------------- UPDATE ------------------------------------
 @api.route('/update/default')
 class UpdateConfiguracion(Resource):
@@ -148,14 +188,14 @@ class UpdateConfiguracion(Resource):
                 new_configuracion.exedente = exedente
                 new_configuracion.valor_consumo_base = valor_consumo_base
                 new_configuracion.valor_exedente = valor_exedente
+                new_configuracion.version = 1
                 db.session.add(new_configuracion)
             else:
                 fecha_actual = datetime.now()
-                planillas = Planillas.query.filter(
-                    extract('month', Planillas.fecha_emision) == fecha_actual.month,
-                    extract('year', Planillas.fecha_emision) == fecha_actual.year
-                ).all()
-                if len(planillas) > 0:
+                planilla = Planillas.query.filter(
+                    Planillas.periodo == Planillas.get_periodo(fecha_actual)
+                ).first()
+                if planilla is not None:
                     raise Exception('Existen planillas de este mes emitidas con esta configuracion')
                 if consumo_base is not None:
                     configuracion.consumo_base = consumo_base
@@ -167,7 +207,9 @@ class UpdateConfiguracion(Resource):
                     configuracion.valor_exedente = valor_exedente
                 if reconexion is not None:
                     configuracion.valor_exedente = valor_exedente
+                configuracion.version = configuracion.version + 1
             db.session.commit()
+            configuracion_cache.invalidate()
             return {
                 'success':'Configuracion cambiada'
             },200
@@ -0,0 +1,150 @@
+from flask import current_app
+from flask_restx import Namespace,Resource,fields,abort
+from flask_login import login_required, current_user
+from app.libs import db
+from app.common.api_utils import (
+    success_message,
+    error_message,
+    nullable
+)
+from app.common.facturacion import FacturacionServices, ejecutar_job
+
+
+api = Namespace('Facturación', description='Endpoints para la facturación mensual de los servicios en segundo plano')
+
+
+job_item = api.model('FacturacionJob', {
+    'id':fields.Integer(
+        readonly = True,
+        title = 'ID',
+        description = 'Id del proceso de facturación'
+    ),
+    'estado':fields.String(
+        readonly = True,
+        title = 'Estado',
+        description = 'Estado del proceso de facturación',
+        choices = ['pendiente', 'en_proceso', 'finalizado']
+    ),
+    'fecha_creacion':fields.String(
+        readonly = True,
+        title = 'Fecha de creación',
+        example = '01-01-2024 10:00'
+    ),
+    'fecha_fin':nullable(
+        fields.String,
+        readonly = True,
+        title = 'Fecha de finalización',
+        example = '01-01-2024 10:05'
+    ),
+    'procesadas':fields.Integer(
+        readonly = True,
+        title = 'Lecturas procesadas'
+    ),
+    'registradas':fields.Integer(
+        readonly = True,
+        title = 'Planillas registradas'
+    ),
+    'fallidas':fields.Integer(
+        readonly = True,
+        title = 'Lecturas con error'
+    ),
+    'pendientes':fields.Integer(
+        readonly = True,
+        title = 'Lecturas pendientes'
+    )
+})
+
+job_response = api.model('FacturacionJobResponse', {
+    'success':fields.Nested(job_item)
+})
+
+
+# ----------------------------------- GET -----------------------------------------
+@api.route('/get/<int:id_job>')
+class GetFacturacionJob(Resource):
+    @api.response(200, 'OK', job_response)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def get(self, id_job):
+        """
+        Obtener el progreso de un proceso de facturación
+        """
+        try:
+            return {'success':FacturacionServices(db.session).get_resumen_job(id_job)},200
+        except Exception as e:
+            abort(400, error='No fue posible obtener el proceso de facturacion: ' + str(e))
+
+
+# ----------------------------------- POST ----------------------------------------
+@api.route('/new')
+class NewFacturacionJob(Resource):
+    item_lectura = api.model('Lectura de facturacion', {
+        'id_servicio':fields.Integer(
+            required=True,
+            title = 'ID servicio',
+            description='ID del servicio de un usuario'
+        ),
+        'lectura_actual':fields.Integer(
+            required = True,
+            title = 'Lectura actual',
+            description = 'Lectura actual del medidor'
+        )
+    })
+
+    new_job = api.model('Nueva facturacion', {
+        'lecturas':fields.List(
+            fields.Nested(item_lectura),
+            required = True,
+            title = 'Lecturas',
+            description = 'Lecturas de los medidores de los servicios activos'
+        )
+    })
+
+    @api.expect(new_job)
+    @api.response(202, 'Accepted', job_response)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def post(self):
+        """
+        Iniciar la facturación mensual
+
+        Genera en segundo plano las planillas del mes para todos los servicios activos
+        con las mismas validaciones que al registrar una planilla individual.
+        Los servicios activos que no tengan una lectura en la lista se reportan como fallidos.
+
+        El progreso del proceso se consulta con su id.
+        """
+        try:
+            data = api.payload
+            facturacion = FacturacionServices(db.session)
+            job = facturacion.new_job(data['lecturas'], current_user.id)
+            resumen = facturacion.get_resumen_job(job.id)
+            ejecutar_job(current_app._get_current_object(), job.id)
+            return {'success':resumen},202
+        except Exception as e:
+            abort(400, error='No fue posible iniciar la facturacion: ' + str(e))
+
+
+@api.route('/resume/<int:id_job>')
+class ResumeFacturacionJob(Resource):
+    @api.response(202, 'Accepted', success_message)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def post(self, id_job):
+        """
+        Reanudar un proceso de facturación interrumpido
+
+        Solo se reanudan los procesos pendientes o los procesos sin actividad
+        durante FACTURACION_JOB_TIMEOUT segundos.
+        """
+        try:
+            facturacion = FacturacionServices(db.session)
+            resumen = facturacion.get_resumen_job(id_job)
+            if resumen['estado'] == 'finalizado':
+                raise Exception('El proceso ya ha finalizado')
+            if not facturacion.job_reanudable(id_job):
+                raise Exception('El proceso se esta ejecutando')
+            ejecutar_job(current_app._get_current_object(), id_job)
+            return {'success':'Proceso de facturacion reanudado'},202
+        except Exception as e:
+            abort(400, error='No fue posible reanudar la facturacion: ' + str(e))
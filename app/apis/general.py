@@ -1,11 +1,16 @@
-from flask_restx import Namespace,Resource,fields,abort
+from flask import current_app
+from flask_restx import Namespace,Resource,fields,abort,inputs
 from flask_login import login_required
 from app.libs import db
-from sqlalchemy import extract, func
-from app.models import Clientes,Servicios,Planillas,PagosConexion
+from sqlalchemy import extract, func, select, union_all
+from app.models import Clientes,Servicios,Planillas,PagosConexion,CuotasConexion,ResumenCobrosDia,ResumenCobrosMes
 from app.common.api_utils import (
     error_message,
-    item_planilla
+    item_planilla,
+    nullable,
+    encode_cursor,
+    decode_cursor,
+    stream_success
 )
 from app.common.enums import conexionEnums
 from datetime import datetime, timedelta
@@ -73,9 +78,22 @@ class GetStats(Resource):
 @api.route('/get/planillas/pendientes')
 class GetPlanillasPendientes(Resource):
     planillas_pendientes = api.model('Planillas pendientes', {
-        'success':fields.List(fields.Nested(item_planilla))
+        'success':fields.List(fields.Nested(item_planilla)),
+        'siguiente': nullable(
+            fields.String,
+            title='Cursor siguiente pagina',
+            description='Cursor para obtener la siguiente pagina. null si no existen mas registros'
+        )
     })
 
+    filtros = api.parser()
+    filtros.add_argument('limite', type=inputs.int_range(1, 1000), location='args', help='N° de planillas por pagina. Sin limite se devuelven todas')
+    filtros.add_argument('cursor', type=str, location='args', help='Cursor de la pagina devuelto en <siguiente>')
+    filtros.add_argument('periodo', type=inputs.regex('^\\d{6}$'), location='args', help='Periodo de facturacion (yyyymm)')
+    filtros.add_argument('id_servicio', type=int, location='args', help='ID del servicio')
+    filtros.add_argument('stream', type=inputs.boolean, location='args', default=False, help='Enviar todas las planillas por partes sin paginar')
+
+    @api.expect(filtros)
     @api.response(200, 'OK', planillas_pendientes)
     @api.response(400, 'Bad Request', error_message)
     @login_required
@@ -83,48 +101,97 @@ class GetPlanillasPendientes(Resource):
         """
         Obtener lista de planillas con pago pendiente
 
-        Obtiene la lista de planillas del mes en curso las cuales aun no han sido pagadas
+        Obtiene la lista de planillas que aun no han sido pagadas junto a su servicio y cliente.
+        Con limite se obtienen por paginas, para obtener la siguiente pagina enviar el valor
+        de <siguiente> como cursor. Con stream se envian todas las planillas por partes.
         """
         try:
-            planillas = Planillas.query.filter(
+            args = self.filtros.parse_args()
+            query = db.session.query(
+                Planillas.id,
+                Planillas.fecha_emision,
+                Planillas.pagado,
+                Planillas.consumo_base,
+                Planillas.exedente,
+                Planillas.valor_consumo_base,
+                Planillas.valor_exedente,
+                Planillas.lectura_anterior,
+                Planillas.lectura_actual,
+                Planillas.consumo_total,
+                Planillas.valor_consumo_total,
+                Servicios.id.label('id_servicio'),
+                Servicios.n_conexion,
+                Servicios.n_medidor,
+                Servicios.direccion,
+                Servicios.estado,
+                Servicios.lectura_anterior.label('lectura_anterior_servicio'),
+                Clientes.id.label('id_cliente'),
+                Clientes.cedula,
+                Clientes.nombres,
+                Clientes.apellidos,
+                Clientes.telefono
+            ).join(
+                Servicios, Planillas.id_servicio == Servicios.id
+            ).join(
+                Clientes, Servicios.id_cliente == Clientes.id
+            ).filter(
                 Planillas.pagado == False
-            ).all()
-            results = []
-            for item in planillas:
-                results.append({
-                    'id':item.id,
-                    'servicio':{
-                        'id':item.servicio.id,
-                        'n_conexion':item.servicio.n_conexion,
-                        'n_medidor':item.servicio.n_medidor,
-                        'id_cliente':item.servicio.id_cliente,
-                        'direccion':item.servicio.direccion,
-                        'estado':item.servicio.estado,
-                        'lectura_anterior':item.servicio.lectura_anterior
-                    },
-                    'cliente':{
-                        'id':item.servicio.cliente.id,
-                        'cedula':item.servicio.cliente.cedula,
-                        'nombres':item.servicio.cliente.nombres,
-                        'apellidos':item.servicio.cliente.apellidos,
-                        'telefono':item.servicio.cliente.telefono
-                    },
-                    'fecha_emision':datetime.strftime(item.fecha_emision, '%d/%m/%Y'),
-                    'pagado':item.pagado,
-                    'consumo_base':item.consumo_base,
-                    'exedente':item.exedente,
-                    'valor_consumo_base':item.valor_consumo_base,
-                    'valor_exedente':item.valor_exedente,
-                    'lectura_anterior':item.lectura_anterior,
-                    'lectura_actual':item.lectura_actual,
-                    'consumo_total':item.consumo_total,
-                    'valor_consumo_total':item.valor_consumo_total
-                })
+            )
+            if args['periodo'] is not None:
+                query = query.filter(Planillas.periodo == int(args['periodo']))
+            if args['id_servicio'] is not None:
+                query = query.filter(Planillas.id_servicio == args['id_servicio'])
+            if args['stream']:
+                return stream_success(query.order_by(Planillas.id), self.planilla_dict)
+            if args['cursor'] is not None:
+                id_planilla, = decode_cursor(args['cursor'])
+                query = query.filter(Planillas.id > id_planilla)
+            query = query.order_by(Planillas.id)
+            if args['limite'] is not None:
+                query = query.limit(args['limite'])
+            planillas = query.all()
+            results = [self.planilla_dict(item) for item in planillas]
+            siguiente = None
+            if args['limite'] is not None and len(planillas) == args['limite']:
+                siguiente = encode_cursor(planillas[-1].id)
             return {
-                'success':results
+                'success':results,
+                'siguiente':siguiente
             }
-        except Exception:
-            abort(400, error='No fue posible obtener los registros')
+        except Exception as e:
+            abort(400, error='No fue posible obtener los registros: ' + str(e))
+
+    @staticmethod
+    def planilla_dict(item) -> dict:
+        return {
+            'id':item.id,
+            'servicio':{
+                'id':item.id_servicio,
+                'n_conexion':item.n_conexion,
+                'n_medidor':item.n_medidor,
+                'id_cliente':item.id_cliente,
+                'direccion':item.direccion,
+                'estado':item.estado,
+                'lectura_anterior':item.lectura_anterior_servicio
+            },
+            'cliente':{
+                'id':item.id_cliente,
+                'cedula':item.cedula,
+                'nombres':item.nombres,
+                'apellidos':item.apellidos,
+                'telefono':item.telefono
+            },
+            'fecha_emision':datetime.strftime(item.fecha_emision, '%d/%m/%Y'),
+            'pagado':item.pagado,
+            'consumo_base':item.consumo_base,
+            'exedente':item.exedente,
+            'valor_consumo_base':item.valor_consumo_base,
+            'valor_exedente':item.valor_exedente,
+            'lectura_anterior':item.lectura_anterior,
+            'lectura_actual':item.lectura_actual,
+            'consumo_total':item.consumo_total,
+            'valor_consumo_total':item.valor_consumo_total
+        }
 
 
 @api.route('/get/stats/cobros/planilla')
@@ -160,22 +227,28 @@ class GetStatsCobrosPlanilla(Resource):
             # Calculo total por cada dia de la semana en curso
             dia_semana = current_date.weekday()
             inicio_semana = (current_date - timedelta(days=dia_semana)).date()
-            fin_semana = (current_date + timedelta(days=6)).date()
-            planillas_semana: list[Planillas] = Planillas.query.filter(
-                Planillas.fecha_emision >= inicio_semana,
-                Planillas.fecha_emision <= fin_semana
-            ).all()
+            fin_semana = inicio_semana + timedelta(days=6)
+            cobros_semana = db.session.query(
+                ResumenCobrosDia.fecha,
+                func.sum(ResumenCobrosDia.total).label('total')
+            ).filter(
+                ResumenCobrosDia.fecha >= inicio_semana,
+                ResumenCobrosDia.fecha <= fin_semana
+            ).group_by(ResumenCobrosDia.fecha).all()
             resumen_semana = [0 for i in range(7)]
-            for ps in planillas_semana:
-                resumen_semana[ps.fecha_emision.weekday()] += ps.valor_consumo_total
+            for cs in cobros_semana:
+                resumen_semana[cs.fecha.weekday()] = float(cs.total)
 
             # Calcular el total por cada mes del año en curso
-            planillas_meses: list[Planillas] = Planillas.query.filter(
-                extract('year',Planillas.fecha_emision) == current_date.year
-            ).all()
+            cobros_meses = db.session.query(
+                ResumenCobrosMes.periodo,
+                func.sum(ResumenCobrosMes.total).label('total')
+            ).filter(
+                ResumenCobrosMes.periodo.between(current_date.year*100 + 1, current_date.year*100 + 12)
+            ).group_by(ResumenCobrosMes.periodo).all()
             resumen_meses = [0 for i in range(12)]
-            for pm in planillas_meses:
-                resumen_meses[pm.fecha_emision.month-1] += pm.valor_consumo_total
+            for cm in cobros_meses:
+                resumen_meses[cm.periodo % 100 - 1] = float(cm.total)
             # Response
             return {
                 'success':{
@@ -189,77 +262,97 @@ class GetStatsCobrosPlanilla(Resource):
 
 @api.route('/get/stats/cobros/conexion')
 class GetStatsCobrosConexion(Resource):
+    rango_fechas = api.parser()
+    rango_fechas.add_argument(
+        'desde',
+        type = inputs.date,
+        location = 'args',
+        required = False,
+        help = 'Fecha inicial (yyyy-mm-dd). Por defecto el inicio del año en curso'
+    )
+    rango_fechas.add_argument(
+        'hasta',
+        type = inputs.date,
+        location = 'args',
+        required = False,
+        help = 'Fecha final incluida (yyyy-mm-dd). Por defecto el fin del año en curso'
+    )
+
+    @api.expect(rango_fechas)
     @api.response(200, 'OK', )
     @api.response(400, 'Bad Request', error_message)
     @login_required
     def get(self):
         """
         Obtener estadisticas de los cobros por conexion
+
+        Devuelve el total cobrado por mes de cada tipo de pago de conexion.
+        Los resumenes principales corresponden al año de la fecha final,
+        el detalle de cada año del rango se devuelve en <anios>.
+        El rango puede abarcar como maximo STATS_MAX_ANIOS años.
         """
         try:
+            args = self.rango_fechas.parse_args()
             current_date = datetime.now() # Fecha actual
-            total_default_meses = [0 for mes in range(1,13)] # Lista default de valores por mes
-            # Labels para la consulta select
-            query_labels = [
-                func.sum(PagosConexion.entrada + PagosConexion.cuota1 + PagosConexion.cuota2 +
-                        PagosConexion.cuota3 + PagosConexion.cuota4 + PagosConexion.cuota5 +
-                        PagosConexion.cuota6).label('total'),
-                extract('month', PagosConexion.fecha_emision).label('month'),
-                extract('year', PagosConexion.fecha_emision).label('year')
-            ]
-
-            # Consultar el total de pagos por conexion al contado
-            total_pagos_conexion_contado = db.session.query(*query_labels).filter(
-                PagosConexion.tipo == conexionEnums.contado,
-                extract('year', PagosConexion.fecha_emision) == current_date.year
+            desde = args['desde'] or datetime(current_date.year, 1, 1)
+            hasta = args['hasta'] or datetime(current_date.year, 12, 31)
+            if desde > hasta:
+                raise Exception('La fecha inicial es mayor a la fecha final')
+            max_anios = current_app.config.get('STATS_MAX_ANIOS', 10)
+            if hasta.year - desde.year + 1 > max_anios:
+                raise Exception(f'El rango de fechas no puede superar {max_anios} años')
+            fecha_inicio = datetime(desde.year, desde.month, desde.day)
+            fecha_fin = datetime(hasta.year, hasta.month, hasta.day) + timedelta(days=1)
+            # Entradas por fecha de emision y cuotas por fecha de pago de cada tipo de pago
+            cobros = union_all(
+                select(
+                    PagosConexion.tipo.label('tipo'),
+                    PagosConexion.fecha_emision.label('fecha'),
+                    PagosConexion.entrada.label('valor')
+                ).where(
+                    PagosConexion.fecha_emision >= fecha_inicio,
+                    PagosConexion.fecha_emision < fecha_fin
+                ),
+                select(
+                    PagosConexion.tipo.label('tipo'),
+                    CuotasConexion.fecha_pago.label('fecha'),
+                    CuotasConexion.valor.label('valor')
+                ).join(
+                    PagosConexion, CuotasConexion.id_pago == PagosConexion.id
+                ).where(
+                    CuotasConexion.fecha_pago >= fecha_inicio,
+                    CuotasConexion.fecha_pago < fecha_fin
+                )
+            ).subquery()
+            # Consultar el total cobrado por tipo, año y mes en una sola consulta
+            mes = extract('month', cobros.c.fecha)
+            anio = extract('year', cobros.c.fecha)
+            total_pagos_conexion = db.session.query(
+                cobros.c.tipo,
+                anio.label('year'),
+                mes.label('month'),
+                func.sum(cobros.c.valor).label('total')
             ).group_by(
-                extract('month', PagosConexion.fecha_emision),
-                extract('year', PagosConexion.fecha_emision),
+                cobros.c.tipo,
+                anio,
+                mes
             ).all()
 
-            # Crea un diccionario con valor por mes
-            resumen_conexion_contado = total_default_meses.copy()
-
-            # Actualizar el elemento n del mes en la lista
-            for group in total_pagos_conexion_contado:
-                resumen_conexion_contado[group.month-1] = group.total
-
-            # Consultar el total de pagos de conexion por financiamiento
-            total_pagos_conexion_financiamiento = db.session.query(*query_labels).filter(
-                PagosConexion.tipo == conexionEnums.financiamiento,
-                extract('year', PagosConexion.fecha_emision) == current_date.year
-            ).group_by(
-                extract('month', PagosConexion.fecha_emision),
-                extract('year', PagosConexion.fecha_emision),
-            ).all()
-
-            # Crea un diccionario con valor por mes
-            resumen_conexion_financiamiento = total_default_meses.copy()
-
-            # Actualizar el elemento n del mes en la lista
-            for group in total_pagos_conexion_financiamiento:
-                resumen_conexion_financiamiento[group.month-1] = group.total
-
-            # Consultar el total de pagos de conexion por reconexion
-            total_pagos_reconexion = db.session.query(*query_labels).filter(
-                PagosConexion.tipo == conexionEnums.reconexion.value,
-                extract('year', PagosConexion.fecha_emision) == current_date.year
-            ).group_by(
-                extract('month', PagosConexion.fecha_emision),
-                extract('year', PagosConexion.fecha_emision),
-            ).all()
-
-            # Crea un diccionario con valor por mes
-            resumen_reconexion = total_default_meses.copy()
-
+            # Lista default de valores por mes para cada tipo de pago y año del rango
+            resumen_anios = {
+                year:{tipo.value:[0 for mes in range(1,13)] for tipo in conexionEnums}
+                for year in range(desde.year, hasta.year + 1)
+            }
             # Actualizar el elemento n del mes en la lista
-            for group in total_pagos_reconexion:
-                resumen_reconexion[group.month-1] = group.total
+            for group in total_pagos_conexion:
+                resumen_anios[int(group.year)][group.tipo.value][int(group.month)-1] = group.total
 
+            resumen_hasta = resumen_anios[hasta.year]
             return {'success':{
-                'resumen_conexion_contado':resumen_conexion_contado,
-                'resumen_conexion_financiamiento':resumen_conexion_financiamiento,
-                'resumen_reconexion':resumen_reconexion
+                'resumen_conexion_contado':resumen_hasta[conexionEnums.contado.value],
+                'resumen_conexion_financiamiento':resumen_hasta[conexionEnums.financiamiento.value],
+                'resumen_reconexion':resumen_hasta[conexionEnums.reconexion.value],
+                'anios':{str(year):resumen for year, resumen in resumen_anios.items()}
             }},200
-        except Exception:
-            abort(400, error='No fue posible obtener los registros')
+        except Exception as e:
+            abort(400, error='No fue posible obtener los registros: ' + str(e))
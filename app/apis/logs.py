@@ -1,12 +1,18 @@
-from flask_restx import Namespace,Resource,fields,abort
+from flask import current_app
+from flask_restx import Namespace,Resource,fields,abort,inputs
 from flask_login import login_required
 from app.libs import db
 from app.common.logs import LogsServices
+from app.common.enums import logsCategories
 from app.common.api_utils import (
     error_message,
-    success_message
+    success_message,
+    nullable,
+    encode_cursor,
+    decode_cursor
 )
 import datetime
+import itertools
 
 
 api = Namespace('Logs', description='Endpoints de logs del sistema')
@@ -46,28 +52,120 @@ class GetAdminAll(Resource):
     })
 
     all_logs = api.model('AllLogs', {
-        'success': fields.Nested(log_item)
+        'success': fields.List(fields.Nested(log_item)),
+        'siguiente': nullable(
+            fields.String,
+            title='Cursor siguiente pagina',
+            description='Cursor para obtener la siguiente pagina. null si no existen mas registros'
+        )
     })
 
+    filtros = api.parser()
+    filtros.add_argument('limite', type=inputs.int_range(1, 1000), location='args', default=100, help='N° de logs por pagina')
+    filtros.add_argument('cursor', type=str, location='args', help='Cursor de la pagina devuelto en <siguiente>')
+    filtros.add_argument('categoria', type=str, location='args', choices=[item.value for item in logsCategories], help='Categoria del log')
+    filtros.add_argument('id_usuario', type=int, location='args', help='ID del usuario generador del log')
+    filtros.add_argument('desde', type=inputs.date, location='args', help='Fecha inicial (yyyy-mm-dd)')
+    filtros.add_argument('hasta', type=inputs.date, location='args', help='Fecha final incluida (yyyy-mm-dd)')
+
+    @api.expect(filtros)
     @api.response(200, 'OK', all_logs)
     @api.response(400, 'Bad Request', error_message)
     @login_required
     def get(self):
         """
         Todos los logs
+
+        Obtiene los logs del mas reciente al mas antiguo por paginas.
+        Para obtener la siguiente pagina enviar el valor de <siguiente> como cursor.
         """
         try:
-            all_logs = LogsServices(db.session).get_all_logs()
+            args = self.filtros.parse_args()
+            limite = args['limite']
+            cursor = None
+            if args['cursor'] is not None:
+                fecha, id_log = decode_cursor(args['cursor'])
+                cursor = (datetime.datetime.fromisoformat(fecha), id_log)
+            logs = LogsServices(db.session).get_logs(
+                limite,
+                cursor = cursor,
+                categoria = logsCategories(args['categoria']) if args['categoria'] is not None else None,
+                id_usuario = args['id_usuario'],
+                desde = args['desde'],
+                hasta = args['hasta'] + datetime.timedelta(days=1) if args['hasta'] is not None else None
+            )
             results = []
-            for item in all_logs:
+            for item in logs:
                 results.append({
-                    'usuario':item.usuario.username,
+                    'usuario':item.username,
                     'categoria':item.categoria.value,
                     'fecha':datetime.datetime.strftime(item.fecha, '%d-%m-%Y'),
                     'hora':datetime.datetime.strftime(item.fecha, '%H:%M'),
                     'detalle':item.detalle
                 })
-            return {'success':results},200
+            siguiente = encode_cursor(logs[-1].fecha, logs[-1].id) if len(logs) == limite else None
+            return {'success':results, 'siguiente':siguiente},200
+        except Exception as e:
+            abort(400, error=str(e))
+
+
+@api.route('/archivo/get/<int:anio>/<int:mes>')
+class GetLogsArchivados(Resource):
+    log_archivado = api.model('LogArchivadoItem', {
+        'id': fields.Integer(title='ID'),
+        'usuario': fields.String(title='Usuario', description='Usuario generador del log'),
+        'categoria': fields.String(title='Categoria de log'),
+        'fecha': fields.String(title='Fecha', example='09-10-2023'),
+        'hora': fields.String(title='Hora', example='10:00'),
+        'detalle': nullable(fields.String, title='Detalle')
+    })
+
+    logs_archivados = api.model('LogsArchivados', {
+        'success': fields.List(fields.Nested(log_archivado)),
+        'siguiente': nullable(
+            fields.Integer,
+            title='Offset siguiente pagina',
+            description='Offset para obtener la siguiente pagina. null si no existen mas registros'
+        )
+    })
+
+    filtros = api.parser()
+    filtros.add_argument('limite', type=inputs.int_range(1, 1000), location='args', default=100, help='N° de logs por pagina')
+    filtros.add_argument('offset', type=inputs.natural, location='args', default=0, help='N° de logs a omitir')
+    filtros.add_argument('categoria', type=str, location='args', choices=[item.value for item in logsCategories], help='Categoria del log')
+
+    @api.expect(filtros)
+    @api.response(200, 'OK', logs_archivados)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def get(self, anio, mes):
+        """
+        Logs archivados de un mes
+
+        Recorre el archivo de logs del mes sin volver a importarlo a la base de datos
+        """
+        try:
+            args = self.filtros.parse_args()
+            limite = args['limite']
+            offset = args['offset']
+            logs = LogsServices(db.session).read_archive(
+                current_app.config['LOGS_ARCHIVE_DIR'],
+                f'{anio:04d}-{mes:02d}',
+                logsCategories(args['categoria']) if args['categoria'] is not None else None
+            )
+            results = []
+            for item in itertools.islice(logs, offset, offset + limite + 1):
+                fecha = datetime.datetime.fromisoformat(item['fecha'])
+                results.append({
+                    'id':item['id'],
+                    'usuario':item['usuario'],
+                    'categoria':item['categoria'],
+                    'fecha':datetime.datetime.strftime(fecha, '%d-%m-%Y'),
+                    'hora':datetime.datetime.strftime(fecha, '%H:%M'),
+                    'detalle':item['detalle']
+                })
+            siguiente = offset + limite if len(results) > limite else None
+            return {'success':results[:limite], 'siguiente':siguiente},200
         except Exception as e:
             abort(400, error=str(e))
 
@@ -80,10 +178,16 @@ class DeleteOldLogs(Resource):
     @login_required
     def delete(self):
         """
-        Eliminar logs con más de 2 meses de antiguedad
+        Eliminar logs antiguos
+
+        Elimina los logs que superan los dias de retencion configurados para su categoria
         """
         try:
-            LogsServices(db.session).delete_old_logs()
-            return {'success':'Logs eliminados'},200
+            eliminados = LogsServices(db.session).delete_old_logs(
+                current_app.config['LOGS_RETENTION'],
+                current_app.config['LOGS_RETENTION_DEFAULT'],
+                current_app.config['LOGS_PURGE_BATCH_SIZE']
+            )
+            return {'success':f'Logs eliminados: {eliminados}'},200
         except Exception as e:
             abort(400, error=str(e))
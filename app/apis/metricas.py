@@ -0,0 +1,24 @@
+from flask import Response
+from flask_restx import Namespace,Resource
+from flask_login import login_required
+from app.common.metricas import metricas
+
+
+api = Namespace('Métricas', description='Métricas de rendimiento del API')
+
+
+# ----------------------------------- GET -----------------------------------------
+@api.route('')
+class GetMetricas(Resource):
+    @api.response(200, 'OK')
+    @login_required
+    def get(self):
+        """
+        Métricas del API en formato Prometheus
+
+        Latencia de las peticiones, N° de sentencias SQL y tiempo total en la DB por endpoint.
+        Los valores se acumulan por proceso: con varios workers (gunicorn) cada peticion devuelve
+        solo las metricas del worker que la atiende, identificado por la etiqueta pid.
+        Las series de todos los workers deben sumarse por method y endpoint en Prometheus.
+        """
+        return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
@@ -1,14 +1,17 @@
-from flask_restx import Namespace,Resource,fields,abort
+from flask import current_app
+from flask_restx import Namespace,Resource,fields,abort,inputs
 from flask_login import login_required, current_user
 from app.libs import db
 from app.common.logs import LogsServices
+from app.common.notificaciones import NotificacionesServices
 from app.common.api_utils import (
     success_message,
     error_message,
     item_servicio,
-    item_cliente
+    item_cliente,
+    stream_success
 )
-from app.models import Notificaciones
+from app.models import Notificaciones, Servicios, Clientes
 from app.common.enums import logsCategories
 from datetime import datetime
 
@@ -33,8 +36,62 @@ notificaciones_list = api.model('Notificaciones', {
     'success':fields.List(fields.Nested(notificacion_item))
 })
 
+pagadas_parser = api.parser()
+pagadas_parser.add_argument(
+    'dias',
+    type=inputs.natural,
+    location='args',
+    required=False,
+    help='Eliminar solo las notificaciones emitidas hace mas de los dias indicados'
+)
+
 
 # ----------------------------------- GET -----------------------------------------
+def query_notificaciones():
+    """
+    Consulta de las columnas de las notificaciones junto a su servicio y cliente
+    """
+    return db.session.query(
+        Notificaciones.id,
+        Notificaciones.fecha_emision,
+        Notificaciones.total,
+        Notificaciones.pagado,
+        Servicios.id.label('id_servicio'),
+        Servicios.n_conexion,
+        Servicios.n_medidor,
+        Clientes.id.label('id_cliente'),
+        Clientes.nombres,
+        Clientes.apellidos,
+        Clientes.cedula,
+        Clientes.telefono
+    ).join(
+        Servicios, Notificaciones.id_servicio == Servicios.id
+    ).join(
+        Clientes, Servicios.id_cliente == Clientes.id
+    )
+
+
+def notificacion_dict(item) -> dict:
+    return {
+        'id':item.id,
+        'fecha_emision':datetime.strftime(item.fecha_emision, '%d-%m-%Y %H:%M'),
+        'total':item.total,
+        'pagado':item.pagado,
+        'servicio':{
+            'id':item.id_servicio,
+            'n_conexion':item.n_conexion,
+            'n_medidor':item.n_medidor
+        },
+        'cliente':{
+            'id':item.id_cliente,
+            'nombres':item.nombres,
+            'apellidos':item.apellidos,
+            'cedula':item.cedula,
+            'telefono':item.telefono
+        }
+    }
+
+
 @api.route('/get/all')
 class GetAllNotificacions(Resource):
     @api.response(200, 'OK', notificaciones_list)
@@ -42,29 +99,8 @@ class GetAllNotificacions(Resource):
     @login_required
     def get(self):
         try:
-            notificaciones = db.session.query(Notificaciones).all()
-            results = []
-            # Crear array de resultados
-            for item in notificaciones:
-                results.append({
-                    'id':item.id,
-                    'fecha_emision':datetime.strftime(item.fecha_emision, '%d-%m-%Y %H:%M'),
-                    'total':item.total,
-                    'pagado':item.pagado,
-                    'servicio':{
-                        'id':item.id_servicio,
-                        'n_conexion':item.servicio.n_conexion,
-                        'n_medidor':item.servicio.n_medidor
-                    },
-                    'cliente':{
-                        'id':item.servicio.cliente.id,
-                        'nombres':item.servicio.cliente.nombres,
-                        'apellidos':item.servicio.cliente.apellidos,
-                        'cedula':item.servicio.cliente.cedula,
-                        'telefono':item.servicio.cliente.telefono
-                    }
-                })
-            return {'success': results},200
+            notificaciones = query_notificaciones().order_by(Notificaciones.id)
+            return stream_success(notificaciones, notificacion_dict)
         except Exception:
             abort(400, error='No fue posible obtener los registros')
 
@@ -77,30 +113,10 @@ class GetServicioNotificaciones(Resource):
     def get(self, id_servicio):
         try:
             # Consultar la lista de notificaciones para el servicio
-            notificaciones = db.session.query(Notificaciones).filter(
+            notificaciones = query_notificaciones().filter(
                 Notificaciones.id_servicio == id_servicio
-            ).all()
-            results = []
-            # Crear array de resultados
-            for item in notificaciones:
-                results.append({
-                    'id':item.id,
-                    'fecha_emision':datetime.strftime(item.fecha_emision, '%d-%m-%Y %H:%M'),
-                    'total':item.total,
-                    'pagado':item.pagado,
-                    'servicio':{
-                        'id':item.id_servicio,
-                        'n_conexion':item.servicio.n_conexion,
-                        'n_medidor':item.servicio.n_medidor
-                    },
-                    'cliente':{
-                        'id':item.servicio.cliente.id,
-                        'nombres':item.servicio.cliente.nombres,
-                        'apellidos':item.servicio.cliente.apellidos,
-                        'cedula':item.servicio.cliente.cedula,
-                        'telefono':item.servicio.cliente.telefono
-                    }
-                })
+            ).order_by(Notificaciones.id).all()
+            results = [notificacion_dict(item) for item in notificaciones]
             return {'success':results},200
         except Exception:
             abort(400, error='No fue posible obtener los registros')
@@ -129,6 +145,61 @@ class NewNotification(Resource):
             abort(400, error='No fue posible registrar la notificacion')
 
 
+@api.route('/new/vencidas')
+class NewNotificacionesVencidas(Resource):
+    notificaciones_vencidas = api.model('NotificacionesVencidas', {
+        'dias':fields.Integer(
+            required = False,
+            title = 'Dias de vencimiento',
+            description = 'Antigüedad en dias de las planillas sin pagar. Por defecto NOTIFICACIONES_DIAS_VENCIMIENTO',
+            min = 0
+        ),
+        'listar':fields.Boolean(
+            required = False,
+            default = False,
+            title = 'Listar servicios',
+            description = 'Devolver los ids de los servicios notificados'
+        )
+    })
+
+    resumen_vencidas = api.model('ResumenNotificacionesVencidas', {
+        'notificaciones':fields.Integer(readonly=True, title='N° de notificaciones registradas'),
+        'servicios':fields.List(fields.Integer, readonly=True, title='Servicios notificados')
+    })
+
+    resultado_vencidas = api.model('ResultadoNotificacionesVencidas', {
+        'success':fields.Nested(resumen_vencidas)
+    })
+
+    @api.expect(notificaciones_vencidas)
+    @api.response(201, 'Created', resultado_vencidas)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def post(self):
+        """
+        Notificar servicios con planillas vencidas
+
+        Registra una notificacion para cada servicio con planillas sin pagar mas antiguas
+        que los dias indicados y que no tenga una notificacion pendiente de pago.
+        """
+        try:
+            data = api.payload or {}
+            dias = data.get('dias')
+            if dias is None:
+                dias = current_app.config.get('NOTIFICACIONES_DIAS_VENCIMIENTO', 30)
+            notificaciones, servicios = NotificacionesServices(db.session).generar_vencidas(dias, data.get('listar', False))
+            db.session.commit()
+            LogsServices(db.session).new_log(
+                logsCategories.notificacion_created,
+                current_user.id,
+                f'{notificaciones} notificaciones de planillas vencidas'
+            )
+            return {'success':{'notificaciones':notificaciones, 'servicios':servicios}}, 201
+        except Exception as e:
+            db.session.rollback()
+            abort(400, error=f'No fue posible registrar las notificaciones: {e}')
+
+
 # ------------------------------------- PUT ------------------------------------
 @api.route('/update/pago/<int:id_notificacion>')
 class UpdatePagoNotificacion(Resource):
@@ -162,18 +233,22 @@ class UpdatePagoNotificacion(Resource):
 class DeleteNotificacionesPagadas(Resource):
     @api.response(200, 'OK', success_message)
     @api.response(400, 'Bad Request', error_message)
+    @api.expect(pagadas_parser)
     @login_required
     def delete(self):
         try:
-            notificaciones = db.session.query(Notificaciones).filter(
-                Notificaciones.pagado == True
-            ).all()
-            # Eliminar las notificaciones pagadas
-            for item in notificaciones:
-                db.session.delete(item)
-            db.session.commit()
-            LogsServices(db.session).new_log(logsCategories.notificacion_deleted, current_user.id)
-            return {'success': 'Notificaciones pagadas eliminadas'},200
+            args = pagadas_parser.parse_args()
+            # Eliminar las notificaciones pagadas por lotes
+            eliminadas = NotificacionesServices(db.session).delete_pagadas(
+                current_app.config.get('NOTIFICACIONES_PURGE_BATCH_SIZE', 1000),
+                dias=args['dias']
+            )
+            LogsServices(db.session).new_log(
+                logsCategories.notificacion_deleted,
+                current_user.id,
+                f'{eliminadas} notificaciones pagadas eliminadas'
+            )
+            return {'success': f'Notificaciones pagadas eliminadas: {eliminadas}'},200
         except Exception:
             db.session.rollback()
             abort(400, error='No fue posible eliminar las notificaciones')
@@ -183,19 +258,23 @@ class DeleteNotificacionesPagadas(Resource):
 class DeleteNotificacionesServicioPagadas(Resource):
     @api.response(200, 'OK', success_message)
     @api.response(400, 'Bad Request', error_message)
+    @api.expect(pagadas_parser)
     @login_required
     def delete(self, id_servicio):
         try:
-            notificaciones = db.session.query(Notificaciones).filter(
-                Notificaciones.id_servicio == id_servicio,
-                Notificaciones.pagado == True
-            ).all()
-            # Eliminar las notificaciones pagadas
-            for item in notificaciones:
-                db.session.delete(item)
-            db.session.commit()
-            LogsServices(db.session).new_log(logsCategories.notificacion_deleted, current_user.id)
-            return {'success': 'Notificaciones pagadas eliminadas'},200
+            args = pagadas_parser.parse_args()
+            # Eliminar las notificaciones pagadas del servicio por lotes
+            eliminadas = NotificacionesServices(db.session).delete_pagadas(
+                current_app.config.get('NOTIFICACIONES_PURGE_BATCH_SIZE', 1000),
+                id_servicio=id_servicio,
+                dias=args['dias']
+            )
+            LogsServices(db.session).new_log(
+                logsCategories.notificacion_deleted,
+                current_user.id,
+                f'{eliminadas} notificaciones pagadas eliminadas del servicio {id_servicio}'
+            )
+            return {'success': f'Notificaciones pagadas eliminadas: {eliminadas}'},200
         except Exception:
             db.session.rollback()
             abort(400, error='No fue posible eliminar las notificaciones')
@@ -1,4 +1,4 @@
-from flask_restx import Namespace,Resource,fields,abort
+from flask_restx import Namespace,Resource,fields,abort,inputs
 from flask_login import login_required
 from app.libs import db
 from app.common.api_utils import (
@@ -6,10 +6,14 @@ from app.common.api_utils import (
     error_message,
     item_servicio,
     item_cliente,
-    nullable
+    nullable,
+    encode_cursor,
+    decode_cursor,
+    stream_success
 )
-from app.models import PagosConexion
+from app.models import PagosConexion, CuotasConexion
 from app.common.enums import conexionEnums
+from app.common.pagos_conexion import PagosConexionServices
 import datetime
 
 
@@ -17,21 +21,177 @@ api = Namespace('Pagos Conexion', description='Endpoints de gestion de pagos por
 
 
 # ----------------------------------- GET -----------------------------------------
-@api.route('/reconexion/get/all')
-class GetAllPagosReconexion(Resource):
-    pago_reconexion_item = api.model('PagoReconexionItem', {
-        'id': fields.Integer(title='ID'),
-        'servicio':fields.Nested(item_servicio),
-        'cliente':fields.Nested(item_cliente),
-        'fecha_emision':fields.String(title='Fecha de emision', example='12-12-2000'),
-        'hora_emision':fields.String(title='Hora de emision', example='10:00'),
-        'total':fields.Float(title='Total cobrado')
+pago_conexion_item = api.model('PagoConexionItem', {
+    'id': fields.Integer(title='ID'),
+    'servicio':fields.Nested(item_servicio),
+    'cliente':fields.Nested(item_cliente),
+    'fecha_emision':fields.String(title='Fecha de emision', example='12-12-2000'),
+    'hora_emision':fields.String(title='Hora de emision', example='10:00'),
+    'total':fields.Float(title='Total cobrado')
+})
+
+cuota_conexion_item = api.model('CuotaConexionItem', {
+    'numero':fields.Integer(title='N° de cuota', example=1),
+    'valor':fields.Float(title='Valor pagado'),
+    'fecha_pago':fields.String(title='Fecha de pago', example='12-12-2000')
+})
+
+pago_financiamiento_item = api.inherit('PagoFinanciamientoItem', pago_conexion_item, {
+    'entrada':fields.Float(title='Entrada del pago ($100)', example=100),
+    'cuota1':fields.Float(title='Cuota1', example=0),
+    'cuota2':fields.Float(title='Cuota2', example=0),
+    'cuota3':fields.Float(title='Cuota3', example=0),
+    'cuota4':fields.Float(title='Cuota4', example=0),
+    'cuota5':fields.Float(title='Cuota5', example=0),
+    'cuota6':fields.Float(title='Cuota6', example=0),
+    'total_pagar':fields.Float(title='Total a pagar ($250)', example=250),
+    'total_pagado':fields.Float(title='Total pagado hasta el momento'),
+    'restante_pagar':fields.Float(title='Valor restante por cobrar'),
+    'cuotas':fields.List(fields.Nested(cuota_conexion_item))
+})
+
+pago_conexion_tipo_item = api.inherit('PagoConexionTipoItem', pago_financiamiento_item, {
+    'tipo':fields.String(title='Tipo de pago', enum=[item.value for item in conexionEnums])
+})
+
+all_pagos_conexion = api.model('AllPagosConexion', {
+    'success':fields.List(fields.Nested(pago_conexion_tipo_item)),
+    'siguiente': nullable(
+        fields.String,
+        title='Cursor siguiente pagina',
+        description='Cursor para obtener la siguiente pagina. null si no existen mas registros'
+    )
+})
+
+filtros_pagos = api.parser()
+filtros_pagos.add_argument('limite', type=inputs.int_range(1, 1000), location='args', help='N° de pagos por pagina. Sin limite se devuelven todos')
+filtros_pagos.add_argument('cursor', type=str, location='args', help='Cursor de la pagina devuelto en <siguiente>')
+filtros_pagos.add_argument('id_servicio', type=int, location='args', help='ID del servicio')
+filtros_pagos.add_argument('id_cliente', type=int, location='args', help='ID del cliente')
+filtros_pagos.add_argument('desde', type=inputs.date, location='args', help='Fecha inicial (yyyy-mm-dd)')
+filtros_pagos.add_argument('hasta', type=inputs.date, location='args', help='Fecha final incluida (yyyy-mm-dd)')
+
+filtros_pagos_tipo = filtros_pagos.copy()
+filtros_pagos_tipo.add_argument('tipo', type=str, location='args', choices=[item.value for item in conexionEnums], help='Tipo de pago')
+
+
+def get_pagos_conexion(args: dict, proyeccion, tipo: conexionEnums = None, cuotas: bool = False):
+    """
+    Consulta los pagos de conexion con los filtros recibidos. Con limite devuelve una pagina
+    y el cursor de la siguiente pagina, sin limite envia todos los pagos por partes.
+    cuotas indica si la proyeccion devuelve las cuotas de los pagos.
+    """
+    limite = args['limite']
+    cursor = None
+    if args['cursor'] is not None:
+        fecha_emision, id_pago = decode_cursor(args['cursor'])
+        cursor = (datetime.datetime.fromisoformat(fecha_emision), id_pago)
+    filtros = {
+        'cursor':cursor,
+        'tipo':tipo,
+        'id_servicio':args['id_servicio'],
+        'id_cliente':args['id_cliente'],
+        'desde':args['desde'],
+        'hasta':args['hasta'] + datetime.timedelta(days=1) if args['hasta'] is not None else None,
+        'cuotas':cuotas
+    }
+    pagos_services = PagosConexionServices(db.session)
+    if limite is None:
+        return stream_success(pagos_services.query_pagos(**filtros), proyeccion, siguiente=None)
+    pagos = pagos_services.get_pagos(limite, **filtros)
+    siguiente = None
+    if len(pagos) == limite:
+        siguiente = encode_cursor(pagos[-1].fecha_emision, pagos[-1].id)
+    return {'success':[proyeccion(item) for item in pagos], 'siguiente':siguiente},200
+
+
+def pago_conexion_dict(item: PagosConexion) -> dict:
+    return {
+        'id':item.id,
+        'servicio':{
+            'id':item.servicio.id,
+            'n_conexion':item.servicio.n_conexion,
+            'n_medidor':item.servicio.n_medidor,
+            'direccion':item.servicio.direccion,
+            'estado':item.servicio.estado,
+            'lectura_anterior':item.servicio.lectura_anterior
+        },
+        'cliente':{
+            'id':item.servicio.cliente.id,
+            'cedula':item.servicio.cliente.cedula,
+            'nombres':item.servicio.cliente.nombres,
+            'apellidos':item.servicio.cliente.apellidos,
+            'telefono':item.servicio.cliente.telefono
+        },
+        'fecha_emision':datetime.datetime.strftime(item.fecha_emision, '%d-%m-%Y'),
+        'hora_emision':datetime.datetime.strftime(item.fecha_emision, '%H:%M'),
+        'total':item.total
+    }
+
+
+def pago_financiamiento_dict(item: PagosConexion) -> dict:
+    result = pago_conexion_dict(item)
+    valores = [0 for numero in range(CuotasConexion.max_cuotas)]
+    for cuota in item.cuotas:
+        valores[cuota.numero-1] = cuota.valor
+    total_pagado = item.entrada + sum(valores)
+    result.update({
+        'entrada':item.entrada,
+        'total_pagar':item.total,
+        'total_pagado':total_pagado,
+        'restante_pagar':item.total - total_pagado,
+        'cuotas':[
+            {
+                'numero':cuota.numero,
+                'valor':cuota.valor,
+                'fecha_pago':datetime.datetime.strftime(cuota.fecha_pago, '%d-%m-%Y')
+            } for cuota in item.cuotas
+        ]
     })
+    for numero, valor in enumerate(valores, start=1):
+        result[f'cuota{numero}'] = valor
+    return result
+
+
+def pago_conexion_tipo_dict(item: PagosConexion) -> dict:
+    result = pago_financiamiento_dict(item)
+    result['tipo'] = item.tipo.value
+    return result
+
 
+@api.route('/get/all')
+class GetAllPagosConexion(Resource):
+    @api.expect(filtros_pagos_tipo)
+    @api.response(200, 'OK', all_pagos_conexion)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def get(self):
+        """
+        Obtener pagos de conexion
+
+        Obtiene los pagos de conexion del mas reciente al mas antiguo filtrados por tipo, fechas,
+        servicio y cliente. Para obtener la siguiente pagina enviar el valor de <siguiente> como cursor.
+        """
+        try:
+            args = filtros_pagos_tipo.parse_args()
+            return get_pagos_conexion(
+                args,
+                pago_conexion_tipo_dict,
+                conexionEnums(args['tipo']) if args['tipo'] is not None else None,
+                cuotas=True
+            )
+        except Exception as e:
+            abort(400, error='No fue posible obtener los registros: ' + str(e))
+
+
+@api.route('/reconexion/get/all')
+class GetAllPagosReconexion(Resource):
     all_pagos_reconexion = api.model('AllPagosReconexion', {
-        'success':fields.Nested(pago_reconexion_item)
+        'success':fields.List(fields.Nested(pago_conexion_item)),
+        'siguiente':nullable(fields.String, title='Cursor siguiente pagina')
     })
 
+    @api.expect(filtros_pagos)
     @api.response(200, 'OK', all_pagos_reconexion)
     @api.response(400, 'Bad Request', error_message)
     @login_required
@@ -40,53 +200,19 @@ class GetAllPagosReconexion(Resource):
         Obtener lista de todos los pagos por reconexion
         """
         try:
-            pagos = PagosConexion.query.filter(
-                PagosConexion.tipo == conexionEnums.reconexion
-            ).all()
-            results = []
-            for item in pagos:
-                item: PagosConexion
-                results.append({
-                    'id':item.id,
-                    'servicio':{
-                        'id':item.servicio.id,
-                        'n_conexion':item.servicio.n_conexion,
-                        'n_medidor':item.servicio.n_medidor,
-                        'direccion':item.servicio.direccion,
-                        'estado':item.servicio.estado,
-                        'lectura_anterior':item.servicio.lectura_anterior
-                    },
-                    'cliente':{
-                        'id':item.servicio.cliente.id,
-                        'cedula':item.servicio.cliente.cedula,
-                        'nombres':item.servicio.cliente.nombres,
-                        'apellidos':item.servicio.cliente.apellidos,
-                        'telefono':item.servicio.cliente.telefono
-                    },
-                    'fecha_emision':datetime.datetime.strftime(item.fecha_emision, '%d-%m-%Y'),
-                    'hora_emision':datetime.datetime.strftime(item.fecha_emision, '%H:%M'),
-                    'total':item.total
-                })
-            return {'success':results},200
+            return get_pagos_conexion(filtros_pagos.parse_args(), pago_conexion_dict, conexionEnums.reconexion)
         except Exception as e:
             abort(400, error='No fue posible obtener los registros: ' + str(e))
 
 
 @api.route('/contado/get/all')
 class GetAllPagosContado(Resource):
-    pago_contado_item = api.model('PagoContadoItem', {
-        'id': fields.Integer(title='ID'),
-        'servicio':fields.Nested(item_servicio),
-        'cliente':fields.Nested(item_cliente),
-        'fecha_emision':fields.String(title='Fecha de emision', example='12-12-2000'),
-        'hora_emision':fields.String(title='Hora de emision', example='10:00'),
-        'total':fields.Float(title='Total cobrado')
-    })
-
     all_pagos_contado = api.model('AllPagosContado', {
-        'success':fields.Nested(pago_contado_item)
+        'success':fields.List(fields.Nested(pago_conexion_item)),
+        'siguiente':nullable(fields.String, title='Cursor siguiente pagina')
     })
 
+    @api.expect(filtros_pagos)
     @api.response(200, 'OK', all_pagos_contado)
     @api.response(400, 'Bad Request', error_message)
     @login_required
@@ -95,118 +221,101 @@ class GetAllPagosContado(Resource):
         Obtener lista de todos los pagos de conexion por contado
         """
         try:
-            pagos = PagosConexion.query.filter(
-                PagosConexion.tipo == conexionEnums.contado
-            ).all()
-            results = []
-            for item in pagos:
-                item: PagosConexion
-                results.append({
-                    'id':item.id,
-                    'servicio':{
-                        'id':item.servicio.id,
-                        'n_conexion':item.servicio.n_conexion,
-                        'n_medidor':item.servicio.n_medidor,
-                        'direccion':item.servicio.direccion,
-                        'estado':item.servicio.estado,
-                        'lectura_anterior':item.servicio.lectura_anterior
-                    },
-                    'cliente':{
-                        'id':item.servicio.cliente.id,
-                        'cedula':item.servicio.cliente.cedula,
-                        'nombres':item.servicio.cliente.nombres,
-                        'apellidos':item.servicio.cliente.apellidos,
-                        'telefono':item.servicio.cliente.telefono
-                    },
-                    'fecha_emision':datetime.datetime.strftime(item.fecha_emision, '%d-%m-%Y'),
-                    'hora_emision':datetime.datetime.strftime(item.fecha_emision, '%H:%M'),
-                    'total':item.total
-                })
-            return {'success':results},200
+            return get_pagos_conexion(filtros_pagos.parse_args(), pago_conexion_dict, conexionEnums.contado)
         except Exception:
             abort(400, error='No fue posible obtener los registros')
 
 
 @api.route('/financiamiento/get/all')
 class GetAllPagosFinanciamiento(Resource):
-    pago_financiamiento_item = api.model('PagoFinanciamientoItem', {
-        'id': fields.Integer(title='ID'),
+    all_pagos_financiamiento = api.model('AllPagosFinanciamiento', {
+        'success':fields.List(fields.Nested(pago_financiamiento_item)),
+        'siguiente':nullable(fields.String, title='Cursor siguiente pagina')
+    })
+
+    @api.expect(filtros_pagos)
+    @api.response(200, 'OK', all_pagos_financiamiento)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def get(self):
+        """
+        Obtener lista de todos los pagos de conexion por financiamiento
+        """
+        try:
+            return get_pagos_conexion(filtros_pagos.parse_args(), pago_financiamiento_dict, conexionEnums.financiamiento, cuotas=True)
+        except Exception:
+            abort(400, error='No fue posible obtener los registros')
+
+
+@api.route('/financiamiento/get/saldos')
+class GetSaldosFinanciamiento(Resource):
+    saldo_financiamiento_item = api.model('SaldoFinanciamientoItem', {
         'servicio':fields.Nested(item_servicio),
         'cliente':fields.Nested(item_cliente),
-        'fecha_emision':fields.String(title='Fecha de emision', example='12-12-2000'),
-        'hora_emision':fields.String(title='Hora de emision', example='10:00'),
-        'total':fields.Float(title='Total cobrado'),
-        'entrada':fields.Float(title='Entrada del pago ($100)', example=100),
-        'cuota1':fields.Float(title='Cuota1', example=0),
-        'cuota2':fields.Float(title='Cuota2', example=0),
-        'cuota3':fields.Float(title='Cuota3', example=0),
-        'cuota4':fields.Float(title='Cuota4', example=0),
-        'cuota5':fields.Float(title='Cuota5', example=0),
-        'cuota6':fields.Float(title='Cuota6', example=0),
-        'total_pagar':fields.Float(title='Total a pagar ($250)', example=250),
-        'total_pagado':fields.Float(title='Total pagado hasta el momento'),
+        'total_pagar':fields.Float(title='Total a pagar'),
+        'entrada':fields.Float(title='Entrada pagada'),
+        'total_cuotas':fields.Float(title='Total pagado en cuotas'),
         'restante_pagar':fields.Float(title='Valor restante por cobrar')
     })
 
-    all_pagos_financiamiento = api.model('AllPagosFinanciamiento', {
-        'success':fields.Nested(pago_financiamiento_item)
+    saldos_financiamiento = api.model('SaldosFinanciamiento', {
+        'success':fields.List(fields.Nested(saldo_financiamiento_item)),
+        'siguiente': nullable(
+            fields.Integer,
+            title='Offset siguiente pagina',
+            description='Offset para obtener la siguiente pagina. null si no existen mas registros'
+        )
     })
 
-    @api.response(200, 'OK', all_pagos_financiamiento)
+    filtros = api.parser()
+    filtros.add_argument('limite', type=inputs.int_range(1, 1000), location='args', default=100, help='N° de servicios por pagina')
+    filtros.add_argument('offset', type=inputs.natural, location='args', default=0, help='N° de servicios a omitir')
+    filtros.add_argument('orden', type=str, location='args', choices=['desc', 'asc'], default='desc', help='Orden por saldo restante')
+    filtros.add_argument('pendientes', type=inputs.boolean, location='args', default=True, help='Solo servicios con saldo por cobrar')
+
+    @api.expect(filtros)
+    @api.response(200, 'OK', saldos_financiamiento)
     @api.response(400, 'Bad Request', error_message)
     @login_required
     def get(self):
         """
-        Obtener lista de todos los pagos de conexion por financiamiento
+        Obtener saldos de financiamiento por servicio
+
+        Calcula el valor restante por cobrar de los financiamientos de conexion de cada servicio
+        (total - entrada - cuotas pagadas) ordenado por saldo.
         """
         try:
-            pagos = PagosConexion.query.filter(
-                PagosConexion.tipo == conexionEnums.financiamiento
-            ).all()
+            args = self.filtros.parse_args()
+            saldos = PagosConexionServices(db.session).get_saldos(
+                args['limite'],
+                offset = args['offset'],
+                ascendente = args['orden'] == 'asc',
+                pendientes = args['pendientes']
+            )
             results = []
-            for item in pagos:
-                item: PagosConexion
-                cuota1 = item.cuota1 if item.cuota1 is not None else 0
-                cuota2 = item.cuota2 if item.cuota2 is not None else 0
-                cuota3 = item.cuota3 if item.cuota3 is not None else 0
-                cuota4 = item.cuota4 if item.cuota4 is not None else 0
-                cuota5 = item.cuota5 if item.cuota5 is not None else 0
-                cuota6 = item.cuota6 if item.cuota6 is not None else 0
-                total_pagar = item.entrada
-                total_pagado = total_pagar+cuota1+cuota2+cuota3+cuota4+cuota5+cuota6
+            for item in saldos:
                 results.append({
-                    'id':item.id,
                     'servicio':{
-                        'id':item.servicio.id,
-                        'n_conexion':item.servicio.n_conexion,
-                        'n_medidor':item.servicio.n_medidor,
-                        'direccion':item.servicio.direccion,
-                        'estado':item.servicio.estado,
-                        'lectura_anterior':item.servicio.lectura_anterior
+                        'id':item.id,
+                        'n_conexion':item.n_conexion,
+                        'n_medidor':item.n_medidor
                     },
                     'cliente':{
-                        'id':item.servicio.cliente.id,
-                        'cedula':item.servicio.cliente.cedula,
-                        'nombres':item.servicio.cliente.nombres,
-                        'apellidos':item.servicio.cliente.apellidos,
-                        'telefono':item.servicio.cliente.telefono
+                        'id':item.id_cliente,
+                        'cedula':item.cedula,
+                        'nombres':item.nombres,
+                        'apellidos':item.apellidos,
+                        'telefono':item.telefono
                     },
-                    'fecha_emision':datetime.datetime.strftime(item.fecha_emision, '%d-%m-%Y'),
-                    'hora_emision':datetime.datetime.strftime(item.fecha_emision, '%H:%M'),
-                    'entrada':item.entrada,
-                    'cuota1':cuota1,
-                    'cuota2':cuota2,
-                    'cuota3':cuota3,
-                    'cuota4':cuota4,
-                    'cuota5':cuota5,
-                    'cuota6':cuota6,
                     'total_pagar':item.total,
-                    'total_pagado':total_pagado,
-                    'restante_pagar':item.total - total_pagado
+                    'entrada':item.entrada,
+                    'total_cuotas':item.pagado,
+                    'restante_pagar':item.saldo
                 })
-            return {'success':results},200
-        except Exception:
-            abort(400, error='No fue posible obtener los registros')
+            siguiente = args['offset'] + len(saldos) if len(saldos) == args['limite'] else None
+            return {'success':results, 'siguiente':siguiente},200
+        except Exception as e:
+            abort(400, error='No fue posible obtener los registros: ' + str(e))
 
 
 # --------------------------------- PUT ---------------------------------------
@@ -255,25 +364,15 @@ class UpdatePagoFinanciamientoCuotas(Resource):
         """
         try:
             data = api.payload
-            cuota1 = data['cuota1']
-            cuota2 = data['cuota2']
-            cuota3 = data['cuota3']
-            cuota4 = data['cuota4']
-            cuota5 = data['cuota5']
-            cuota6 = data['cuota6']
+            valores = [data.get(f'cuota{numero}') or 0 for numero in range(1, CuotasConexion.max_cuotas+1)]
             # buscar pago
             pago: PagosConexion = PagosConexion.query.get(id_pago)
             if pago is None:
                 raise Exception('No existe el registro')
-            total_pagado = pago.entrada+cuota1+cuota2+cuota3+cuota4+cuota5+cuota6
+            total_pagado = pago.entrada + sum(valores)
             if total_pagado > pago.total:
                 raise Exception('Valor sobrepasa el total a pagar')
-            pago.cuota1 = cuota1
-            pago.cuota2 = cuota2
-            pago.cuota3 = cuota3
-            pago.cuota4 = cuota4
-            pago.cuota5 = cuota5
-            pago.cuota6 = cuota6
+            PagosConexionServices(db.session).set_cuotas(pago, valores, datetime.datetime.now())
             db.session.commit()
             return {'success':'Cuotas actualizadas'},200
         except Exception as e:
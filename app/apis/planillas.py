@@ -1,14 +1,18 @@
 from flask_restx import Namespace,Resource,fields,abort
 from flask_login import login_required, current_user
-from sqlalchemy import extract
 from app.libs import db
-from app.models import Planillas,Servicios,Configuracion
+from app.models import Planillas,Servicios,Clientes
 from app.common.api_utils import (
     success_message,
     error_message,
-    item_planilla
+    item_planilla,
+    nullable
 )
 from app.common.logs import LogsServices
+from app.common.tarifas import Tarifa
+from app.common.configuracion import configuracion_cache
+from app.common.facturacion import FacturacionServices
+from app.common.cobros import ResumenCobrosServices
 from app.common.enums import logsCategories
 from datetime import datetime
 
@@ -98,9 +102,25 @@ class GetAllPlanillas(Resource):
         Obtiene todas las planillas emitidas par el servicio seleccionado
         """
         try:
-            servicio = Servicios.query.get(id_servicio)
+            servicio = db.session.query(Servicios.id).filter(Servicios.id == id_servicio).first()
             if servicio is None: raise Exception('No existe el servicio buscado')
-            planillas = Planillas.query.filter_by(id_servicio=id_servicio).order_by(Planillas.id.desc()).all()
+            # Consultar solo las columnas de la planilla sin cargar objetos del ORM
+            planillas = db.session.query(
+                Planillas.id,
+                Planillas.id_servicio,
+                Planillas.fecha_emision,
+                Planillas.consumo_base,
+                Planillas.exedente,
+                Planillas.valor_consumo_base,
+                Planillas.valor_exedente,
+                Planillas.lectura_anterior,
+                Planillas.lectura_actual,
+                Planillas.consumo_total,
+                Planillas.valor_consumo_total,
+                Planillas.pagado
+            ).filter(
+                Planillas.id_servicio == id_servicio
+            ).order_by(Planillas.id.desc()).all()
             results = []
             for item in planillas:
                 results.append({
@@ -140,27 +160,56 @@ class GetPlanilla(Resource):
         Obtener la planilla por su id
         """
         try:
-            planilla = Planillas.query.get(id_planilla)
+            planilla = db.session.query(
+                Planillas.id,
+                Planillas.fecha_emision,
+                Planillas.pagado,
+                Planillas.consumo_base,
+                Planillas.exedente,
+                Planillas.valor_consumo_base,
+                Planillas.valor_exedente,
+                Planillas.lectura_anterior,
+                Planillas.lectura_actual,
+                Planillas.consumo_total,
+                Planillas.valor_consumo_total,
+                Servicios.id.label('id_servicio'),
+                Servicios.n_conexion,
+                Servicios.n_medidor,
+                Servicios.direccion,
+                Servicios.estado,
+                Servicios.lectura_anterior.label('lectura_anterior_servicio'),
+                Clientes.id.label('id_cliente'),
+                Clientes.cedula,
+                Clientes.nombres,
+                Clientes.apellidos,
+                Clientes.telefono
+            ).join(
+                Servicios, Planillas.id_servicio == Servicios.id
+            ).join(
+                Clientes, Servicios.id_cliente == Clientes.id
+            ).filter(
+                Planillas.id == id_planilla
+            ).first()
             if planilla is None:
                 raise Exception('No existe la planilla buscada')
             return {
                 'success':{
                     'id':planilla.id,
                     'servicio':{
-                        'id':planilla.servicio.id,
-                        'n_conexion':planilla.servicio.n_conexion,
-                        'n_medidor':planilla.servicio.n_medidor,
-                        'id_cliente':planilla.servicio.id_cliente,
-                        'direccion':planilla.servicio.direccion,
-                        'estado':planilla.servicio.estado,
-                        'lectura_anterior':planilla.servicio.lectura_anterior
+                        'id':planilla.id_servicio,
+                        'n_conexion':planilla.n_conexion,
+                        'n_medidor':planilla.n_medidor,
+                        'id_cliente':planilla.id_cliente,
+                        'direccion':planilla.direccion,
+                        'estado':planilla.estado,
+                        'lectura_anterior':planilla.lectura_anterior_servicio
                     },
                     'cliente':{
-                        'id':planilla.servicio.cliente.id,
-                        'cedula':planilla.servicio.cliente.cedula,
-                        'nombres':planilla.servicio.cliente.nombres,
-                        'apellidos':planilla.servicio.cliente.apellidos,
-                        'telefono':planilla.servicio.cliente.telefono
+                        'id':planilla.id_cliente,
+                        'cedula':planilla.cedula,
+                        'nombres':planilla.nombres,
+                        'apellidos':planilla.apellidos,
+                        'telefono':planilla.telefono
                     },
                     'fecha_emision':datetime.strftime(planilla.fecha_emision, '%d/%m/%Y'),
                     'pagado':planilla.pagado,
@@ -221,40 +270,37 @@ class NewPlanilla(Resource):
             if lectura_actual < lectura_anterior:
                 raise Exception('Error en las lecturas. Lectura actual es menor a la lectura anterior')
             # Verificar que no se haya emitido una planilla de este mes para ese servicio
+            periodo = Planillas.get_periodo(fecha_emision)
             planilla = Planillas.query.filter(
                 Planillas.id_servicio == servicio.id,
-                extract('month',Planillas.fecha_emision) == fecha_emision.month,
-                extract('year', Planillas.fecha_emision) == fecha_emision.year
+                Planillas.periodo == periodo
             ).first()
             if planilla is not None:
                 raise Exception('Ya se emitio una planilla en este mes para el servicio')
             # Obtener datos de configuracion
-            configuracion = Configuracion.query.first()
+            configuracion = configuracion_cache.get_configuracion()
             if configuracion is None:
                 raise Exception('No existen valores de configuracion')
-            consumo_base = configuracion.consumo_base
-            exedente = configuracion.exedente
-            valor_consumo_base = configuracion.valor_consumo_base
-            valor_exedente = configuracion.valor_exedente
+            tarifa = Tarifa.from_configuracion(configuracion)
             # Calcular consumo total
             consumo_total = lectura_actual - lectura_anterior
-            valor_consumo_total = valor_consumo_base
-            if consumo_total > consumo_base:
-                valor_consumo_total += ((consumo_total-consumo_base)/exedente)*valor_exedente
+            valor_consumo_total = tarifa.calcular(consumo_total)
             # Crear nueva planilla
             new_planilla = Planillas()
             new_planilla.id_servicio = id_servicio
             new_planilla.fecha_emision = fecha_emision
-            new_planilla.consumo_base = consumo_base
-            new_planilla.exedente = exedente
-            new_planilla.valor_consumo_base = valor_consumo_base
-            new_planilla.valor_exedente = valor_exedente
+            new_planilla.periodo = periodo
+            new_planilla.consumo_base = tarifa.consumo_base
+            new_planilla.exedente = tarifa.exedente
+            new_planilla.valor_consumo_base = tarifa.valor_consumo_base
+            new_planilla.valor_exedente = tarifa.valor_exedente
             new_planilla.lectura_anterior = lectura_anterior
             new_planilla.lectura_actual = lectura_actual
             new_planilla.consumo_total = consumo_total
             new_planilla.valor_consumo_total = valor_consumo_total
             new_planilla.pagado = False
             db.session.add(new_planilla)
+            ResumenCobrosServices(db.session).registrar(fecha_emision, False, valor_consumo_total)
             # Actualizar lectura_anterior del servicio
             servicio.lectura_anterior = lectura_actual
             db.session.commit()
@@ -266,6 +312,109 @@ class NewPlanilla(Resource):
             abort(400, error='No fue posible registrar la planilla de pago: ' + str(e))
 
 
+@api.route('/new/lote')
+class NewPlanillasLote(Resource):
+    item_lectura = api.model('Lectura de servicio', {
+        'id_servicio':fields.Integer(
+            required=True,
+            title = 'ID servicio',
+            description='ID del servicio de un usuario'
+        ),
+        'lectura_actual':fields.Integer(
+            required = True,
+            title = 'Lectura actual',
+            description = 'Lectura actual del medidor'
+        )
+    })
+
+    new_planillas = api.model('Nuevas planillas', {
+        'lecturas':fields.List(
+            fields.Nested(item_lectura),
+            required = True,
+            min_items = 1,
+            title = 'Lecturas',
+            description = 'Lista de lecturas de los medidores'
+        )
+    })
+
+    item_resultado = api.model('Resultado de lectura', {
+        'id_servicio':fields.Integer(
+            readonly = True,
+            title = 'ID servicio',
+            description = 'ID del servicio de la lectura'
+        ),
+        'success':nullable(
+            fields.String,
+            readonly = True,
+            title = 'Mensaje',
+            description = 'Mensaje si la planilla fue registrada'
+        ),
+        'error':nullable(
+            fields.String,
+            readonly = True,
+            title = 'Error',
+            description = 'Motivo por el que no se registro la planilla'
+        )
+    })
+
+    resumen_lote = api.model('Resumen lote planillas', {
+        'registradas':fields.Integer(
+            readonly = True,
+            title = 'Planillas registradas'
+        ),
+        'fallidas':fields.Integer(
+            readonly = True,
+            title = 'Lecturas con error'
+        ),
+        'resultados':fields.List(fields.Nested(item_resultado))
+    })
+
+    resultado_lote = api.model('Resultado lote planillas', {
+        'success':fields.Nested(resumen_lote)
+    })
+
+    @api.expect(new_planillas)
+    @api.response(200, 'OK', resultado_lote)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def post(self):
+        """
+        Nuevas planillas de pago por lote
+
+        Registra las planillas de pago de una lista de lecturas de medidores.
+        Se aplican las mismas validaciones que al registrar una planilla individual,
+        una lectura con error no impide el registro de las demas.
+
+        Devuelve el resultado de cada lectura en el mismo orden en que fueron enviadas.
+        """
+        try:
+            data = api.payload
+            lecturas = data['lecturas']
+            fecha_emision = datetime.now()
+            # Obtener datos de configuracion una sola vez para todo el lote
+            configuracion = configuracion_cache.get_configuracion()
+            if configuracion is None:
+                raise Exception('No existen valores de configuracion')
+            tarifa = Tarifa.from_configuracion(configuracion)
+            facturacion = FacturacionServices(db.session)
+            tamano_lote = facturacion.tamano_lote
+            results = []
+            for inicio in range(0, len(lecturas), tamano_lote):
+                lote = lecturas[inicio:inicio + tamano_lote]
+                results.extend(facturacion.registrar_lote(lote, tarifa, fecha_emision))
+            registradas = len([item for item in results if item['success'] is not None])
+            return {
+                'success':{
+                    'registradas':registradas,
+                    'fallidas':len(results) - registradas,
+                    'resultados':results
+                }
+            },200
+        except Exception as e:
+            db.session.rollback()
+            abort(400, error='No fue posible registrar las planillas de pago: ' + str(e))
+
+
 # ------------------------------------- UPDATE --------------------------------------
 @api.route('/update/pago/<int:id_planilla>')
 class UpdatePagoPlanilla(Resource):
@@ -294,6 +443,10 @@ class UpdatePagoPlanilla(Resource):
             if planilla is None:
                 raise Exception('No existe la planilla buscada')
             if planilla.pagado != pagado:
+                # Mover el valor de la planilla al nuevo estado de pago en el resumen de cobros
+                resumen_cobros = ResumenCobrosServices(db.session)
+                resumen_cobros.registrar(planilla.fecha_emision, planilla.pagado, -planilla.valor_consumo_total, -1)
+                resumen_cobros.registrar(planilla.fecha_emision, pagado, planilla.valor_consumo_total)
                 planilla.pagado = pagado
                 db.session.commit()
             return {
@@ -332,7 +485,7 @@ class UpdateLecturaPlanilla(Resource):
             planilla = Planillas.query.get(id_planilla)
             if planilla is None:
                 raise Exception('No existe la planilla buscada')
-            if planilla.fecha_emision.month != fecha_actual.month or planilla.fecha_emision.year != fecha_actual.year:
+            if planilla.periodo != Planillas.get_periodo(fecha_actual):
                 raise Exception('La planilla seleccionada no corresponde al mes en curso')
             if planilla.pagado:
                 raise Exception('La planilla ya ha sido pagada')
@@ -340,9 +493,13 @@ class UpdateLecturaPlanilla(Resource):
                 raise Exception('Error en lecturas. Lectura anterior es menor a nueva lectura')
             # Recalcular costos
             consumo_total = nueva_lectura - planilla.lectura_anterior
-            valor_consumo_total = planilla.valor_consumo_base
-            if consumo_total > planilla.consumo_base:
-                valor_consumo_total += ((consumo_total-planilla.consumo_base)/planilla.exedente)*planilla.valor_exedente
+            valor_consumo_total = Tarifa.from_planilla(planilla).calcular(consumo_total)
+            ResumenCobrosServices(db.session).registrar(
+                planilla.fecha_emision,
+                planilla.pagado,
+                ResumenCobrosServices.redondear(valor_consumo_total) - ResumenCobrosServices.redondear(planilla.valor_consumo_total),
+                0
+            )
             planilla.consumo_total = consumo_total
             planilla.valor_consumo_total = valor_consumo_total
             planilla.lectura_actual = nueva_lectura
@@ -375,8 +532,9 @@ class DeletePlanilla(Resource):
             # Verificar si planilla existe
             if planilla is None: raise Exception('No existe la planilla buscada')
             # Verificar que la planilla no sea del mes en curso
-            if planilla.fecha_emision.month == fecha_actual.month and planilla.fecha_emision.year == fecha_actual.year:
+            if planilla.periodo == Planillas.get_periodo(fecha_actual):
                 planilla.servicio.lectura_anterior = planilla.lectura_anterior
+            ResumenCobrosServices(db.session).registrar(planilla.fecha_emision, planilla.pagado, -planilla.valor_consumo_total, -1)
             db.session.delete(planilla)
             db.session.commit()
             LogsServices(db.session).new_log(logsCategories.planilla_deleted, current_user.id)
@@ -1,6 +1,5 @@
-from flask_restx import Namespace,Resource,fields,abort
+from flask_restx import Namespace,Resource,fields,abort,inputs
 from flask_login import login_required, current_user
-from sqlalchemy import extract
 from app.libs import db
 from app.common.api_utils import (
     success_message,
@@ -8,10 +7,13 @@ from app.common.api_utils import (
     item_servicio,
     item_cliente,
     nullable,
-    is_not_null_empty
+    is_not_null_empty,
+    stream_success
 )
-from app.models import Clientes,Servicios,Planillas,PagosConexion,Configuracion
+from app.models import Clientes,Servicios,Planillas,PagosConexion
 from app.common.logs import LogsServices
+from app.common.configuracion import configuracion_cache
+from app.common.cobros import ResumenCobrosServices
 from app.common.enums import logsCategories,conexionEnums
 from datetime import datetime
 
@@ -20,6 +22,26 @@ api = Namespace('Servicios', description='Endpoints para la gestión de servicio
 
 
 # ----------------------------------- GET -----------------------------------------
+def query_servicios():
+    """
+    Consulta de las columnas de los servicios y si tienen pago de conexion por financiamiento
+    """
+    financiamiento_conexion = db.session.query(PagosConexion.id).filter(
+        PagosConexion.id_servicio == Servicios.id,
+        PagosConexion.tipo == conexionEnums.financiamiento
+    ).exists()
+    return db.session.query(
+        Servicios.id,
+        Servicios.n_conexion,
+        Servicios.n_medidor,
+        Servicios.id_cliente,
+        Servicios.direccion,
+        Servicios.estado,
+        Servicios.lectura_anterior,
+        financiamiento_conexion.label('financiamiento_conexion')
+    )
+
+
 @api.route('/get/all')
 class GetAllServicios(Resource):
     item_estado_servicio = api.model('Estado de pago servicio', {
@@ -76,40 +98,51 @@ class GetAllServicios(Resource):
     @login_required
     def get(self):
         try:
-            servicios = Servicios.query.all()
-            results = []
             current_date = datetime.now()
-            for servicio in servicios:
-                # contar el numero de planillas emitidas en el mes en curso
-                planillas = Planillas.query.filter(
-                    Planillas.id_servicio == servicio.id,
-                    extract('month',Planillas.fecha_emision) == current_date.month,
-                    extract('year', Planillas.fecha_emision) == current_date.year
-                ).count()
-                emitido = True if planillas > 0 else False # verificar si se han emitido planillas en el mes actual
-                # Revisar servicio por financiamiento
-                financiamiento_conexion = PagosConexion.query.filter(
-                    PagosConexion.id_servicio == servicio.id,
-                    PagosConexion.tipo == conexionEnums.financiamiento
-                ).first()
-                results.append({
-                    'id':servicio.id,
-                    'cliente':{
-                        'id':servicio.cliente.id,
-                        'cedula':servicio.cliente.cedula,
-                        'nombres':servicio.cliente.nombres,
-                        'apellidos':servicio.cliente.apellidos,
-                        'telefono':servicio.cliente.telefono
-                    },
-                    'n_conexion':servicio.n_conexion,
-                    'n_medidor':servicio.n_medidor,
-                    'direccion':servicio.direccion,
-                    'estado':servicio.estado,
-                    'lectura_anterior':servicio.lectura_anterior,
-                    'planilla_actual_emitida':emitido,
-                    'financiamiento_conexion': True if financiamiento_conexion is not None else False
-                })
-            return {'success':results},200
+            # Verificar con subconsultas si se han emitido planillas en el mes actual
+            # y si el servicio tiene pago de conexion por financiamiento
+            planilla_emitida = db.session.query(Planillas.id).filter(
+                Planillas.id_servicio == Servicios.id,
+                Planillas.periodo == Planillas.get_periodo(current_date)
+            ).exists()
+            financiamiento_conexion = db.session.query(PagosConexion.id).filter(
+                PagosConexion.id_servicio == Servicios.id,
+                PagosConexion.tipo == conexionEnums.financiamiento
+            ).exists()
+            servicios = db.session.query(
+                Servicios.id,
+                Servicios.n_conexion,
+                Servicios.n_medidor,
+                Servicios.direccion,
+                Servicios.estado,
+                Servicios.lectura_anterior,
+                Clientes.id.label('id_cliente'),
+                Clientes.cedula,
+                Clientes.nombres,
+                Clientes.apellidos,
+                Clientes.telefono,
+                planilla_emitida.label('planilla_actual_emitida'),
+                financiamiento_conexion.label('financiamiento_conexion')
+            ).join(
+                Clientes, Servicios.id_cliente == Clientes.id
+            ).order_by(Servicios.id)
+            return stream_success(servicios, lambda item: {
+                'id':item.id,
+                'cliente':{
+                    'id':item.id_cliente,
+                    'cedula':item.cedula,
+                    'nombres':item.nombres,
+                    'apellidos':item.apellidos,
+                    'telefono':item.telefono
+                },
+                'n_conexion':item.n_conexion,
+                'n_medidor':item.n_medidor,
+                'direccion':item.direccion,
+                'estado':item.estado,
+                'lectura_anterior':item.lectura_anterior,
+                'planilla_actual_emitida':bool(item.planilla_actual_emitida),
+                'financiamiento_conexion':bool(item.financiamiento_conexion)
+            })
         except Exception:
             abort(400, error='No fue posible obtener los registros')
 
@@ -130,16 +163,14 @@ class GetServiciosCliente(Resource):
         Obtener la lista de servicios que tiene un cliente
         """
         try:
-            cliente = Clientes.query.get(id_cliente)
+            cliente = db.session.query(Clientes.id).filter(Clientes.id == id_cliente).first()
             if cliente == None:
                 raise Exception('No existe el cliente')
-            servicios = Servicios.query.filter_by(id_cliente=id_cliente).all()
+            servicios = query_servicios().filter(
+                Servicios.id_cliente == id_cliente
+            ).all()
             results = []
             for item in servicios:
-                financiamiento_conexion = PagosConexion.query.filter(
-                    PagosConexion.id_servicio == item.id,
-                    PagosConexion.tipo == conexionEnums.financiamiento
-                ).first()
                 results.append({
                     'id':item.id,
                     'n_conexion':item.n_conexion,
@@ -148,7 +179,7 @@ class GetServiciosCliente(Resource):
                     'direccion':item.direccion,
                     'estado':item.estado,
                     'lectura_anterior':item.lectura_anterior,
-                    'financiamiento_conexion':True if financiamiento_conexion is not None else False
+                    'financiamiento_conexion':bool(item.financiamiento_conexion)
                 })
             return {
                 'success':results
@@ -173,13 +204,9 @@ class GetServicio(Resource):
         Buscar el servicio por su id
         """
         try:
-            servicio = Servicios.query.get(id_servicio)
+            servicio = query_servicios().filter(Servicios.id == id_servicio).first()
             if servicio is None:
                 raise Exception('No existe el servicio buscado')
-            financiamiento_conexion = PagosConexion.query.filter(
-                PagosConexion.id_servicio == id_servicio,
-                PagosConexion.tipo == conexionEnums.financiamiento
-            ).first()
             results = {
                 'id':servicio.id,
                 'n_conexion':servicio.n_conexion,
@@ -188,7 +215,7 @@ class GetServicio(Resource):
                 'direccion':servicio.direccion,
                 'estado':servicio.estado,
                 'lectura_anterior':servicio.lectura_anterior,
-                'financiamiento_conexion':True if financiamiento_conexion is not None else False
+                'financiamiento_conexion':bool(servicio.financiamiento_conexion)
             }
             return {
                 'success':results
@@ -197,6 +224,72 @@ class GetServicio(Resource):
             abort(400, error='No fue posible obtener la información: ' + str(e))
 
 
+@api.route('/buscar')
+class BuscarServicio(Resource):
+    servicio_cliente = api.inherit('Servicio cliente', item_servicio, {
+        'cliente':fields.Nested(item_cliente)
+    })
+
+    info_servicio_cliente = api.model('Información de servicio y cliente', {
+        'success':fields.Nested(servicio_cliente)
+    })
+
+    filtros = api.parser()
+    filtros.add_argument('n_conexion', type=inputs.natural, location='args', help='Número de conexión del servicio')
+    filtros.add_argument('n_medidor', type=inputs.natural, location='args', help='Número de medidor del servicio')
+
+    @api.expect(filtros)
+    @api.response(200, 'OK', info_servicio_cliente)
+    @api.response(400, 'Bad Request', error_message)
+    @login_required
+    def get(self):
+        """
+        Buscar un servicio por número de conexión o de medidor
+
+        Devuelve el servicio junto a su cliente
+        """
+        try:
+            args = self.filtros.parse_args()
+            if args['n_conexion'] is None and args['n_medidor'] is None:
+                raise Exception('Debe enviar el número de conexión o de medidor')
+            query = query_servicios().add_columns(
+                Clientes.cedula,
+                Clientes.nombres,
+                Clientes.apellidos,
+                Clientes.telefono
+            ).join(
+                Clientes, Servicios.id_cliente == Clientes.id
+            )
+            if args['n_conexion'] is not None:
+                query = query.filter(Servicios.n_conexion == args['n_conexion'])
+            if args['n_medidor'] is not None:
+                query = query.filter(Servicios.n_medidor == args['n_medidor'])
+            servicio = query.first()
+            if servicio is None:
+                raise Exception('No existe el servicio buscado')
+            return {
+                'success':{
+                    'id':servicio.id,
+                    'n_conexion':servicio.n_conexion,
+                    'n_medidor':servicio.n_medidor,
+                    'id_cliente':servicio.id_cliente,
+                    'direccion':servicio.direccion,
+                    'estado':servicio.estado,
+                    'lectura_anterior':servicio.lectura_anterior,
+                    'financiamiento_conexion':bool(servicio.financiamiento_conexion),
+                    'cliente':{
+                        'id':servicio.id_cliente,
+                        'cedula':servicio.cedula,
+                        'nombres':servicio.nombres,
+                        'apellidos':servicio.apellidos,
+                        'telefono':servicio.telefono
+                    }
+                }
+            },200
+        except Exception as e:
+            abort(400, error='No fue posible obtener la información: ' + str(e))
+
+
 # -------------------------------------- NEW --------------------------------------
 @api.route('/new')
 class NewServicio(Resource):
@@ -438,7 +531,9 @@ class UpdateServicioEstado(Resource):
             if servicio is None:
                 raise Exception('No existe el servicio buscado')
             if estado and not servicio.estado:
-                configuracion: Configuracion = Configuracion.query.first()
+                configuracion = configuracion_cache.get_configuracion()
+                if configuracion is None:
+                    raise Exception('No existen valores de configuracion')
                 new_pago_reconexion = PagosConexion()
                 new_pago_reconexion.tipo = conexionEnums.reconexion
                 new_pago_reconexion.id_servicio = servicio.id
@@ -471,6 +566,7 @@ class DeleteServicio(Resource):
         try:
             servicio = Servicios.query.get(id_servicio)
             if servicio is None: raise Exception('No existe el servicio buscado')
+            ResumenCobrosServices(db.session).quitar_servicios([servicio.id])
             db.session.delete(servicio)
             db.session.commit()
             LogsServices(db.session).new_log(logsCategories.servicio_deleted, current_user.id)
@@ -478,5 +574,6 @@ class DeleteServicio(Resource):
                 'success':'Servicio eliminado'
             },200
         except Exception as e:
+            db.session.rollback()
             abort(400, error='No fue posible eliminar el servicio: ' + str(e))
 
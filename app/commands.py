@@ -0,0 +1,343 @@
+import click
+import json
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import inspect, extract, text, update, func, and_
+from app.libs import db
+from app.models import Planillas, Configuracion, CuotasConexion, Clientes, FacturacionJobs, ResumenCobrosDia, ResumenCobrosMes
+from app.common.facturacion import FacturacionServices
+from app.common.cobros import ResumenCobrosServices
+from app.common.logs import LogsServices
+from app.common.notificaciones import NotificacionesServices
+from app.common.enums import logsCategories
+
+
+# --------------------------------- PLANILLAS ---------------------------------
+planillas_cli = AppGroup('planillas', help='Comandos de mantenimiento de planillas')
+
+
+@planillas_cli.command('backfill-periodo')
+def backfill_periodo():
+    """
+    Agrega la columna periodo (YYYYMM) a las planillas existentes y crea sus indices
+    """
+    inspector = inspect(db.engine)
+    columnas = [columna['name'] for columna in inspector.get_columns(Planillas.__tablename__)]
+    if 'periodo' not in columnas:
+        db.session.execute(text('ALTER TABLE planillas ADD COLUMN periodo INTEGER NULL'))
+        db.session.commit()
+        click.echo('Columna periodo agregada')
+    # Calcular el periodo de las planillas que aun no lo tienen
+    result = db.session.execute(
+        db.update(Planillas).where(
+            Planillas.periodo.is_(None)
+        ).values(
+            periodo=extract('year', Planillas.fecha_emision)*100 + extract('month', Planillas.fecha_emision)
+        )
+    )
+    db.session.commit()
+    click.echo(f'Planillas actualizadas: {result.rowcount}')
+    if db.engine.dialect.name == 'mysql':
+        db.session.execute(text('ALTER TABLE planillas MODIFY periodo INTEGER NOT NULL'))
+        db.session.commit()
+    # Verificar que no existan planillas duplicadas antes de crear el indice unico (id_servicio, periodo)
+    duplicados = db.session.query(
+        Planillas.id_servicio,
+        Planillas.periodo
+    ).group_by(
+        Planillas.id_servicio,
+        Planillas.periodo
+    ).having(func.count(Planillas.id) > 1).subquery()
+    planillas = db.session.query(
+        Planillas.id,
+        Planillas.id_servicio,
+        Planillas.periodo
+    ).join(
+        duplicados,
+        and_(Planillas.id_servicio == duplicados.c.id_servicio, Planillas.periodo == duplicados.c.periodo)
+    ).order_by(Planillas.id_servicio, Planillas.periodo, Planillas.id).all()
+    if len(planillas) > 0:
+        conflictos = {}
+        for item in planillas:
+            conflictos.setdefault((item.id_servicio, item.periodo), []).append(str(item.id))
+        for (id_servicio, periodo), ids in conflictos.items():
+            click.echo(f'Servicio {id_servicio}, periodo {periodo}: planillas {", ".join(ids)}')
+        raise click.ClickException('Existen planillas duplicadas por servicio y periodo. Elimine los duplicados antes de crear los indices')
+    # Crear los indices que aun no existan
+    indices = [indice['name'] for indice in inspector.get_indexes(Planillas.__tablename__)]
+    for indice in Planillas.__table__.indexes:
+        if indice.name not in indices:
+            indice.create(db.engine)
+            click.echo(f'Indice {indice.name} creado')
+
+
+@planillas_cli.command('rebuild-resumen')
+def rebuild_resumen():
+    """
+    Crea las tablas del resumen de cobros que aun no existan y recalcula el resumen
+    por dia y por mes desde las planillas
+    """
+    inspector = inspect(db.engine)
+    for model in [ResumenCobrosDia, ResumenCobrosMes]:
+        if not inspector.has_table(model.__tablename__):
+            model.__table__.create(db.engine)
+            click.echo(f'Tabla {model.__tablename__} creada')
+        elif db.engine.dialect.name == 'mysql':
+            # Los totales se guardan como DECIMAL para evitar errores de redondeo acumulados
+            db.session.execute(text(f'ALTER TABLE {model.__tablename__} MODIFY total DECIMAL(10,2) NOT NULL DEFAULT 0'))
+            db.session.commit()
+    ResumenCobrosServices(db.session).rebuild()
+    click.echo('Resumen de cobros recalculado')
+
+
+# --------------------------------- CLIENTES ----------------------------------
+clientes_cli = AppGroup('clientes', help='Comandos de mantenimiento de clientes')
+
+
+@clientes_cli.command('backfill-busqueda')
+@click.option('--lote', type=click.IntRange(min=1), default=1000, help='N° de clientes por transaccion')
+def backfill_busqueda(lote):
+    """
+    Agrega las columnas de busqueda de nombres y apellidos a los clientes existentes y crea sus indices
+    """
+    inspector = inspect(db.engine)
+    columnas = [columna['name'] for columna in inspector.get_columns(Clientes.__tablename__)]
+    for columna in ['nombres_busqueda', 'apellidos_busqueda']:
+        if columna not in columnas:
+            db.session.execute(text(f'ALTER TABLE clientes ADD COLUMN {columna} VARCHAR(50) NULL'))
+            db.session.commit()
+            click.echo(f'Columna {columna} agregada')
+    # Normalizar los nombres y apellidos por lotes
+    actualizados = 0
+    ultimo_id = 0
+    while True:
+        clientes = db.session.query(
+            Clientes.id,
+            Clientes.nombres,
+            Clientes.apellidos
+        ).filter(
+            Clientes.id > ultimo_id
+        ).order_by(Clientes.id).limit(lote).all()
+        if len(clientes) == 0:
+            break
+        ultimo_id = clientes[-1].id
+        db.session.execute(update(Clientes), [
+            {
+                'id':item.id,
+                'nombres_busqueda':Clientes.normalizar(item.nombres),
+                'apellidos_busqueda':Clientes.normalizar(item.apellidos)
+            } for item in clientes
+        ])
+        db.session.commit()
+        actualizados += len(clientes)
+    click.echo(f'Clientes actualizados: {actualizados}')
+    if db.engine.dialect.name == 'mysql':
+        db.session.execute(text('ALTER TABLE clientes MODIFY nombres_busqueda VARCHAR(50) NOT NULL'))
+        db.session.execute(text('ALTER TABLE clientes MODIFY apellidos_busqueda VARCHAR(50) NOT NULL'))
+        db.session.commit()
+    # Crear los indices que aun no existan
+    indices = [indice['name'] for indice in inspector.get_indexes(Clientes.__tablename__)]
+    for indice in Clientes.__table__.indexes:
+        if indice.name not in indices:
+            indice.create(db.engine)
+            click.echo(f'Indice {indice.name} creado')
+
+
+# -------------------------------- FACTURACION --------------------------------
+facturacion_cli = AppGroup('facturacion', help='Comandos de la facturacion mensual')
+
+
+@facturacion_cli.command('resume')
+def resume_facturacion():
+    """
+    Reanuda los procesos de facturacion que no han finalizado
+    """
+    facturacion = FacturacionServices(db.session)
+    for id_job in facturacion.get_jobs_pendientes():
+        if not facturacion.procesar_job(id_job):
+            click.echo(f'Proceso {id_job}: en ejecucion por otro proceso')
+            continue
+        resumen = facturacion.get_resumen_job(id_job)
+        click.echo(f"Proceso {id_job}: {resumen['registradas']} registradas, {resumen['fallidas']} fallidas")
+
+
+@facturacion_cli.command('migrate-jobs')
+def migrate_jobs():
+    """
+    Agrega a los procesos de facturacion existentes las columnas de fecha de emision y de ejecucion.
+    Los procesos existentes toman su fecha de creacion como fecha de emision.
+    """
+    inspector = inspect(db.engine)
+    columnas = [columna['name'] for columna in inspector.get_columns(FacturacionJobs.__tablename__)]
+    nuevas = {
+        'fecha_emision':'DATETIME NULL',
+        'ejecutor':'VARCHAR(32) NULL',
+        'fecha_actividad':'DATETIME NULL'
+    }
+    for columna, tipo in nuevas.items():
+        if columna not in columnas:
+            db.session.execute(text(f'ALTER TABLE facturacion_jobs ADD COLUMN {columna} {tipo}'))
+            db.session.commit()
+            click.echo(f'Columna {columna} agregada')
+    result = db.session.execute(
+        update(FacturacionJobs).where(
+            FacturacionJobs.fecha_emision.is_(None)
+        ).values(
+            fecha_emision=FacturacionJobs.fecha_creacion
+        )
+    )
+    db.session.commit()
+    click.echo(f'Procesos actualizados: {result.rowcount}')
+    if db.engine.dialect.name == 'mysql':
+        db.session.execute(text('ALTER TABLE facturacion_jobs MODIFY fecha_emision DATETIME NOT NULL'))
+        db.session.commit()
+
+
+# ------------------------------- CONFIGURACION -------------------------------
+configuracion_cli = AppGroup('configuracion', help='Comandos de mantenimiento de la configuracion')
+
+
+@configuracion_cli.command('add-version')
+def add_version():
+    """
+    Agrega la columna version a la configuracion existente
+    """
+    inspector = inspect(db.engine)
+    columnas = [columna['name'] for columna in inspector.get_columns(Configuracion.__tablename__)]
+    if 'version' in columnas:
+        click.echo('La columna version ya existe')
+        return
+    db.session.execute(text('ALTER TABLE configuracion ADD COLUMN version INTEGER NOT NULL DEFAULT 1'))
+    db.session.commit()
+    click.echo('Columna version agregada')
+
+
+# --------------------------------- INDICES -----------------------------------
+indices_cli = AppGroup('indices', help='Comandos de mantenimiento de indices')
+
+
+@indices_cli.command('create')
+def create_indices():
+    """
+    Crea los indices definidos en los modelos que aun no existen en la DB
+    """
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        indices = [indice['name'] for indice in inspector.get_indexes(table.name)]
+        for indice in table.indexes:
+            if indice.name not in indices:
+                indice.create(db.engine)
+                click.echo(f'Indice {indice.name} creado')
+
+
+# ----------------------------------- LOGS ------------------------------------
+logs_cli = AppGroup('logs', help='Comandos de mantenimiento de logs')
+
+
+@logs_cli.command('purge')
+def purge_logs():
+    """
+    Elimina los logs que superan los dias de retencion de su categoria
+    """
+    eliminados = LogsServices(db.session).delete_old_logs(
+        current_app.config['LOGS_RETENTION'],
+        current_app.config['LOGS_RETENTION_DEFAULT'],
+        current_app.config['LOGS_PURGE_BATCH_SIZE']
+    )
+    click.echo(f'Logs eliminados: {eliminados}')
+
+
+@logs_cli.command('archive')
+def archive_logs():
+    """
+    Archiva en archivos gzip mensuales los logs que superan los dias de retencion y los elimina
+    """
+    archivados = LogsServices(db.session).archive_old_logs(
+        current_app.config['LOGS_ARCHIVE_DIR'],
+        current_app.config['LOGS_RETENTION'],
+        current_app.config['LOGS_RETENTION_DEFAULT'],
+        current_app.config['LOGS_PURGE_BATCH_SIZE']
+    )
+    click.echo(f'Logs archivados: {archivados}')
+
+
+@logs_cli.command('read-archive')
+@click.argument('mes')
+@click.option('--categoria', type=click.Choice([item.value for item in logsCategories]), default=None)
+def read_archive(mes, categoria):
+    """
+    Muestra los logs archivados de un mes (YYYY-MM) en formato JSONL
+    """
+    logs = LogsServices(db.session).read_archive(
+        current_app.config['LOGS_ARCHIVE_DIR'],
+        mes,
+        logsCategories(categoria) if categoria is not None else None
+    )
+    for log in logs:
+        click.echo(json.dumps(log))
+
+
+# ------------------------------- PAGOS CONEXION -------------------------------
+pagos_cli = AppGroup('pagos', help='Comandos de mantenimiento de pagos de conexion')
+
+
+@pagos_cli.command('migrate-cuotas')
+def migrate_cuotas():
+    """
+    Migra las columnas cuota1..cuota6 de los pagos de conexion a la tabla cuotas_conexion
+    y elimina las columnas. Las cuotas migradas toman la fecha de emision del pago.
+
+    Debe ejecutarse antes de que la nueva version atienda peticiones: el modelo ya no incluye
+    las columnas cuota1..cuota6 y los pagos nuevos se registran en cuotas_conexion.
+    Como primer paso las columnas reciben DEFAULT 0 para que los pagos registrados durante
+    la migracion, o despues de una migracion interrumpida, no fallen.
+    """
+    inspector = inspect(db.engine)
+    if not inspector.has_table(CuotasConexion.__tablename__):
+        CuotasConexion.__table__.create(db.engine)
+        click.echo('Tabla cuotas_conexion creada')
+    columnas = [columna['name'] for columna in inspector.get_columns('pagos_conexion')]
+    cuotas = [numero for numero in range(1, CuotasConexion.max_cuotas+1) if f'cuota{numero}' in columnas]
+    if len(cuotas) == 0:
+        click.echo('Las cuotas ya fueron migradas')
+        return
+    if db.engine.dialect.name == 'mysql':
+        db.session.execute(text(
+            'ALTER TABLE pagos_conexion ' + ', '.join(f'MODIFY cuota{numero} FLOAT NOT NULL DEFAULT 0' for numero in cuotas)
+        ))
+        db.session.commit()
+        click.echo('Columnas cuota1..cuota6 con valor por defecto 0')
+    migradas = 0
+    for numero in cuotas:
+        result = db.session.execute(text(
+            f'INSERT INTO cuotas_conexion (id_pago, numero, valor, fecha_pago) '
+            f'SELECT p.id, :numero, p.cuota{numero}, p.fecha_emision FROM pagos_conexion p '
+            f'WHERE p.cuota{numero} > 0 AND NOT EXISTS ('
+            f'SELECT 1 FROM cuotas_conexion c WHERE c.id_pago = p.id AND c.numero = :numero)'
+        ), {'numero':numero})
+        migradas += result.rowcount
+    db.session.commit()
+    click.echo(f'Cuotas migradas: {migradas}')
+    for numero in cuotas:
+        db.session.execute(text(f'ALTER TABLE pagos_conexion DROP COLUMN cuota{numero}'))
+    db.session.commit()
+    click.echo('Columnas cuota1..cuota6 eliminadas')
+
+
+# ------------------------------- NOTIFICACIONES -------------------------------
+notificaciones_cli = AppGroup('notificaciones', help='Comandos de mantenimiento de notificaciones')
+
+
+@notificaciones_cli.command('purge')
+@click.option('--dias', type=click.IntRange(min=0), default=None, help='Antigüedad minima en dias')
+def purge_notificaciones(dias):
+    """
+    Elimina por lotes las notificaciones pagadas
+    """
+    eliminadas = NotificacionesServices(db.session).delete_pagadas(
+        current_app.config.get('NOTIFICACIONES_PURGE_BATCH_SIZE', 1000),
+        dias=dias
+    )
+    click.echo(f'Notificaciones eliminadas: {eliminadas}')
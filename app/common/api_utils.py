@@ -1,5 +1,10 @@
+from flask import Response, stream_with_context, current_app
 from flask_restx import fields
 from app.libs import api
+from datetime import datetime, date
+import base64
+import itertools
+import json
 
 
 # ----------------------------- CLASES --------------------------------
@@ -17,6 +22,62 @@ def nullable(fld, *args, **kwargs):
 
 
 # ------------------------------ FUNCIONES ------------------------------
+# Funcion para codificar los valores de la ultima fila de una pagina como cursor
+def encode_cursor(*values) -> str:
+    data = [value.isoformat() if isinstance(value, (datetime, date)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+# Funcion para decodificar un cursor generado con encode_cursor
+def decode_cursor(cursor: str) -> list:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise Exception('Cursor de paginación inválido')
+
+
+# Funcion para enviar el resultado de una consulta como {"success":[...]} por partes
+def stream_success(query, proyeccion, tamano_lote: int = 500, **extra) -> Response:
+    """
+    Lee la consulta con un cursor del lado del servidor en lotes de tamano_lote filas
+    y escribe cada lote convertido con proyeccion(fila) -> dict sin cargar todos los registros.
+    Los argumentos extra se agregan como claves adicionales despues de la lista.
+    El primer lote se lee antes de crear la respuesta, por lo que los errores de la consulta
+    o de la proyeccion se propagan a quien la invoca. Si la lectura falla despues de enviar
+    el estado de la respuesta, el JSON termina con la clave "error" en lugar de las claves extra.
+    """
+    filas = iter(query.yield_per(tamano_lote))
+    try:
+        primer_lote = [json.dumps(proyeccion(item)) for item in itertools.islice(filas, tamano_lote)]
+    except Exception:
+        filas.close()
+        raise
+
+    def generar():
+        yield '{"success":[' + ','.join(primer_lote)
+        separador = ',' if len(primer_lote) > 0 else ''
+        lote = []
+        try:
+            for item in filas:
+                lote.append(json.dumps(proyeccion(item)))
+                if len(lote) == tamano_lote:
+                    yield separador + ','.join(lote)
+                    separador = ','
+                    lote = []
+            if len(lote) > 0:
+                yield separador + ','.join(lote)
+        except Exception:
+            # El estado de la respuesta ya fue enviado, se indica el error en el cuerpo
+            current_app.logger.exception('Error al enviar la respuesta por partes')
+            yield '],"error":' + json.dumps('No fue posible obtener todos los registros') + '}'
+            return
+        finally:
+            # Liberar el cursor si la lectura se interrumpe
+            filas.close()
+        yield ']' + ''.join(f',{json.dumps(clave)}:{json.dumps(valor)}' for clave, valor in extra.items()) + '}'
+    return Response(stream_with_context(generar()), mimetype='application/json')
+
+
 # Funcion para verificar si la variable es nula o se encuentra vacia
 def is_not_null_empty(variable):
     if type(variable) is int:
@@ -0,0 +1,153 @@
+from sqlalchemy import or_, and_, case, func, select
+from sqlalchemy.orm import Session
+from app.models import Clientes, Servicios, Planillas, Notificaciones, PagosConexion, CuotasConexion
+from app.common.enums import conexionEnums
+
+
+class ClientesServices():
+    def __init__(self, db: Session):
+        self.db = db
+
+    def buscar(self, texto: str, limite: int) -> list:
+        """
+        Busca clientes cuya cedula, nombres o apellidos empiecen por el texto, sin distinguir
+        mayusculas ni tildes. Un texto de varias palabras tambien busca nombres que empiecen
+        por la primera palabra y apellidos por el resto, o al reves.
+        Los resultados se ordenan por coincidencia: cedula, apellidos y nombres.
+        """
+        texto = Clientes.normalizar(texto)
+        if texto is None or texto == '':
+            return []
+        palabras = texto.split()
+        texto = ' '.join(palabras)
+        condiciones = [
+            Clientes.cedula.startswith(texto, autoescape=True),
+            Clientes.apellidos_busqueda.startswith(texto, autoescape=True),
+            Clientes.nombres_busqueda.startswith(texto, autoescape=True)
+        ]
+        if len(palabras) > 1:
+            primera = palabras[0]
+            resto = ' '.join(palabras[1:])
+            condiciones.append(and_(
+                Clientes.nombres_busqueda.startswith(primera, autoescape=True),
+                Clientes.apellidos_busqueda.startswith(resto, autoescape=True)
+            ))
+            condiciones.append(and_(
+                Clientes.apellidos_busqueda.startswith(primera, autoescape=True),
+                Clientes.nombres_busqueda.startswith(resto, autoescape=True)
+            ))
+        rango = case(
+            (Clientes.cedula == texto, 0),
+            (Clientes.cedula.startswith(texto, autoescape=True), 1),
+            (Clientes.apellidos_busqueda == texto, 2),
+            (Clientes.apellidos_busqueda.startswith(texto, autoescape=True), 3),
+            (Clientes.nombres_busqueda.startswith(texto, autoescape=True), 4),
+            else_=5
+        )
+        return self.db.query(
+            Clientes.id,
+            Clientes.cedula,
+            Clientes.nombres,
+            Clientes.apellidos,
+            Clientes.telefono
+        ).filter(
+            or_(*condiciones)
+        ).order_by(
+            rango,
+            Clientes.apellidos_busqueda,
+            Clientes.nombres_busqueda,
+            Clientes.id
+        ).limit(limite).all()
+
+    def get_estado_cuenta(self, id_cliente: int) -> tuple:
+        """
+        Obtiene el estado de cuenta del cliente en un numero fijo de consultas:
+        el cliente, sus servicios con los totales adeudados calculados en la DB,
+        sus planillas sin pagar y sus notificaciones pendientes.
+        """
+        cliente = self.db.get(Clientes, id_cliente)
+        if cliente is None:
+            raise Exception('No existe el cliente')
+        deuda_planillas = select(
+            func.coalesce(func.sum(Planillas.valor_consumo_total), 0)
+        ).where(
+            Planillas.id_servicio == Servicios.id,
+            Planillas.pagado == False
+        ).scalar_subquery()
+        deuda_notificaciones = select(
+            func.coalesce(func.sum(Notificaciones.total), 0)
+        ).where(
+            Notificaciones.id_servicio == Servicios.id,
+            Notificaciones.pagado == False
+        ).scalar_subquery()
+        # Totales de los financiamientos de conexion de los servicios del cliente en una sola
+        # subconsulta: primero por pago con sus cuotas pagadas y luego por servicio
+        pagos_financiamiento = select(
+            PagosConexion.id_servicio,
+            PagosConexion.total,
+            PagosConexion.entrada,
+            func.coalesce(func.sum(CuotasConexion.valor), 0).label('cuotas')
+        ).join(
+            Servicios, PagosConexion.id_servicio == Servicios.id
+        ).outerjoin(
+            CuotasConexion, CuotasConexion.id_pago == PagosConexion.id
+        ).where(
+            Servicios.id_cliente == id_cliente,
+            PagosConexion.tipo == conexionEnums.financiamiento
+        ).group_by(
+            PagosConexion.id,
+            PagosConexion.id_servicio,
+            PagosConexion.total,
+            PagosConexion.entrada
+        ).subquery()
+        financiamiento = select(
+            pagos_financiamiento.c.id_servicio,
+            func.count().label('financiamientos'),
+            func.sum(pagos_financiamiento.c.total).label('total'),
+            func.sum(pagos_financiamiento.c.entrada).label('entrada'),
+            func.sum(pagos_financiamiento.c.cuotas).label('cuotas')
+        ).group_by(pagos_financiamiento.c.id_servicio).subquery()
+        servicios = self.db.query(
+            Servicios.id,
+            Servicios.n_conexion,
+            Servicios.n_medidor,
+            Servicios.direccion,
+            Servicios.estado,
+            Servicios.lectura_anterior,
+            deuda_planillas.label('deuda_planillas'),
+            deuda_notificaciones.label('deuda_notificaciones'),
+            func.coalesce(financiamiento.c.financiamientos, 0).label('financiamientos'),
+            func.coalesce(financiamiento.c.total, 0).label('total_financiamiento'),
+            func.coalesce(financiamiento.c.entrada, 0).label('entrada_financiamiento'),
+            func.coalesce(financiamiento.c.cuotas, 0).label('cuotas_financiamiento')
+        ).outerjoin(
+            financiamiento, financiamiento.c.id_servicio == Servicios.id
+        ).filter(
+            Servicios.id_cliente == id_cliente
+        ).order_by(Servicios.id).all()
+        planillas = self.db.query(
+            Planillas.id,
+            Planillas.id_servicio,
+            Planillas.fecha_emision,
+            Planillas.lectura_anterior,
+            Planillas.lectura_actual,
+            Planillas.consumo_total,
+            Planillas.valor_consumo_total
+        ).join(
+            Servicios, Planillas.id_servicio == Servicios.id
+        ).filter(
+            Servicios.id_cliente == id_cliente,
+            Planillas.pagado == False
+        ).order_by(Planillas.id_servicio, Planillas.fecha_emision).all()
+        notificaciones = self.db.query(
+            Notificaciones.id,
+            Notificaciones.id_servicio,
+            Notificaciones.fecha_emision,
+            Notificaciones.total
+        ).join(
+            Servicios, Notificaciones.id_servicio == Servicios.id
+        ).filter(
+            Servicios.id_cliente == id_cliente,
+            Notificaciones.pagado == False
+        ).order_by(Notificaciones.id_servicio, Notificaciones.fecha_emision).all()
+        return cliente, servicios, planillas, notificaciones
@@ -0,0 +1,118 @@
+from sqlalchemy import func, delete, insert, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+from app.models import Planillas, Servicios, ResumenCobrosDia, ResumenCobrosMes
+from datetime import datetime, date
+
+
+class ResumenCobrosServices():
+    """
+    Mantiene el resumen de cobros de planillas por dia y por mes.
+    Los valores de cada planilla se redondean a centavos antes de acumularse, igual que en rebuild.
+    Los cambios se ejecutan en la transaccion de la sesion, quien lo invoca confirma la transaccion.
+    """
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def redondear(valor: float) -> float:
+        return round(valor, 2)
+
+    def upsert(self, model, keys: dict, total: float, cantidad: int) -> None:
+        dialect = self.db.get_bind().dialect.name
+        values = {**keys, 'total':self.redondear(total), 'cantidad':cantidad}
+        if dialect == 'mysql':
+            stmt = mysql.insert(model).values(**values)
+            stmt = stmt.on_duplicate_key_update(
+                total=model.total + stmt.inserted.total,
+                cantidad=model.cantidad + stmt.inserted.cantidad
+            )
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(model).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(keys.keys()),
+                set_={
+                    'total':model.total + stmt.excluded.total,
+                    'cantidad':model.cantidad + stmt.excluded.cantidad
+                }
+            )
+        else:
+            raise Exception('Motor de base de datos no soportado para el resumen de cobros')
+        self.db.execute(stmt)
+        # Eliminar el registro cuando ya no tiene planillas, igual que en rebuild
+        if cantidad < 0:
+            self.db.execute(delete(model).filter_by(**keys).where(model.cantidad <= 0))
+
+    def registrar(self, fecha_emision: date, pagado: bool, total: float, cantidad: int = 1) -> None:
+        fecha = fecha_emision.date() if isinstance(fecha_emision, datetime) else fecha_emision
+        self.upsert(ResumenCobrosDia, {'fecha':fecha, 'pagado':pagado}, total, cantidad)
+        self.upsert(ResumenCobrosMes, {'periodo':Planillas.get_periodo(fecha), 'pagado':pagado}, total, cantidad)
+
+    def registrar_planillas(self, planillas: list) -> None:
+        # Agrupar las planillas por dia y estado de pago antes de actualizar el resumen
+        grupos = {}
+        for item in planillas:
+            key = (item['fecha_emision'].date(), item['pagado'])
+            total, cantidad = grupos.get(key, (0, 0))
+            grupos[key] = (total + self.redondear(item['valor_consumo_total']), cantidad + 1)
+        for (fecha_emision, pagado), (total, cantidad) in grupos.items():
+            self.registrar(fecha_emision, pagado, total, cantidad)
+
+    def quitar_servicios(self, ids_servicios: list) -> None:
+        """
+        Descuenta del resumen las planillas de los servicios que van a ser eliminados
+        """
+        grupos = self.db.query(
+            func.date(Planillas.fecha_emision).label('fecha'),
+            Planillas.periodo,
+            Planillas.pagado,
+            func.sum(func.round(Planillas.valor_consumo_total, 2)).label('total'),
+            func.count(Planillas.id).label('cantidad')
+        ).filter(
+            Planillas.id_servicio.in_(ids_servicios)
+        ).group_by(
+            func.date(Planillas.fecha_emision),
+            Planillas.periodo,
+            Planillas.pagado
+        ).all()
+        for item in grupos:
+            fecha = item.fecha if not isinstance(item.fecha, str) else datetime.strptime(item.fecha, '%Y-%m-%d').date()
+            self.upsert(ResumenCobrosDia, {'fecha':fecha, 'pagado':item.pagado}, -item.total, -item.cantidad)
+            self.upsert(ResumenCobrosMes, {'periodo':item.periodo, 'pagado':item.pagado}, -item.total, -item.cantidad)
+
+    def quitar_cliente(self, id_cliente: int) -> None:
+        ids_servicios = [item.id for item in self.db.query(Servicios.id).filter(
+            Servicios.id_cliente == id_cliente
+        ).all()]
+        if len(ids_servicios) > 0:
+            self.quitar_servicios(ids_servicios)
+
+    def rebuild(self) -> None:
+        """
+        Recalcula el resumen de cobros desde las planillas registradas
+        """
+        try:
+            self.db.execute(delete(ResumenCobrosDia))
+            self.db.execute(delete(ResumenCobrosMes))
+            self.db.execute(insert(ResumenCobrosDia).from_select(
+                ['fecha', 'pagado', 'total', 'cantidad'],
+                select(
+                    func.date(Planillas.fecha_emision),
+                    Planillas.pagado,
+                    func.sum(func.round(Planillas.valor_consumo_total, 2)),
+                    func.count(Planillas.id)
+                ).group_by(func.date(Planillas.fecha_emision), Planillas.pagado)
+            ))
+            self.db.execute(insert(ResumenCobrosMes).from_select(
+                ['periodo', 'pagado', 'total', 'cantidad'],
+                select(
+                    Planillas.periodo,
+                    Planillas.pagado,
+                    func.sum(func.round(Planillas.valor_consumo_total, 2)),
+                    func.count(Planillas.id)
+                ).group_by(Planillas.periodo, Planillas.pagado)
+            ))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise Exception('No fue posible recalcular el resumen de cobros')
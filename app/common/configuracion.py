@@ -0,0 +1,67 @@
+from flask import g
+from threading import Lock
+from app.libs import db
+from app.models import Configuracion
+
+
+class ConfiguracionActual():
+    __slots__ = ('consumo_base', 'exedente', 'valor_consumo_base', 'valor_exedente', 'reconexion', 'version')
+
+    def __init__(self, configuracion: Configuracion):
+        self.consumo_base = configuracion.consumo_base
+        self.exedente = configuracion.exedente
+        self.valor_consumo_base = configuracion.valor_consumo_base
+        self.valor_exedente = configuracion.valor_exedente
+        self.reconexion = configuracion.reconexion
+        self.version = configuracion.version
+
+
+class ConfiguracionCache():
+    """
+    Cache en memoria del proceso de la configuracion actual.
+    La version guardada en la DB se consulta una vez por request para detectar
+    los cambios realizados desde otros procesos.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.configuracion: ConfiguracionActual = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_version(self) -> int:
+        if 'configuracion_version' not in g:
+            g.configuracion_version = db.session.query(Configuracion.version).limit(1).scalar()
+        return g.configuracion_version
+
+    def get_configuracion(self) -> ConfiguracionActual:
+        version = self.get_version()
+        if version is None:
+            return None
+        with self.lock:
+            if self.configuracion is not None and self.configuracion.version == version:
+                self.hits += 1
+                return self.configuracion
+            self.misses += 1
+        configuracion = Configuracion.query.first()
+        if configuracion is None:
+            return None
+        configuracion_actual = ConfiguracionActual(configuracion)
+        with self.lock:
+            self.configuracion = configuracion_actual
+        return configuracion_actual
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.configuracion = None
+        g.pop('configuracion_version', None)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                'hits':self.hits,
+                'misses':self.misses,
+                'version':self.configuracion.version if self.configuracion is not None else None
+            }
+
+
+configuracion_cache = ConfiguracionCache()
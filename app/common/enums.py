@@ -17,3 +17,15 @@ class conexionEnums(enum.Enum):
     contado = 'contado'
     financiamiento = 'financiamiento'
     reconexion = 'reconexion'
+
+
+class facturacionEstados(enum.Enum):
+    pendiente = 'pendiente'
+    en_proceso = 'en_proceso'
+    finalizado = 'finalizado'
+
+
+class lecturaEstados(enum.Enum):
+    pendiente = 'pendiente'
+    registrada = 'registrada'
+    fallida = 'fallida'
@@ -0,0 +1,335 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, current_app
+from sqlalchemy import func, insert, update, or_, and_
+from sqlalchemy.orm import Session
+from app.models import Servicios, Planillas, FacturacionJobs, FacturacionLecturas
+from app.common.tarifas import Tarifa
+from app.common.cobros import ResumenCobrosServices
+from app.common.configuracion import configuracion_cache
+from app.common.enums import facturacionEstados, lecturaEstados
+from datetime import datetime, timedelta
+import uuid
+
+
+# Hilo de trabajo para ejecutar la facturacion mensual en segundo plano
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='facturacion')
+
+
+class FacturacionServices():
+    # N° maximo de planillas registradas por transaccion
+    tamano_lote = 500
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def registrar_planillas(self, lecturas: list, tarifa: Tarifa, fecha_emision: datetime) -> list:
+        """
+        Valida y registra las planillas de una lista de lecturas {id_servicio, lectura_actual}.
+        No confirma la transaccion, la confirmacion le corresponde a quien la invoca.
+        """
+        periodo = Planillas.get_periodo(fecha_emision)
+        ids_servicios = {item['id_servicio'] for item in lecturas}
+        # Consultar los servicios y las planillas del periodo de todo el lote
+        servicios = {
+            item.id:item for item in self.db.query(
+                Servicios.id,
+                Servicios.estado,
+                Servicios.lectura_anterior
+            ).filter(
+                Servicios.id.in_(ids_servicios)
+            ).all()
+        }
+        emitidos = {
+            item.id_servicio for item in self.db.query(Planillas.id_servicio).filter(
+                Planillas.id_servicio.in_(ids_servicios),
+                Planillas.periodo == periodo
+            ).all()
+        }
+        results = []
+        new_planillas = []
+        for item in lecturas:
+            id_servicio = item['id_servicio']
+            lectura_actual = item['lectura_actual']
+            result = {'id_servicio':id_servicio, 'success':None, 'error':None}
+            results.append(result)
+            servicio = servicios.get(id_servicio)
+            if servicio is None:
+                result['error'] = 'No existe el servicio buscado'
+                continue
+            # Verificar que el servicio este activo
+            if not servicio.estado:
+                result['error'] = 'Servicio apagado'
+                continue
+            if lectura_actual is None:
+                result['error'] = 'No se registro la lectura del medidor'
+                continue
+            # Verificar que la nueva lectura no sea menor que la lectura anterior
+            if lectura_actual < servicio.lectura_anterior:
+                result['error'] = 'Error en las lecturas. Lectura actual es menor a la lectura anterior'
+                continue
+            # Verificar que no se haya emitido una planilla de este mes para ese servicio
+            if id_servicio in emitidos:
+                result['error'] = 'Ya se emitio una planilla en este mes para el servicio'
+                continue
+            emitidos.add(id_servicio)
+            new_planillas.append({
+                'id_servicio':id_servicio,
+                'fecha_emision':fecha_emision,
+                'periodo':periodo,
+                'consumo_base':tarifa.consumo_base,
+                'exedente':tarifa.exedente,
+                'valor_consumo_base':tarifa.valor_consumo_base,
+                'valor_exedente':tarifa.valor_exedente,
+                'lectura_anterior':servicio.lectura_anterior,
+                'lectura_actual':lectura_actual,
+                'consumo_total':lectura_actual - servicio.lectura_anterior,
+                'pagado':False
+            })
+            result['success'] = 'Se registro la planilla de pago'
+        if len(new_planillas) == 0:
+            return results
+        # Calcular el valor de consumo de todas las planillas del lote
+        valores = tarifa.calcular_lote([item['consumo_total'] for item in new_planillas])
+        for item, valor_consumo_total in zip(new_planillas, valores):
+            item['valor_consumo_total'] = valor_consumo_total
+        # Registrar las planillas y actualizar lectura_anterior de los servicios
+        self.db.execute(insert(Planillas), new_planillas)
+        self.db.execute(update(Servicios), [
+            {'id':item['id_servicio'], 'lectura_anterior':item['lectura_actual']} for item in new_planillas
+        ])
+        ResumenCobrosServices(self.db).registrar_planillas(new_planillas)
+        return results
+
+    def registrar_lote(self, lecturas: list, tarifa: Tarifa, fecha_emision: datetime, confirmar=None) -> list:
+        """
+        Registra y confirma las planillas de un lote de lecturas en una sola transaccion.
+        Si el lote falla por un error de la DB se reintenta por lectura, de modo que solo
+        las lecturas con error se reportan como fallidas.
+        confirmar(lecturas, results) se ejecuta antes de cada confirmacion para guardar
+        los resultados en la misma transaccion que las planillas.
+        """
+        try:
+            results = self.registrar_planillas(lecturas, tarifa, fecha_emision)
+            if confirmar is not None:
+                confirmar(lecturas, results)
+            self.db.commit()
+            return results
+        except Exception:
+            self.db.rollback()
+            current_app.logger.exception('Error al registrar un lote de %s planillas, se reintenta por lectura', len(lecturas))
+        results = []
+        for lectura in lecturas:
+            try:
+                result = self.registrar_planillas([lectura], tarifa, fecha_emision)
+                if confirmar is not None:
+                    confirmar([lectura], result)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                current_app.logger.exception('Error al registrar la planilla del servicio %s', lectura['id_servicio'])
+                result = [{
+                    'id_servicio':lectura['id_servicio'],
+                    'success':None,
+                    'error':'No fue posible registrar la planilla de pago'
+                }]
+                if confirmar is not None:
+                    confirmar([lectura], result)
+                    self.db.commit()
+            results.extend(result)
+        return results
+
+    def new_job(self, lecturas: list, id_usuario: int) -> FacturacionJobs:
+        """
+        Registra un proceso de facturacion con una lectura por cada servicio activo.
+        Los servicios activos sin lectura se registran sin valor y se reportan como fallidos.
+        """
+        try:
+            lecturas_servicios = {item['id_servicio']:item['lectura_actual'] for item in lecturas}
+            servicios_activos = self.db.query(Servicios.id).filter(
+                Servicios.estado == True
+            ).order_by(Servicios.id).all()
+            new_job = FacturacionJobs()
+            new_job.id_usuario = id_usuario
+            new_job.fecha_emision = datetime.now()
+            new_job.estado = facturacionEstados.pendiente
+            self.db.add(new_job)
+            self.db.flush()
+            if len(servicios_activos) > 0:
+                self.db.execute(insert(FacturacionLecturas), [
+                    {
+                        'id_job':new_job.id,
+                        'id_servicio':item.id,
+                        'lectura_actual':lecturas_servicios.get(item.id),
+                        'estado':lecturaEstados.pendiente
+                    } for item in servicios_activos
+                ])
+            self.db.commit()
+            return new_job
+        except Exception:
+            self.db.rollback()
+            raise Exception('No fue posible registrar el proceso de facturacion')
+
+    def filtro_reanudable(self):
+        """
+        Condicion de los procesos que pueden ejecutarse: pendientes o en proceso sin actividad
+        durante FACTURACION_JOB_TIMEOUT segundos (ejecutor interrumpido)
+        """
+        inactivo = datetime.now() - timedelta(seconds=current_app.config.get('FACTURACION_JOB_TIMEOUT', 600))
+        return or_(
+            FacturacionJobs.estado == facturacionEstados.pendiente,
+            and_(
+                FacturacionJobs.estado == facturacionEstados.en_proceso,
+                or_(FacturacionJobs.fecha_actividad.is_(None), FacturacionJobs.fecha_actividad < inactivo)
+            )
+        )
+
+    def reclamar_job(self, id_job: int) -> str:
+        """
+        Asigna el proceso de facturacion a un nuevo ejecutor con una sola sentencia UPDATE,
+        de modo que solo un hilo o proceso pueda ejecutarlo a la vez.
+        Devuelve el identificador del ejecutor o None si el proceso no puede ejecutarse.
+        """
+        ejecutor = uuid.uuid4().hex
+        result = self.db.execute(
+            update(FacturacionJobs).where(
+                FacturacionJobs.id == id_job,
+                self.filtro_reanudable()
+            ).values(
+                estado=facturacionEstados.en_proceso,
+                ejecutor=ejecutor,
+                fecha_actividad=datetime.now()
+            ).execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return ejecutor if result.rowcount == 1 else None
+
+    def renovar_job(self, id_job: int, ejecutor: str) -> bool:
+        """
+        Registra la actividad del ejecutor en la transaccion actual.
+        Devuelve False si el proceso fue reasignado a otro ejecutor.
+        """
+        result = self.db.execute(
+            update(FacturacionJobs).where(
+                FacturacionJobs.id == id_job,
+                FacturacionJobs.ejecutor == ejecutor,
+                FacturacionJobs.estado == facturacionEstados.en_proceso
+            ).values(
+                fecha_actividad=datetime.now()
+            ).execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    def actualizar_lecturas(self, lecturas: list, results: list) -> None:
+        self.db.execute(update(FacturacionLecturas), [
+            {
+                'id':item['id'],
+                'estado':lecturaEstados.registrada if result['success'] is not None else lecturaEstados.fallida,
+                'detalle':result['error']
+            } for item, result in zip(lecturas, results)
+        ])
+
+    def procesar_job(self, id_job: int) -> bool:
+        """
+        Procesa las lecturas pendientes del proceso de facturacion por lotes.
+        Cada lote confirma las planillas y el estado de sus lecturas en la misma transaccion,
+        por lo que el proceso puede reanudarse si se interrumpe. Todas las planillas se emiten
+        con la fecha de emision del proceso.
+        Devuelve False si el proceso ya finalizo o lo esta ejecutando otro hilo o proceso.
+        """
+        job = self.db.get(FacturacionJobs, id_job)
+        if job is None:
+            raise Exception('No existe el proceso de facturacion')
+        if job.estado == facturacionEstados.finalizado:
+            return False
+        configuracion = configuracion_cache.get_configuracion()
+        if configuracion is None:
+            raise Exception('No existen valores de configuracion')
+        tarifa = Tarifa.from_configuracion(configuracion)
+        fecha_emision = job.fecha_emision
+        ejecutor = self.reclamar_job(id_job)
+        if ejecutor is None:
+            return False
+        ultimo_id = 0
+        while True:
+            lote = self.db.query(
+                FacturacionLecturas.id,
+                FacturacionLecturas.id_servicio,
+                FacturacionLecturas.lectura_actual
+            ).filter(
+                FacturacionLecturas.id_job == id_job,
+                FacturacionLecturas.estado == lecturaEstados.pendiente,
+                FacturacionLecturas.id > ultimo_id
+            ).order_by(FacturacionLecturas.id).limit(self.tamano_lote).all()
+            if len(lote) == 0:
+                break
+            ultimo_id = lote[-1].id
+            if not self.renovar_job(id_job, ejecutor):
+                self.db.rollback()
+                return False
+            lecturas = [
+                {'id':item.id, 'id_servicio':item.id_servicio, 'lectura_actual':item.lectura_actual} for item in lote
+            ]
+            self.registrar_lote(lecturas, tarifa, fecha_emision, self.actualizar_lecturas)
+        result = self.db.execute(
+            update(FacturacionJobs).where(
+                FacturacionJobs.id == id_job,
+                FacturacionJobs.ejecutor == ejecutor
+            ).values(
+                estado=facturacionEstados.finalizado,
+                fecha_fin=datetime.now()
+            ).execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount == 1
+
+    def get_resumen_job(self, id_job: int) -> dict:
+        job = self.db.get(FacturacionJobs, id_job)
+        if job is None:
+            raise Exception('No existe el proceso de facturacion')
+        conteo = {item.estado:item.total for item in self.db.query(
+            FacturacionLecturas.estado,
+            func.count(FacturacionLecturas.id).label('total')
+        ).filter(
+            FacturacionLecturas.id_job == id_job
+        ).group_by(FacturacionLecturas.estado).all()}
+        registradas = conteo.get(lecturaEstados.registrada, 0)
+        fallidas = conteo.get(lecturaEstados.fallida, 0)
+        return {
+            'id':job.id,
+            'estado':job.estado.value,
+            'fecha_creacion':datetime.strftime(job.fecha_creacion, '%d-%m-%Y %H:%M'),
+            'fecha_fin':datetime.strftime(job.fecha_fin, '%d-%m-%Y %H:%M') if job.fecha_fin is not None else None,
+            'procesadas':registradas + fallidas,
+            'registradas':registradas,
+            'fallidas':fallidas,
+            'pendientes':conteo.get(lecturaEstados.pendiente, 0)
+        }
+
+    def get_jobs_pendientes(self) -> list:
+        """
+        Obtiene los procesos pendientes y los procesos en proceso interrumpidos
+        """
+        return [item.id for item in self.db.query(FacturacionJobs.id).filter(
+            self.filtro_reanudable()
+        ).order_by(FacturacionJobs.id).all()]
+
+    def job_reanudable(self, id_job: int) -> bool:
+        return self.db.query(FacturacionJobs.id).filter(
+            FacturacionJobs.id == id_job,
+            self.filtro_reanudable()
+        ).first() is not None
+
+
+def ejecutar_job(app: Flask, id_job: int) -> None:
+    """
+    Ejecuta el proceso de facturacion en el hilo de trabajo con su propio contexto de aplicacion
+    """
+    def run():
+        with app.app_context():
+            from app.libs import db
+            try:
+                FacturacionServices(db.session).procesar_job(id_job)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Proceso de facturacion %s interrumpido', id_job)
+    executor.submit(run)
@@ -1,7 +1,110 @@
+from flask import Flask
+from sqlalchemy import insert, delete, or_, and_
 from sqlalchemy.orm import Session
-from app.models import Logs
+from app.models import Logs, Usuarios
 from app.common.enums import logsCategories
+import atexit
 import datetime
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+
+
+class LogsWriter():
+    """
+    Escritor de logs en segundo plano.
+    Los logs se encolan y un hilo los registra en lotes con un solo INSERT
+    cuando se alcanza LOGS_BATCH_SIZE o han pasado LOGS_FLUSH_INTERVAL segundos.
+    Con LOGS_ASYNC = False los logs se registran de forma sincrona.
+    """
+    def __init__(self):
+        self.app: Flask = None
+        self.queue: queue.Queue = None
+        self.thread: threading.Thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def init_app(self, app: Flask) -> None:
+        app.config.setdefault('LOGS_ASYNC', True)
+        app.config.setdefault('LOGS_BATCH_SIZE', 100)
+        app.config.setdefault('LOGS_FLUSH_INTERVAL', 2.0)
+        app.config.setdefault('LOGS_QUEUE_SIZE', 10000)
+        app.config.setdefault('LOGS_QUEUE_TIMEOUT', 5.0)
+        app.config.setdefault('LOGS_RETENTION_DEFAULT', 61)
+        app.config.setdefault('LOGS_RETENTION', {})
+        app.config.setdefault('LOGS_PURGE_BATCH_SIZE', 1000)
+        app.config.setdefault('LOGS_ARCHIVE_DIR', os.path.join(app.instance_path, 'logs_archive'))
+        self.app = app
+        self.queue = queue.Queue(maxsize=app.config['LOGS_QUEUE_SIZE'])
+        atexit.register(self.stop)
+
+    @property
+    def enabled(self) -> bool:
+        return self.app is not None and self.app.config['LOGS_ASYNC']
+
+    def start(self) -> None:
+        # El hilo se inicia en el primer log de cada proceso (los workers se crean con fork)
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive() and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.run, name='logs-writer', daemon=True)
+            self.thread.start()
+
+    def put(self, log: dict) -> None:
+        self.start()
+        try:
+            # Si la cola esta llena se bloquea hasta que el hilo libere espacio
+            self.queue.put(log, timeout=self.app.config['LOGS_QUEUE_TIMEOUT'])
+        except queue.Full:
+            raise Exception('Cola de logs llena')
+
+    def run(self) -> None:
+        batch_size = self.app.config['LOGS_BATCH_SIZE']
+        flush_interval = self.app.config['LOGS_FLUSH_INTERVAL']
+        batch = []
+        limite = time.monotonic() + flush_interval
+        while True:
+            try:
+                log = self.queue.get(timeout=max(limite - time.monotonic(), 0))
+            except queue.Empty:
+                log = False
+            if log is None:
+                # Señal de cierre
+                self.flush(batch)
+                self.queue.task_done()
+                return
+            if log:
+                batch.append(log)
+                self.queue.task_done()
+            if len(batch) >= batch_size or time.monotonic() >= limite:
+                self.flush(batch)
+                batch = []
+                limite = time.monotonic() + flush_interval
+
+    def flush(self, batch: list) -> None:
+        if len(batch) == 0:
+            return
+        from app.libs import db
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(Logs), batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception('No fue posible registrar %s logs', len(batch))
+
+    def stop(self) -> None:
+        if self.thread is None or not self.thread.is_alive() or self.pid != os.getpid():
+            return
+        self.queue.put(None)
+        self.thread.join()
+
+
+logs_writer = LogsWriter()
 
 
 class LogsServices():
@@ -9,10 +112,19 @@ class LogsServices():
         self.db = db
 
     def new_log(self, categoria:logsCategories, id_usuario: int, detalle: str = None) -> None:
+        if logs_writer.enabled:
+            logs_writer.put({
+                'categoria':categoria,
+                'id_usuario':id_usuario,
+                'fecha':datetime.datetime.now(),
+                'detalle':detalle
+            })
+            return
         try:
             new_log = Logs()
             new_log.categoria = categoria
             new_log.id_usuario = id_usuario
+            new_log.fecha = datetime.datetime.now()
             if detalle is not None:
                 new_log.detalle = detalle
             self.db.add(new_log)
@@ -21,30 +133,159 @@ class LogsServices():
             self.db.rollback()
             raise Exception('No fue posible registrar el log')
 
-    def get_all_logs(self):
+    def get_logs(self, limite: int, cursor: tuple = None, categoria: logsCategories = None,
+                 id_usuario: int = None, desde: datetime.datetime = None, hasta: datetime.datetime = None):
+        """
+        Obtiene una pagina de logs ordenados del mas reciente al mas antiguo junto al username.
+        cursor corresponde a (fecha, id) del ultimo log de la pagina anterior.
+        """
         try:
-            logs = self.db.query(Logs).all()
-            return logs
+            query = self.db.query(
+                Logs.id,
+                Logs.categoria,
+                Logs.fecha,
+                Logs.detalle,
+                Usuarios.username
+            ).join(
+                Usuarios, Logs.id_usuario == Usuarios.id
+            )
+            if categoria is not None:
+                query = query.filter(Logs.categoria == categoria)
+            if id_usuario is not None:
+                query = query.filter(Logs.id_usuario == id_usuario)
+            if desde is not None:
+                query = query.filter(Logs.fecha >= desde)
+            if hasta is not None:
+                query = query.filter(Logs.fecha < hasta)
+            if cursor is not None:
+                fecha, id_log = cursor
+                query = query.filter(or_(
+                    Logs.fecha < fecha,
+                    and_(Logs.fecha == fecha, Logs.id < id_log)
+                ))
+            return query.order_by(Logs.fecha.desc(), Logs.id.desc()).limit(limite).all()
         except Exception:
             raise Exception('No fue posible obtener los registros')
 
-    def delete_old_logs(self) -> None:
+    def delete_old_logs(self, retencion: dict, retencion_default: int, tamano_lote: int = 1000) -> int:
+        """
+        Elimina los logs que superan los dias de retencion de su categoria.
+        Se eliminan por lotes de tamano_lote registros confirmando cada lote.
+        Devuelve el numero de logs eliminados.
+        """
         try:
-            old_logs = self.get_old_logs()
-            for i in old_logs:
-                self.db.delete(i)
-            self.db.commit()
+            eliminados = 0
+            for categoria, fecha_limite in self.get_fechas_limite(retencion, retencion_default):
+                eliminados += self.delete_logs_lotes(
+                    tamano_lote,
+                    Logs.categoria == categoria,
+                    Logs.fecha < fecha_limite
+                )
+            return eliminados
         except Exception:
             self.db.rollback()
             raise Exception('No fue posible eliminar los logs')
 
-    def get_old_logs(self):
-        try:
-            current_datetime = datetime.datetime.now()
-            old_logs_datetime = current_datetime - datetime.timedelta(2*365/12) # fecha actual menos 2 meses
-            old_logs = self.db.query(Logs).filter(
-                Logs.fecha <= old_logs_datetime
-            ).all()
-            return old_logs
-        except Exception:
-            raise Exception('No se pudo obtener los registros')
\ No newline at end of file
+    def get_fechas_limite(self, retencion: dict, retencion_default: int) -> list:
+        current_datetime = datetime.datetime.now()
+        return [
+            (categoria, current_datetime - datetime.timedelta(days=retencion.get(categoria.value, retencion_default)))
+            for categoria in logsCategories
+        ]
+
+    def delete_logs_lotes(self, tamano_lote: int, *filtros) -> int:
+        eliminados = 0
+        while True:
+            ids_logs = [item.id for item in self.db.query(Logs.id).filter(
+                *filtros
+            ).order_by(Logs.id).limit(tamano_lote).all()]
+            if len(ids_logs) == 0:
+                break
+            self.db.execute(delete(Logs).where(Logs.id.in_(ids_logs)))
+            self.db.commit()
+            eliminados += len(ids_logs)
+            if len(ids_logs) < tamano_lote:
+                break
+        return eliminados
+
+    def archive_old_logs(self, directorio: str, retencion: dict, retencion_default: int, tamano_lote: int = 1000) -> int:
+        """
+        Archiva los logs que superan los dias de retencion de su categoria en archivos
+        JSONL comprimidos con gzip, uno por mes (logs-YYYY-MM.jsonl.gz).
+        Los logs se eliminan por lotes una vez que los archivos se han escrito en disco.
+        Devuelve el numero de logs archivados.
+        """
+        os.makedirs(directorio, exist_ok=True)
+        archivados = 0
+        for categoria, fecha_limite in self.get_fechas_limite(retencion, retencion_default):
+            archivos = {}
+            id_maximo = None
+            try:
+                logs = self.db.query(
+                    Logs.id,
+                    Logs.categoria,
+                    Logs.id_usuario,
+                    Logs.fecha,
+                    Logs.detalle,
+                    Usuarios.username
+                ).join(
+                    Usuarios, Logs.id_usuario == Usuarios.id
+                ).filter(
+                    Logs.categoria == categoria,
+                    Logs.fecha < fecha_limite
+                ).order_by(Logs.id).execution_options(yield_per=tamano_lote)
+                for item in logs:
+                    mes = item.fecha.strftime('%Y-%m')
+                    if mes not in archivos:
+                        # Los miembros gzip agregados al final de un archivo existente se leen como uno solo
+                        archivos[mes] = gzip.open(self.get_archivo(directorio, mes), 'at', encoding='utf-8')
+                    archivos[mes].write(json.dumps({
+                        'id':item.id,
+                        'categoria':item.categoria.value,
+                        'id_usuario':item.id_usuario,
+                        'usuario':item.username,
+                        'fecha':item.fecha.isoformat(),
+                        'detalle':item.detalle
+                    }) + '\n')
+                    id_maximo = item.id
+                    archivados += 1
+            finally:
+                for archivo in archivos.values():
+                    archivo.close()
+                    with open(archivo.name, 'rb') as f:
+                        os.fsync(f.fileno())
+            if id_maximo is None:
+                continue
+            try:
+                self.delete_logs_lotes(
+                    tamano_lote,
+                    Logs.categoria == categoria,
+                    Logs.fecha < fecha_limite,
+                    Logs.id <= id_maximo
+                )
+            except Exception:
+                self.db.rollback()
+                raise Exception('No fue posible eliminar los logs archivados')
+        return archivados
+
+    def get_archivo(self, directorio: str, mes: str) -> str:
+        return os.path.join(directorio, f'logs-{mes}.jsonl.gz')
+
+    def read_archive(self, directorio: str, mes: str, categoria: logsCategories = None):
+        """
+        Recorre los logs archivados de un mes (YYYY-MM) sin cargar el archivo completo en memoria
+        """
+        archivo = self.get_archivo(directorio, mes)
+        if not os.path.exists(archivo):
+            raise Exception('No existe el archivo de logs del mes')
+        ids_leidos = set()
+        with gzip.open(archivo, 'rt', encoding='utf-8') as f:
+            for linea in f:
+                log = json.loads(linea)
+                # Un archivado interrumpido antes de eliminar los logs puede repetirlos
+                if log['id'] in ids_leidos:
+                    continue
+                ids_leidos.add(log['id'])
+                if categoria is not None and log['categoria'] != categoria.value:
+                    continue
+                yield log
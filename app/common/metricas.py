@@ -0,0 +1,135 @@
+from flask import Flask, Response, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from threading import Lock
+import os
+import time
+
+
+class MetricasEndpoint():
+    """
+    Valores acumulados de las peticiones de un endpoint
+    """
+    __slots__ = ('buckets', 'peticiones', 'duracion', 'sentencias', 'duracion_sql')
+
+    def __init__(self, n_buckets: int):
+        self.buckets = [0 for i in range(n_buckets)]
+        self.peticiones = 0
+        self.duracion = 0.0
+        self.sentencias = 0
+        self.duracion_sql = 0.0
+
+
+class Metricas():
+    """
+    Registra por endpoint la latencia de las peticiones, el N° de sentencias SQL y el tiempo
+    total en la DB. Las consultas que superan METRICS_SLOW_QUERY segundos se registran en el log
+    sin sus parametros. Los valores se exponen en formato de texto de Prometheus con la etiqueta
+    pid, ya que cada proceso acumula sus propias metricas.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.endpoints = {}
+        self.buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+        self.enabled = True
+        self.listening = False
+
+    def init_app(self, app: Flask) -> None:
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_SLOW_QUERY', 0.5) # segundos
+        app.config.setdefault('METRICS_BUCKETS', self.buckets)
+        self.enabled = app.config['METRICS_ENABLED']
+        self.buckets = tuple(sorted(app.config['METRICS_BUCKETS']))
+        if self.enabled and not self.listening:
+            event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+            self.listening = True
+
+    # ------------------------------ Eventos SQLAlchemy ------------------------------
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        inicio = conn.info.get('metricas_inicio')
+        if not inicio:
+            return
+        duracion = time.perf_counter() - inicio.pop()
+        # Acumular solo las sentencias ejecutadas durante una peticion del API
+        peticion = g.get('metricas') if g else None
+        if peticion is not None:
+            peticion['sentencias'] += 1
+            peticion['duracion_sql'] += duracion
+        if current_app and duracion >= current_app.config.get('METRICS_SLOW_QUERY', 0.5):
+            # Solo la sentencia: los parametros pueden contener contraseñas y datos personales
+            current_app.logger.warning('Consulta lenta (%.3f s): %s', duracion, statement)
+
+    # ------------------------------- Eventos Flask ----------------------------------
+    def before_request(self) -> None:
+        if not self.enabled:
+            return
+        g.metricas = {'inicio':time.perf_counter(), 'sentencias':0, 'duracion_sql':0.0}
+
+    def after_request(self, response: Response) -> Response:
+        peticion = g.get('metricas')
+        if peticion is None:
+            return response
+        metodo = request.method
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'desconocido'
+        # Registrar al cerrar la respuesta para incluir el envio de las respuestas por partes
+        def cerrar():
+            self.registrar(
+                metodo,
+                endpoint,
+                time.perf_counter() - peticion['inicio'],
+                peticion['sentencias'],
+                peticion['duracion_sql']
+            )
+        response.call_on_close(cerrar)
+        return response
+
+    def registrar(self, metodo: str, endpoint: str, duracion: float, sentencias: int, duracion_sql: float) -> None:
+        with self.lock:
+            metricas = self.endpoints.get((metodo, endpoint))
+            if metricas is None:
+                metricas = self.endpoints[(metodo, endpoint)] = MetricasEndpoint(len(self.buckets))
+            for i, limite in enumerate(self.buckets):
+                if duracion <= limite:
+                    metricas.buckets[i] += 1
+            metricas.peticiones += 1
+            metricas.duracion += duracion
+            metricas.sentencias += sentencias
+            metricas.duracion_sql += duracion_sql
+
+    # ---------------------------------- Exportar ------------------------------------
+    def exportar(self) -> str:
+        """
+        Devuelve las metricas en el formato de texto de Prometheus
+        """
+        pid = os.getpid()
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            duraciones = [
+                '# HELP http_request_duration_seconds Latencia de las peticiones del API',
+                '# TYPE http_request_duration_seconds histogram'
+            ]
+            sentencias = [
+                '# HELP http_request_sql_statements_total N° de sentencias SQL ejecutadas por las peticiones',
+                '# TYPE http_request_sql_statements_total counter'
+            ]
+            duraciones_sql = [
+                '# HELP http_request_sql_duration_seconds_total Tiempo total en la DB de las peticiones',
+                '# TYPE http_request_sql_duration_seconds_total counter'
+            ]
+            for (metodo, endpoint), metricas in endpoints:
+                etiquetas = 'method="{}",endpoint="{}",pid="{}"'.format(metodo, endpoint.replace('\\', '\\\\').replace('"', '\\"'), pid)
+                for limite, total in zip(self.buckets, metricas.buckets):
+                    duraciones.append(f'http_request_duration_seconds_bucket{{{etiquetas},le="{limite}"}} {total}')
+                duraciones.append(f'http_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} {metricas.peticiones}')
+                duraciones.append(f'http_request_duration_seconds_sum{{{etiquetas}}} {metricas.duracion}')
+                duraciones.append(f'http_request_duration_seconds_count{{{etiquetas}}} {metricas.peticiones}')
+                sentencias.append(f'http_request_sql_statements_total{{{etiquetas}}} {metricas.sentencias}')
+                duraciones_sql.append(f'http_request_sql_duration_seconds_total{{{etiquetas}}} {metricas.duracion_sql}')
+        return '\n'.join(duraciones + sentencias + duraciones_sql) + '\n'
+
+
+metricas = Metricas()
@@ -0,0 +1,69 @@
+from sqlalchemy import insert, delete, select, literal, exists
+from sqlalchemy.orm import Session
+from app.models import Notificaciones, Planillas
+from datetime import datetime, timedelta
+
+
+class NotificacionesServices():
+    def __init__(self, db: Session):
+        self.db = db
+
+    def generar_vencidas(self, dias: int, listar: bool = False) -> tuple:
+        """
+        Registra una notificacion para cada servicio con planillas sin pagar emitidas hace
+        mas de <dias> dias que no tenga una notificacion pendiente de pago.
+        Las notificaciones se registran con un solo INSERT ... SELECT.
+        No confirma la transaccion. Devuelve el numero de notificaciones y, si listar es True,
+        los ids de los servicios notificados.
+        """
+        current_date = datetime.now()
+        fecha_limite = current_date - timedelta(days=dias)
+        notificacion_pendiente = exists().where(
+            Notificaciones.id_servicio == Planillas.id_servicio,
+            Notificaciones.pagado == False
+        )
+        servicios_vencidos = select(Planillas.id_servicio).where(
+            Planillas.pagado == False,
+            Planillas.fecha_emision < fecha_limite,
+            ~notificacion_pendiente
+        ).distinct()
+        ids_servicios = None
+        if listar:
+            ids_servicios = [item.id_servicio for item in self.db.execute(
+                servicios_vencidos.order_by(Planillas.id_servicio)
+            ).all()]
+        result = self.db.execute(insert(Notificaciones).from_select(
+            ['id_servicio', 'fecha_emision', 'total', 'pagado'],
+            select(
+                servicios_vencidos.subquery().c.id_servicio,
+                literal(current_date),
+                literal(Notificaciones.total.default.arg),
+                literal(False)
+            )
+        ))
+        return result.rowcount, ids_servicios
+
+    def delete_pagadas(self, tamano_lote: int, id_servicio: int = None, dias: int = None) -> int:
+        """
+        Elimina por lotes las notificaciones pagadas, opcionalmente solo las de un servicio
+        y las emitidas hace mas de <dias> dias. Cada lote se confirma por separado.
+        Devuelve el numero de notificaciones eliminadas.
+        """
+        filtros = [Notificaciones.pagado == True]
+        if id_servicio is not None:
+            filtros.append(Notificaciones.id_servicio == id_servicio)
+        if dias is not None:
+            filtros.append(Notificaciones.fecha_emision < datetime.now() - timedelta(days=dias))
+        eliminadas = 0
+        while True:
+            ids_notificaciones = [item.id for item in self.db.query(Notificaciones.id).filter(
+                *filtros
+            ).order_by(Notificaciones.id).limit(tamano_lote).all()]
+            if len(ids_notificaciones) == 0:
+                break
+            self.db.execute(delete(Notificaciones).where(Notificaciones.id.in_(ids_notificaciones)))
+            self.db.commit()
+            eliminadas += len(ids_notificaciones)
+            if len(ids_notificaciones) < tamano_lote:
+                break
+        return eliminadas
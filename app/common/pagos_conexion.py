@@ -0,0 +1,123 @@
+from sqlalchemy import or_, and_, func
+from sqlalchemy.orm import Session, contains_eager, selectinload
+from app.models import PagosConexion, CuotasConexion, Servicios, Clientes
+from app.common.enums import conexionEnums
+import datetime
+
+
+class PagosConexionServices():
+    def __init__(self, db: Session):
+        self.db = db
+
+    def query_pagos(self, cursor: tuple = None, tipo: conexionEnums = None,
+                    id_servicio: int = None, id_cliente: int = None,
+                    desde: datetime.datetime = None, hasta: datetime.datetime = None, cuotas: bool = False):
+        """
+        Consulta de los pagos de conexion del mas reciente al mas antiguo con su servicio y cliente
+        cargados en la misma consulta. Con cuotas=True sus cuotas se cargan en una consulta adicional.
+        cursor corresponde a (fecha_emision, id) del ultimo pago de la pagina anterior.
+        """
+        query = self.db.query(PagosConexion).join(
+            PagosConexion.servicio
+        ).join(
+            Servicios.cliente
+        ).options(
+            contains_eager(PagosConexion.servicio).contains_eager(Servicios.cliente)
+        )
+        if cuotas:
+            query = query.options(selectinload(PagosConexion.cuotas))
+        if tipo is not None:
+            query = query.filter(PagosConexion.tipo == tipo)
+        if id_servicio is not None:
+            query = query.filter(PagosConexion.id_servicio == id_servicio)
+        if id_cliente is not None:
+            query = query.filter(Clientes.id == id_cliente)
+        if desde is not None:
+            query = query.filter(PagosConexion.fecha_emision >= desde)
+        if hasta is not None:
+            query = query.filter(PagosConexion.fecha_emision < hasta)
+        if cursor is not None:
+            fecha_emision, id_pago = cursor
+            query = query.filter(or_(
+                PagosConexion.fecha_emision < fecha_emision,
+                and_(PagosConexion.fecha_emision == fecha_emision, PagosConexion.id < id_pago)
+            ))
+        return query.order_by(PagosConexion.fecha_emision.desc(), PagosConexion.id.desc())
+
+    def get_pagos(self, limite: int, **filtros) -> list:
+        """
+        Obtiene una pagina de pagos de conexion con los filtros de query_pagos
+        """
+        try:
+            return self.query_pagos(**filtros).limit(limite).all()
+        except Exception:
+            raise Exception('No fue posible obtener los registros')
+
+    def set_cuotas(self, pago: PagosConexion, valores: list, fecha_pago: datetime.datetime) -> None:
+        """
+        Actualiza las cuotas pagadas de un financiamiento a partir de la lista de valores
+        de la cuota 1 a la 6. Las cuotas con valor 0 se eliminan y las cuotas nuevas o
+        modificadas se registran con la fecha de pago recibida. No confirma la transaccion.
+        """
+        cuotas = {item.numero:item for item in pago.cuotas}
+        for numero, valor in enumerate(valores, start=1):
+            cuota = cuotas.get(numero)
+            if not valor:
+                if cuota is not None:
+                    pago.cuotas.remove(cuota)
+                continue
+            if cuota is None:
+                cuota = CuotasConexion()
+                cuota.numero = numero
+                pago.cuotas.append(cuota)
+            elif cuota.valor == valor:
+                continue
+            cuota.valor = valor
+            cuota.fecha_pago = fecha_pago
+
+    def get_saldos(self, limite: int, offset: int = 0, ascendente: bool = False, pendientes: bool = True) -> list:
+        """
+        Obtiene el saldo por cobrar de los financiamientos de conexion de cada servicio
+        (total - entrada - cuotas pagadas) calculado en una sola consulta agregada,
+        ordenado por saldo.
+        """
+        try:
+            pagado_cuotas = self.db.query(
+                CuotasConexion.id_pago,
+                func.sum(CuotasConexion.valor).label('pagado')
+            ).group_by(CuotasConexion.id_pago).subquery()
+            total = func.sum(PagosConexion.total)
+            entrada = func.sum(PagosConexion.entrada)
+            pagado = func.coalesce(func.sum(pagado_cuotas.c.pagado), 0)
+            saldo = (total - entrada - pagado).label('saldo')
+            query = self.db.query(
+                Servicios.id,
+                Servicios.n_conexion,
+                Servicios.n_medidor,
+                Clientes.id.label('id_cliente'),
+                Clientes.cedula,
+                Clientes.nombres,
+                Clientes.apellidos,
+                Clientes.telefono,
+                total.label('total'),
+                entrada.label('entrada'),
+                pagado.label('pagado'),
+                saldo
+            ).join(
+                Servicios, PagosConexion.id_servicio == Servicios.id
+            ).join(
+                Clientes, Servicios.id_cliente == Clientes.id
+            ).outerjoin(
+                pagado_cuotas, pagado_cuotas.c.id_pago == PagosConexion.id
+            ).filter(
+                PagosConexion.tipo == conexionEnums.financiamiento
+            ).group_by(
+                Servicios.id,
+                Clientes.id
+            )
+            if pendientes:
+                query = query.having(saldo > 0)
+            orden = saldo.asc() if ascendente else saldo.desc()
+            return query.order_by(orden, Servicios.id).limit(limite).offset(offset).all()
+        except Exception:
+            raise Exception('No fue posible obtener los saldos')
@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask
+from threading import BoundedSemaphore, Lock
+import time
+
+
+class LimiteExcedido(Exception):
+    """
+    Se lanza cuando se supera un limite de uso y la solicitud debe rechazarse (429)
+    """
+    pass
+
+
+class PasswordPool():
+    """
+    Ejecuta el hash y la verificacion de contraseñas en un pool de hilos acotado.
+    Si el pool y su cola (PASSWORD_POOL_QUEUE) estan llenos se rechaza el trabajo
+    en lugar de esperar.
+    """
+    def __init__(self):
+        self.executor: ThreadPoolExecutor = None
+        self.cupos: BoundedSemaphore = None
+        self.timeout = 10
+
+    def init_app(self, app: Flask) -> None:
+        app.config.setdefault('PASSWORD_POOL_WORKERS', 2)
+        app.config.setdefault('PASSWORD_POOL_QUEUE', 8)
+        app.config.setdefault('PASSWORD_POOL_TIMEOUT', 10)
+        workers = app.config['PASSWORD_POOL_WORKERS']
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='passwords')
+        self.cupos = BoundedSemaphore(workers + app.config['PASSWORD_POOL_QUEUE'])
+        self.timeout = app.config['PASSWORD_POOL_TIMEOUT']
+
+    def run(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        if not self.cupos.acquire(blocking=False):
+            raise LimiteExcedido('Demasiadas solicitudes, intente más tarde')
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.cupos.release()
+            raise
+        future.add_done_callback(lambda f: self.cupos.release())
+        return future.result(timeout=self.timeout)
+
+
+class TokenBucket():
+    """
+    Limitador por clave con el algoritmo token bucket.
+    Cada clave tiene hasta <capacidad> intentos que se recuperan a razon de <recarga> por segundo.
+    """
+    def __init__(self, capacidad: float, recarga: float, max_claves: int = 10000):
+        self.lock = Lock()
+        self.capacidad = capacidad
+        self.recarga = recarga
+        self.max_claves = max_claves
+        self.buckets = {}
+
+    def get_tokens(self, clave: str, ahora: float) -> float:
+        tokens, ultimo = self.buckets.get(clave, (self.capacidad, ahora))
+        return min(self.capacidad, tokens + (ahora - ultimo)*self.recarga)
+
+    def disponible(self, clave: str) -> bool:
+        with self.lock:
+            return self.get_tokens(clave, time.monotonic()) >= 1
+
+    def consumir(self, clave: str) -> None:
+        with self.lock:
+            ahora = time.monotonic()
+            self.buckets[clave] = (max(self.get_tokens(clave, ahora) - 1, 0), ahora)
+            if len(self.buckets) > self.max_claves:
+                self.limpiar(ahora)
+
+    def limpiar(self, ahora: float) -> None:
+        # Eliminar las claves que ya recuperaron todos sus intentos
+        for clave in [clave for clave in self.buckets if self.get_tokens(clave, ahora) >= self.capacidad]:
+            del self.buckets[clave]
+
+
+class LoginThrottle():
+    """
+    Limita los intentos fallidos de inicio de sesion por usuario desde cada IP y por IP.
+    El limite por usuario se aplica por IP para que los fallos desde otra direccion
+    no bloqueen el acceso del usuario. Detras de un proxy inverso debe configurarse
+    PROXY_FIX_X_FOR para obtener la IP real del cliente.
+    """
+    def __init__(self):
+        self.usuarios: TokenBucket = None
+        self.ips: TokenBucket = None
+
+    def init_app(self, app: Flask) -> None:
+        app.config.setdefault('LOGIN_FALLOS_USUARIO', 5)
+        app.config.setdefault('LOGIN_FALLOS_IP', 20)
+        app.config.setdefault('LOGIN_FALLOS_PERIODO', 300)
+        periodo = app.config['LOGIN_FALLOS_PERIODO']
+        self.usuarios = TokenBucket(app.config['LOGIN_FALLOS_USUARIO'], app.config['LOGIN_FALLOS_USUARIO']/periodo)
+        self.ips = TokenBucket(app.config['LOGIN_FALLOS_IP'], app.config['LOGIN_FALLOS_IP']/periodo)
+
+    def clave_usuario(self, username: str, ip: str) -> str:
+        return f'{ip}|{username.lower()}'
+
+    def verificar(self, username: str, ip: str) -> None:
+        if not self.usuarios.disponible(self.clave_usuario(username, ip)) or not self.ips.disponible(ip):
+            raise LimiteExcedido('Demasiados intentos fallidos, intente más tarde')
+
+    def registrar_fallo(self, username: str, ip: str) -> None:
+        self.usuarios.consumir(self.clave_usuario(username, ip))
+        self.ips.consumir(ip)
+
+
+password_pool = PasswordPool()
+login_throttle = LoginThrottle()
@@ -0,0 +1,48 @@
+from app.models import Planillas
+from app.common.configuracion import ConfiguracionActual
+
+
+class Tarifa():
+    def __init__(self, consumo_base: float, exedente: float, valor_consumo_base: float, valor_exedente: float):
+        self.consumo_base = consumo_base
+        self.exedente = exedente
+        self.valor_consumo_base = valor_consumo_base
+        self.valor_exedente = valor_exedente
+
+    @classmethod
+    def from_configuracion(cls, configuracion: ConfiguracionActual) -> 'Tarifa':
+        return cls(
+            configuracion.consumo_base,
+            configuracion.exedente,
+            configuracion.valor_consumo_base,
+            configuracion.valor_exedente
+        )
+
+    @classmethod
+    def from_planilla(cls, planilla: Planillas) -> 'Tarifa':
+        return cls(
+            planilla.consumo_base,
+            planilla.exedente,
+            planilla.valor_consumo_base,
+            planilla.valor_exedente
+        )
+
+    def calcular(self, consumo_total: int) -> float:
+        return self.calcular_lote([consumo_total])[0]
+
+    def calcular_lote(self, consumos: list[int]) -> list[float]:
+        """
+        Calcula el valor de consumo de una lista de consumos en una sola expresion sin llamadas
+        por elemento: valor base mas los exedentes sobre el consumo base por el valor de cada exedente.
+        Es la unica definicion de la formula de la tarifa, calcular la usa para un solo consumo.
+        """
+        # Variables locales para evitar la busqueda de atributos en cada elemento
+        consumo_base = self.consumo_base
+        exedente = self.exedente
+        valor_consumo_base = self.valor_consumo_base
+        valor_exedente = self.valor_exedente
+        return [
+            valor_consumo_base + ((consumo-consumo_base)/exedente)*valor_exedente
+            if consumo > consumo_base else valor_consumo_base
+            for consumo in consumos
+        ]
@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from flask import Flask, current_app, request
+from flask_login import current_user
+from flask_restx import abort
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from flask_login import UserMixin
+from threading import Lock
+import hashlib
+import time
+
+
+class UsuarioSesion(UserMixin):
+    """
+    Datos del usuario autenticado que se conservan en la cache o se leen del token.
+    scopes es None en las sesiones con cookie (sin restricciones).
+    sello identifica la contraseña actual para revocar los tokens emitidos antes de cambiarla.
+    """
+    __slots__ = ('id', 'username', 'scopes', 'sello')
+
+    def __init__(self, id: int, username: str, scopes: list = None, sello: str = None):
+        self.id = id
+        self.username = username
+        self.scopes = scopes
+        self.sello = sello
+
+
+class UsuariosCache():
+    """
+    Cache LRU con tiempo de vida de los usuarios autenticados por su id.
+    El tamaño y el tiempo de vida se configuran con USERS_CACHE_SIZE y USERS_CACHE_TTL.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.usuarios = OrderedDict()
+        self.size = 256
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app: Flask) -> None:
+        app.config.setdefault('USERS_CACHE_SIZE', 256)
+        app.config.setdefault('USERS_CACHE_TTL', 60)
+        app.config.setdefault('API_TOKEN_TTL', 3600)
+        self.size = app.config['USERS_CACHE_SIZE']
+        self.ttl = app.config['USERS_CACHE_TTL']
+
+    def get(self, id_usuario: int) -> UsuarioSesion:
+        with self.lock:
+            item = self.usuarios.get(id_usuario)
+            if item is not None and item[1] > time.monotonic():
+                self.usuarios.move_to_end(id_usuario)
+                self.hits += 1
+                return item[0]
+            if item is not None:
+                del self.usuarios[id_usuario]
+            self.misses += 1
+            return None
+
+    def set(self, usuario: UsuarioSesion) -> None:
+        with self.lock:
+            self.usuarios[usuario.id] = (usuario, time.monotonic() + self.ttl)
+            self.usuarios.move_to_end(usuario.id)
+            while len(self.usuarios) > self.size:
+                self.usuarios.popitem(last=False)
+
+    def invalidate(self, id_usuario: int) -> None:
+        with self.lock:
+            self.usuarios.pop(id_usuario, None)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits':self.hits,
+                'misses':self.misses,
+                'hit_rate':self.hits / total if total > 0 else 0,
+                'size':len(self.usuarios),
+                'max_size':self.size,
+                'ttl':self.ttl
+            }
+
+
+usuarios_cache = UsuariosCache()
+
+
+# ------------------------------ TOKENS DE API ------------------------------
+# Permisos que se pueden solicitar para un token
+# lectura: peticiones GET, escritura: demas metodos, administracion: endpoints de /admin
+API_SCOPES = ('lectura', 'escritura', 'administracion')
+
+
+def get_serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='api-token')
+
+
+def get_sello(password: str) -> str:
+    """
+    Sello de revocacion derivado del hash de la contraseña del usuario
+    """
+    return hashlib.sha256(password.encode()).hexdigest()[:16]
+
+
+def generar_token(usuario: UsuarioSesion, scopes: list) -> str:
+    return get_serializer().dumps({'id':usuario.id, 'username':usuario.username, 'scopes':scopes, 'sello':usuario.sello})
+
+
+def verificar_token(token: str, cargar_usuario) -> UsuarioSesion:
+    """
+    Verifica la firma y vigencia del token y que el usuario exista con la misma contraseña.
+    cargar_usuario(id) obtiene el usuario de la cache o de la base de datos.
+    """
+    try:
+        data = get_serializer().loads(token, max_age=current_app.config['API_TOKEN_TTL'])
+    except (BadSignature, SignatureExpired):
+        return None
+    usuario = cargar_usuario(data['id'])
+    if usuario is None or data.get('sello') is None or data['sello'] != usuario.sello:
+        return None
+    return UsuarioSesion(usuario.id, usuario.username, data['scopes'], usuario.sello)
+
+
+def get_scopes_requeridos() -> set:
+    scopes = {'lectura'} if request.method in ('GET', 'HEAD', 'OPTIONS') else {'escritura'}
+    if request.path.startswith('/api/admin/'):
+        scopes.add('administracion')
+    return scopes
+
+
+def verificar_scopes() -> None:
+    """
+    Rechaza las peticiones autenticadas con un token que no tiene los permisos del endpoint
+    """
+    scopes = getattr(current_user, 'scopes', None)
+    if not current_user.is_authenticated or scopes is None:
+        return
+    faltantes = get_scopes_requeridos() - set(scopes)
+    if len(faltantes) > 0:
+        abort(403, error='El token no tiene los permisos: ' + ', '.join(sorted(faltantes)))
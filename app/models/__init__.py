@@ -4,5 +4,7 @@ from .planillas import Planillas
 from .servicios import Servicios
 from .usuarios import Usuarios
 from .logs import Logs
-from .pagos_conexion import PagosConexion
-from .notificaciones import Notificaciones
\ No newline at end of file
+from .pagos_conexion import PagosConexion, CuotasConexion
+from .notificaciones import Notificaciones
+from .facturacion import FacturacionJobs, FacturacionLecturas
+from .resumen_cobros import ResumenCobrosDia, ResumenCobrosMes
\ No newline at end of file
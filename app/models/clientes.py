@@ -1,13 +1,37 @@
 from app.libs import db
+from sqlalchemy.orm import validates
+import unicodedata
 
 class Clientes(db.Model):
     __tablename__ = 'clientes'
+    __table_args__ = (
+        db.Index('ix_clientes_nombres_busqueda', 'nombres_busqueda'),
+        db.Index('ix_clientes_apellidos_busqueda', 'apellidos_busqueda'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     cedula = db.Column(db.String(10), nullable=False, unique=True)
     nombres = db.Column(db.String(50), nullable=False)
     apellidos = db.Column(db.String(50), nullable=False)
     telefono = db.Column(db.String(10), nullable=True)
+    # Nombres y apellidos en minusculas y sin tildes para las busquedas
+    nombres_busqueda = db.Column(db.String(50), nullable=False)
+    apellidos_busqueda = db.Column(db.String(50), nullable=False)
     servicios = db.relationship('Servicios', backref='cliente', cascade='all, delete-orphan', lazy=True)
 
     def __init__(self):
-        super().__init__()
\ No newline at end of file
+        super().__init__()
+
+    @validates('nombres', 'apellidos')
+    def validate_busqueda(self, key: str, value: str) -> str:
+        setattr(self, f'{key}_busqueda', self.normalizar(value))
+        return value
+
+    @classmethod
+    def normalizar(cls, texto: str) -> str:
+        """
+        Convierte el texto a minusculas y elimina las tildes para comparar sin distinguirlas
+        """
+        if texto is None:
+            return None
+        texto = unicodedata.normalize('NFKD', texto.strip().lower())
+        return ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
@@ -9,6 +9,7 @@ class Configuracion(db.Model):
     valor_consumo_base = db.Column(db.Float, nullable=False)
     valor_exedente = db.Column(db.Float, nullable=False)
     reconexion = db.Column(db.Float, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1') # Se incrementa con cada cambio
 
     def __init__(self):
         super().__init__()
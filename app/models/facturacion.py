@@ -0,0 +1,35 @@
+from app.libs import db
+from app.common.enums import facturacionEstados, lecturaEstados
+from datetime import datetime
+
+
+class FacturacionJobs(db.Model):
+    __tablename__ = 'facturacion_jobs'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id', onupdate='cascade', ondelete='cascade'), nullable=False)
+    fecha_creacion = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    fecha_fin = db.Column(db.DateTime, nullable=True)
+    fecha_emision = db.Column(db.DateTime, nullable=False, default=datetime.now) # Fecha de emision de todas las planillas del proceso
+    estado = db.Column(db.Enum(facturacionEstados), nullable=False, default=facturacionEstados.pendiente)
+    ejecutor = db.Column(db.String(32), nullable=True) # Identificador del hilo que ejecuta el proceso
+    fecha_actividad = db.Column(db.DateTime, nullable=True) # Ultimo lote procesado por el ejecutor
+    lecturas = db.relationship('FacturacionLecturas', backref='job', cascade='all, delete-orphan', lazy=True)
+
+    def __init__(self):
+        super().__init__()
+
+
+class FacturacionLecturas(db.Model):
+    __tablename__ = 'facturacion_lecturas'
+    __table_args__ = (
+        db.Index('ix_facturacion_lecturas_job_estado', 'id_job', 'estado'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    id_job = db.Column(db.Integer, db.ForeignKey('facturacion_jobs.id', onupdate='cascade', ondelete='cascade'), nullable=False)
+    id_servicio = db.Column(db.Integer, nullable=False)
+    lectura_actual = db.Column(db.Integer, nullable=True)
+    estado = db.Column(db.Enum(lecturaEstados), nullable=False, default=lecturaEstados.pendiente)
+    detalle = db.Column(db.String(250), nullable=True)
+
+    def __init__(self):
+        super().__init__()
@@ -5,6 +5,10 @@ from datetime import datetime
 
 class Logs(db.Model):
     __tablename__ = 'logs'
+    __table_args__ = (
+        db.Index('ix_logs_fecha', 'fecha', 'id'),
+        db.Index('ix_logs_categoria_fecha', 'categoria', 'fecha', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True, unique=True, nullable=False, autoincrement=True)
     categoria = db.Column(db.Enum(logsCategories), nullable=False)
     id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id', onupdate='cascade', ondelete='cascade'), nullable=False)
@@ -2,6 +2,9 @@ from app.libs import db
 
 class Notificaciones(db.Model):
     __tablename__ = 'notificaciones'
+    __table_args__ = (
+        db.Index('ix_notificaciones_servicio_pagado', 'id_servicio', 'pagado'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     total = db.Column(db.Float, nullable=False, default=3)
     fecha_emision = db.Column(db.DateTime, nullable=False)
@@ -5,18 +5,37 @@ from app.common.enums import conexionEnums
 
 class PagosConexion(db.Model):
     __tablename__ = 'pagos_conexion'
+    __table_args__ = (
+        db.Index('ix_pagos_conexion_fecha_emision', 'fecha_emision'),
+        db.Index('ix_pagos_conexion_tipo_fecha_emision', 'tipo', 'fecha_emision', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, nullable=False, unique=True)
     tipo = db.Column(db.Enum(conexionEnums), nullable=False)
     id_servicio = db.Column(db.Integer, ForeignKey('servicios.id', ondelete='cascade', onupdate='cascade'), nullable=False)
     fecha_emision = db.Column(db.DateTime, nullable=False)
     total = db.Column(db.Float, nullable=False)
     entrada = db.Column(db.Float, nullable=False)
-    cuota1 = db.Column(db.Float, nullable=False, default=0)
-    cuota2 = db.Column(db.Float, nullable=False, default=0)
-    cuota3 = db.Column(db.Float, nullable=False, default=0)
-    cuota4 = db.Column(db.Float, nullable=False, default=0)
-    cuota5 = db.Column(db.Float, nullable=False, default=0)
-    cuota6 = db.Column(db.Float, nullable=False, default=0)
+    # Las columnas cuota1..cuota6 se migran a cuotas_conexion con `flask pagos migrate-cuotas`
+    cuotas = db.relationship('CuotasConexion', backref='pago', uselist=True, cascade='all, delete-orphan', order_by='CuotasConexion.numero', lazy=True)
+
+    def __init__(self):
+        super().__init__()
+
+
+class CuotasConexion(db.Model):
+    __tablename__ = 'cuotas_conexion'
+    __table_args__ = (
+        db.Index('ux_cuotas_conexion_pago_numero', 'id_pago', 'numero', unique=True),
+        db.Index('ix_cuotas_conexion_fecha_pago', 'fecha_pago'),
+    )
+    # N° maximo de cuotas de un financiamiento
+    max_cuotas = 6
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    id_pago = db.Column(db.Integer, ForeignKey('pagos_conexion.id', ondelete='cascade', onupdate='cascade'), nullable=False)
+    numero = db.Column(db.Integer, nullable=False) # 1 - 6
+    valor = db.Column(db.Float, nullable=False) # Dinero
+    fecha_pago = db.Column(db.DateTime, nullable=False)
 
     def __init__(self):
         super().__init__()
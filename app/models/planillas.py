@@ -4,9 +4,15 @@ from datetime import datetime
 
 class Planillas(db.Model):
     __tablename__ = 'planillas'
+    __table_args__ = (
+        db.Index('ux_planillas_servicio_periodo', 'id_servicio', 'periodo', unique=True),
+        db.Index('ix_planillas_periodo', 'periodo'),
+        db.Index('ix_planillas_pagado_fecha_emision', 'pagado', 'fecha_emision'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     id_servicio = db.Column(db.Integer, db.ForeignKey('servicios.id', onupdate='CASCADE', ondelete='CASCADE'), nullable=False)
     fecha_emision = db.Column(db.DateTime, nullable=False, default=datetime.now())
+    periodo = db.Column(db.Integer, nullable=False) # Periodo de facturacion YYYYMM
     consumo_base = db.Column(db.Float, nullable=False)
     exedente = db.Column(db.Float, nullable=False)
     valor_consumo_base = db.Column(db.Float, nullable=False) # Dinero
@@ -18,4 +24,8 @@ class Planillas(db.Model):
     pagado = db.Column(db.Boolean, nullable=False, default=0)
 
     def __init__(self):
-        super().__init__()
\ No newline at end of file
+        super().__init__()
+
+    @classmethod
+    def get_periodo(cls, fecha: datetime) -> int:
+        return fecha.year*100 + fecha.month
@@ -0,0 +1,23 @@
+from app.libs import db
+
+
+class ResumenCobrosDia(db.Model):
+    __tablename__ = 'resumen_cobros_dia'
+    fecha = db.Column(db.Date, primary_key=True)
+    pagado = db.Column(db.Boolean, primary_key=True)
+    total = db.Column(db.Numeric(10, 2), nullable=False, default=0) # Dinero
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self):
+        super().__init__()
+
+
+class ResumenCobrosMes(db.Model):
+    __tablename__ = 'resumen_cobros_mes'
+    periodo = db.Column(db.Integer, primary_key=True) # YYYYMM
+    pagado = db.Column(db.Boolean, primary_key=True)
+    total = db.Column(db.Numeric(10, 2), nullable=False, default=0) # Dinero
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self):
+        super().__init__()
@@ -1,6 +1,8 @@
 from app.libs import db,login_manager
 from flask_login import UserMixin
 from werkzeug.security import check_password_hash,generate_password_hash
+from app.common.usuarios import UsuarioSesion, usuarios_cache, verificar_token, get_sello
+from app.common.seguridad import password_pool
 
 
 class Usuarios(db.Model, UserMixin):
@@ -15,13 +17,28 @@ class Usuarios(db.Model, UserMixin):
 
     @classmethod
     def check_password(self, hashed_password, password):
-        return check_password_hash(hashed_password,password)
+        return password_pool.run(check_password_hash, hashed_password, password)
 
     @classmethod
     def hash_password(self, password):
-        return generate_password_hash(password)
+        return password_pool.run(generate_password_hash, password)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return Usuarios.query.get(user_id)
+    usuario = usuarios_cache.get(int(user_id))
+    if usuario is not None:
+        return usuario
+    user = db.session.query(Usuarios.id, Usuarios.username, Usuarios.password).filter(Usuarios.id == int(user_id)).first()
+    if user is None:
+        return None
+    usuario = UsuarioSesion(user.id, user.username, sello=get_sello(user.password))
+    usuarios_cache.set(usuario)
+    return usuario
+
+@login_manager.request_loader
+def load_user_from_request(request):
+    authorization = request.headers.get('Authorization', '')
+    if not authorization.startswith('Bearer '):
+        return None
+    return verificar_token(authorization[len('Bearer '):].strip(), load_user)
 
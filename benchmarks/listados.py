@@ -0,0 +1,172 @@
+"""
+Compara en los listados de planillas y servicios la carga de objetos del ORM con la
+consulta de columnas usada por los endpoints de solo lectura. Muestra el tiempo de CPU
+y la memoria maxima (tracemalloc) por fila.
+
+Uso: python -m benchmarks.listados [N° de filas]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from sqlalchemy import insert
+from app import create_app
+from app.libs import db
+from app.models import Clientes, Servicios, Planillas
+
+
+class BenchmarkSettings():
+    SECRET_KEY = 'benchmark'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    LOGS_ASYNC = False
+    METRICS_ENABLED = False
+
+
+def crear_datos(cantidad: int) -> None:
+    db.session.execute(insert(Clientes), [
+        {
+            'cedula':'%010d' % i,
+            'nombres':f'Cliente {i}',
+            'apellidos':'Benchmark',
+            'telefono':'0999999999',
+            'nombres_busqueda':f'cliente {i}',
+            'apellidos_busqueda':'benchmark'
+        } for i in range(cantidad)
+    ])
+    db.session.execute(insert(Servicios), [
+        {
+            'n_conexion':i + 1,
+            'n_medidor':i + 1,
+            'id_cliente':i + 1,
+            'direccion':'Direccion',
+            'estado':True,
+            'lectura_anterior':0
+        } for i in range(cantidad)
+    ])
+    # Todas las planillas pertenecen al primer servicio, igual que el listado por servicio
+    db.session.execute(insert(Planillas), [
+        {
+            'id_servicio':1,
+            'fecha_emision':datetime(2026, 1, 1),
+            'periodo':100000 + i,
+            'consumo_base':10,
+            'exedente':1,
+            'valor_consumo_base':3,
+            'valor_exedente':0.5,
+            'lectura_anterior':i,
+            'lectura_actual':i + 12,
+            'consumo_total':12,
+            'valor_consumo_total':4,
+            'pagado':False
+        } for i in range(cantidad)
+    ])
+    db.session.commit()
+
+
+def planilla_dict(item) -> dict:
+    return {
+        'id':item.id,
+        'id_servicio':item.id_servicio,
+        'fecha_emision':datetime.strftime(item.fecha_emision, '%d/%m/%Y'),
+        'consumo_base':item.consumo_base,
+        'exedente':item.exedente,
+        'valor_consumo_base':item.valor_consumo_base,
+        'valor_exedente':item.valor_exedente,
+        'lectura_anterior':item.lectura_anterior,
+        'lectura_actual':item.lectura_actual,
+        'consumo_total':item.consumo_total,
+        'valor_consumo_total':item.valor_consumo_total,
+        'pagado':item.pagado
+    }
+
+
+def servicio_dict(item) -> dict:
+    return {
+        'id':item.id,
+        'n_conexion':item.n_conexion,
+        'n_medidor':item.n_medidor,
+        'id_cliente':item.id_cliente,
+        'direccion':item.direccion,
+        'estado':item.estado,
+        'lectura_anterior':item.lectura_anterior
+    }
+
+
+def planillas_orm() -> list:
+    return [planilla_dict(item) for item in db.session.query(Planillas).filter(Planillas.id_servicio == 1).order_by(Planillas.id.desc()).all()]
+
+
+def planillas_columnas() -> list:
+    return [planilla_dict(item) for item in db.session.query(
+        Planillas.id,
+        Planillas.id_servicio,
+        Planillas.fecha_emision,
+        Planillas.consumo_base,
+        Planillas.exedente,
+        Planillas.valor_consumo_base,
+        Planillas.valor_exedente,
+        Planillas.lectura_anterior,
+        Planillas.lectura_actual,
+        Planillas.consumo_total,
+        Planillas.valor_consumo_total,
+        Planillas.pagado
+    ).filter(Planillas.id_servicio == 1).order_by(Planillas.id.desc()).all()]
+
+
+def servicios_orm() -> list:
+    return [servicio_dict(item) for item in db.session.query(Servicios).order_by(Servicios.id).all()]
+
+
+def servicios_columnas() -> list:
+    return [servicio_dict(item) for item in db.session.query(
+        Servicios.id,
+        Servicios.n_conexion,
+        Servicios.n_medidor,
+        Servicios.id_cliente,
+        Servicios.direccion,
+        Servicios.estado,
+        Servicios.lectura_anterior
+    ).order_by(Servicios.id).all()]
+
+
+def medir(listado, cantidad: int, repeticiones: int = 5) -> tuple:
+    """
+    Devuelve el mejor tiempo de CPU y la memoria maxima por fila de un listado
+    """
+    tiempos = []
+    for i in range(repeticiones):
+        # Sesion nueva en cada ejecucion, igual que en cada peticion
+        db.session.remove()
+        inicio = time.process_time()
+        listado()
+        tiempos.append(time.process_time() - inicio)
+    db.session.remove()
+    tracemalloc.start()
+    listado()
+    memoria = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.session.remove()
+    return min(tiempos)/cantidad*1000000, memoria/cantidad
+
+
+def main(cantidad: int) -> None:
+    app = create_app(BenchmarkSettings)
+    with app.app_context():
+        db.create_all()
+        crear_datos(cantidad)
+        print(f'Filas por listado: {cantidad}')
+        for nombre, orm, columnas in [
+            ('planillas', planillas_orm, planillas_columnas),
+            ('servicios', servicios_orm, servicios_columnas)
+        ]:
+            assert orm() == columnas()
+            cpu_orm, memoria_orm = medir(orm, cantidad)
+            cpu_columnas, memoria_columnas = medir(columnas, cantidad)
+            print(f'{nombre}:')
+            print(f'  ORM:      {cpu_orm:.2f} us/fila, {memoria_orm:.0f} bytes/fila')
+            print(f'  Columnas: {cpu_columnas:.2f} us/fila, {memoria_columnas:.0f} bytes/fila')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,33 @@
+"""
+Compara el calculo de valores de planillas por lote (Tarifa.calcular_lote) con el calculo
+por fila con la formula original de Tarifa.calcular (acceso a atributos y condicion por fila).
+
+Uso: python -m benchmarks.tarifas [N° de consumos]
+"""
+import random
+import sys
+import timeit
+from app.common.tarifas import Tarifa
+
+
+def calcular_por_fila(tarifa: Tarifa, consumo_total: int) -> float:
+    valor_consumo_total = tarifa.valor_consumo_base
+    if consumo_total > tarifa.consumo_base:
+        valor_consumo_total += ((consumo_total-tarifa.consumo_base)/tarifa.exedente)*tarifa.valor_exedente
+    return valor_consumo_total
+
+
+def main(cantidad: int) -> None:
+    tarifa = Tarifa(10, 1, 3, 0.5)
+    consumos = [random.randint(0, 60) for i in range(cantidad)]
+    assert tarifa.calcular_lote(consumos) == [calcular_por_fila(tarifa, consumo) for consumo in consumos]
+    repeticiones = 20
+    por_fila = min(timeit.repeat(lambda: [calcular_por_fila(tarifa, consumo) for consumo in consumos], number=repeticiones, repeat=5))
+    por_lote = min(timeit.repeat(lambda: tarifa.calcular_lote(consumos), number=repeticiones, repeat=5))
+    print(f'Consumos: {cantidad}')
+    print(f'Por fila: {por_fila/repeticiones*1000:.3f} ms')
+    print(f'Por lote: {por_lote/repeticiones*1000:.3f} ms ({por_fila/por_lote:.2f}x)')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -11,4 +11,44 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 SQLALCHEMY_POOL_SIZE = 20
 SQLALCHEMY_MAX_OVERFLOW = 5
 SQLALCHEMY_POOL_TIMEOUT = 300
-SQLALCHEMY_POOL_RECYCLE = 280
\ No newline at end of file
+SQLALCHEMY_POOL_RECYCLE = 280
+# USERS CACHE CONFIGURATION
+USERS_CACHE_SIZE = 256
+USERS_CACHE_TTL = 60 # segundos
+# API TOKENS CONFIGURATION
+API_TOKEN_TTL = 3600 # segundos
+# PASSWORDS CONFIGURATION
+PASSWORD_POOL_WORKERS = 2
+PASSWORD_POOL_QUEUE = 8
+PASSWORD_POOL_TIMEOUT = 10 # segundos
+# N° de proxies inversos de confianza delante de la aplicacion (X-Forwarded-For)
+PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+# Intentos fallidos de inicio de sesion permitidos por periodo (segundos)
+# LOGIN_FALLOS_USUARIO se aplica por usuario desde cada IP
+LOGIN_FALLOS_USUARIO = 5
+LOGIN_FALLOS_IP = 20
+LOGIN_FALLOS_PERIODO = 300
+# FACTURACION CONFIGURATION
+# Segundos sin actividad tras los cuales un proceso en ejecucion se considera interrumpido
+FACTURACION_JOB_TIMEOUT = 600
+# STATS CONFIGURATION
+# N° maximo de años del rango de las estadisticas de cobros por conexion
+STATS_MAX_ANIOS = 10
+# NOTIFICACIONES CONFIGURATION
+NOTIFICACIONES_DIAS_VENCIMIENTO = 30
+NOTIFICACIONES_PURGE_BATCH_SIZE = 1000
+# METRICS CONFIGURATION
+METRICS_ENABLED = True
+METRICS_SLOW_QUERY = 0.5 # segundos
+# LOGS CONFIGURATION
+LOGS_ASYNC = os.getenv('LOGS_ASYNC', 'True') == 'True'
+LOGS_BATCH_SIZE = 100
+LOGS_FLUSH_INTERVAL = 2.0
+LOGS_QUEUE_SIZE = 10000
+LOGS_QUEUE_TIMEOUT = 5.0
+# Dias de retencion de logs por categoria. Ej: {'login': 30}
+LOGS_RETENTION_DEFAULT = 61
+LOGS_RETENTION = {}
+LOGS_PURGE_BATCH_SIZE = 1000
+# Directorio de los archivos de logs archivados
+LOGS_ARCHIVE_DIR = os.getenv('LOGS_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance', 'logs_archive'))
\ No newline at end of file
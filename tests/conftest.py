@@ -0,0 +1,100 @@
+import pytest
+from flask import g
+from sqlalchemy import event
+from app import create_app
+from app.libs import db
+from app.models import Usuarios, Clientes, Servicios, Configuracion
+from app.common.usuarios import usuarios_cache
+
+
+class TestSettings():
+    TESTING = True
+    SECRET_KEY = 'test'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    LOGS_ASYNC = False
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app(TestSettings)
+
+    @app.before_request
+    def limpiar_usuario():
+        # Las peticiones de las pruebas comparten el contexto de la aplicacion del fixture session,
+        # el usuario autenticado se vuelve a cargar en cada peticion
+        g.pop('_login_user', None)
+
+    yield app
+
+
+@pytest.fixture
+def session(app):
+    with app.app_context():
+        db.create_all()
+        usuario = Usuarios()
+        usuario.username = 'admin'
+        usuario.password = Usuarios.hash_password('admin')
+        db.session.add(usuario)
+        configuracion = Configuracion()
+        configuracion.consumo_base = 10
+        configuracion.exedente = 1
+        configuracion.valor_consumo_base = 3
+        configuracion.valor_exedente = 0.5
+        configuracion.reconexion = 20
+        db.session.add(configuracion)
+        db.session.commit()
+        yield db.session
+        db.session.remove()
+        db.drop_all()
+        # Los ids de los usuarios se reutilizan en la siguiente base de datos
+        usuarios_cache.usuarios.clear()
+
+
+@pytest.fixture
+def client(app, session):
+    client = app.test_client()
+    response = client.post('/api/auth/sign_in', json={'username':'admin', 'password':'admin'})
+    assert response.status_code == 200
+    return client
+
+
+@pytest.fixture
+def contar_consultas(app):
+    """
+    Devuelve una funcion que ejecuta una peticion y retorna la respuesta y las sentencias SQL ejecutadas
+    """
+    def contar(peticion):
+        sentencias = []
+        def registrar(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', registrar)
+        try:
+            response = peticion()
+            response.get_data()
+        finally:
+            event.remove(engine, 'before_cursor_execute', registrar)
+        return response, sentencias
+    return contar
+
+
+def crear_servicios(session, cantidad: int, inicio: int = 0) -> None:
+    for i in range(inicio, inicio + cantidad):
+        cliente = Clientes()
+        cliente.cedula = '%010d' % i
+        cliente.nombres = f'Cliente {i}'
+        cliente.apellidos = 'Prueba'
+        cliente.telefono = '0999999999'
+        session.add(cliente)
+        session.flush()
+        servicio = Servicios()
+        servicio.n_conexion = i + 1
+        servicio.n_medidor = i + 1
+        servicio.id_cliente = cliente.id
+        servicio.direccion = 'Direccion'
+        servicio.estado = True
+        servicio.lectura_anterior = 0
+        session.add(servicio)
+    session.commit()
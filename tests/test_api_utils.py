@@ -0,0 +1,37 @@
+import json
+import pytest
+from app.models import Clientes
+from app.common.api_utils import stream_success
+from tests.conftest import crear_servicios
+
+
+def proyeccion_con_error(id_error: int):
+    def proyeccion(item):
+        if item.id == id_error:
+            raise Exception('Error de proyeccion')
+        return {'id':item.id}
+    return proyeccion
+
+
+def test_stream_success_completo(app, session):
+    crear_servicios(session, 5)
+    with app.test_request_context():
+        response = stream_success(session.query(Clientes.id).order_by(Clientes.id), lambda item: {'id':item.id}, tamano_lote=2, siguiente=None)
+        data = json.loads(response.get_data())
+    assert data == {'success':[{'id':i} for i in range(1, 6)], 'siguiente':None}
+
+
+def test_stream_success_error_en_el_primer_lote(app, session):
+    crear_servicios(session, 5)
+    with app.test_request_context():
+        with pytest.raises(Exception):
+            stream_success(session.query(Clientes.id).order_by(Clientes.id), proyeccion_con_error(2), tamano_lote=2)
+
+
+def test_stream_success_error_despues_del_primer_lote(app, session):
+    crear_servicios(session, 5)
+    with app.test_request_context():
+        response = stream_success(session.query(Clientes.id).order_by(Clientes.id), proyeccion_con_error(4), tamano_lote=2, siguiente=None)
+        data = json.loads(response.get_data())
+    assert data['success'] == [{'id':1}, {'id':2}]
+    assert 'error' in data and 'siguiente' not in data
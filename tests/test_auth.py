@@ -0,0 +1,49 @@
+from app.common.seguridad import login_throttle
+
+
+def test_fallos_de_otra_ip_no_bloquean_al_usuario(app, client):
+    try:
+        for i in range(app.config['LOGIN_FALLOS_USUARIO']):
+            response = client.post('/api/auth/sign_in', json={'username':'admin', 'password':'x'}, environ_base={'REMOTE_ADDR':'10.0.0.1'})
+            assert response.status_code == 400
+        response = client.post('/api/auth/sign_in', json={'username':'admin', 'password':'x'}, environ_base={'REMOTE_ADDR':'10.0.0.1'})
+        assert response.status_code == 429
+        response = client.post('/api/auth/sign_in', json={'username':'admin', 'password':'admin'}, environ_base={'REMOTE_ADDR':'10.0.0.2'})
+        assert response.status_code == 200
+    finally:
+        login_throttle.usuarios.buckets.clear()
+        login_throttle.ips.buckets.clear()
+
+
+def get_token(client, scopes=None) -> str:
+    data = {'username':'admin', 'password':'admin'}
+    if scopes is not None:
+        data['scopes'] = scopes
+    response = client.post('/api/auth/token', json=data)
+    assert response.status_code == 200
+    return response.get_json()['token']
+
+
+def test_token_aplica_sus_permisos(app, session):
+    client = app.test_client()
+    token = get_token(client)
+    headers = {'Authorization':f'Bearer {token}'}
+    assert client.get('/api/clientes/get/all', headers=headers).status_code == 200
+    assert client.post('/api/notificaciones/new/vencidas', json={}, headers=headers).status_code == 403
+    token = get_token(client, ['lectura', 'escritura'])
+    headers = {'Authorization':f'Bearer {token}'}
+    assert client.post('/api/notificaciones/new/vencidas', json={}, headers=headers).status_code == 201
+    assert client.post('/api/auth/token', json={'username':'admin', 'password':'admin', 'scopes':['*']}).status_code == 400
+
+
+def test_token_revocado_al_cambiar_la_contraseña(app, session):
+    from app.models import Usuarios
+    from app.common.usuarios import usuarios_cache
+    client = app.test_client()
+    headers = {'Authorization':f'Bearer {get_token(client)}'}
+    assert client.get('/api/clientes/get/all', headers=headers).status_code == 200
+    usuario = session.query(Usuarios).filter_by(username='admin').first()
+    usuario.password = Usuarios.hash_password('nueva')
+    session.commit()
+    usuarios_cache.invalidate(usuario.id)
+    assert client.get('/api/clientes/get/all', headers=headers).status_code == 401
@@ -0,0 +1,44 @@
+from datetime import datetime
+from app.models import Planillas, ResumenCobrosDia, ResumenCobrosMes
+from app.common.cobros import ResumenCobrosServices
+from tests.conftest import crear_servicios
+
+
+def resumen(session) -> tuple:
+    dia = sorted((item.fecha, item.pagado, item.total, item.cantidad) for item in session.query(ResumenCobrosDia).all())
+    mes = sorted((item.periodo, item.pagado, item.total, item.cantidad) for item in session.query(ResumenCobrosMes).all())
+    return dia, mes
+
+
+def test_quitar_servicios_coincide_con_rebuild(session):
+    crear_servicios(session, 2)
+    fecha_emision = datetime(2026, 10, 18, 10, 0)
+    planillas = []
+    for id_servicio, valor in [(1, 3.3333), (2, 4.4444)]:
+        planilla = {
+            'id_servicio':id_servicio,
+            'fecha_emision':fecha_emision,
+            'periodo':Planillas.get_periodo(fecha_emision),
+            'consumo_base':10,
+            'exedente':1,
+            'valor_consumo_base':3,
+            'valor_exedente':0.5,
+            'lectura_anterior':0,
+            'lectura_actual':10,
+            'consumo_total':10,
+            'valor_consumo_total':valor,
+            'pagado':id_servicio == 1
+        }
+        planillas.append(planilla)
+    session.execute(Planillas.__table__.insert(), planillas)
+    resumen_cobros = ResumenCobrosServices(session)
+    resumen_cobros.registrar_planillas(planillas)
+    session.commit()
+    # Eliminar un servicio del resumen y de las planillas
+    resumen_cobros.quitar_servicios([1])
+    session.query(Planillas).filter(Planillas.id_servicio == 1).delete()
+    session.commit()
+    incremental = resumen(session)
+    resumen_cobros.rebuild()
+    assert incremental == resumen(session)
+    assert len(incremental[0]) == 1
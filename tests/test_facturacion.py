@@ -0,0 +1,61 @@
+from datetime import datetime
+from app.models import Planillas, FacturacionJobs, FacturacionLecturas
+from app.common.facturacion import FacturacionServices
+from app.common.enums import facturacionEstados, lecturaEstados
+from tests.conftest import crear_servicios
+
+
+def nuevo_job(session, cantidad: int) -> FacturacionJobs:
+    crear_servicios(session, cantidad)
+    lecturas = [{'id_servicio':i, 'lectura_actual':10} for i in range(1, cantidad+1)]
+    return FacturacionServices(session).new_job(lecturas, 1)
+
+
+def test_job_se_ejecuta_una_sola_vez(session):
+    job = nuevo_job(session, 3)
+    facturacion = FacturacionServices(session)
+    ejecutor = facturacion.reclamar_job(job.id)
+    assert ejecutor is not None
+    # Un segundo ejecutor no puede reclamar ni procesar el proceso en ejecucion
+    assert facturacion.reclamar_job(job.id) is None
+    assert facturacion.procesar_job(job.id) is False
+    assert facturacion.get_jobs_pendientes() == []
+    assert session.query(Planillas).count() == 0
+
+
+def test_job_interrumpido_se_reanuda(app, session):
+    job = nuevo_job(session, 3)
+    facturacion = FacturacionServices(session)
+    assert facturacion.reclamar_job(job.id) is not None
+    app.config['FACTURACION_JOB_TIMEOUT'] = 0
+    try:
+        assert facturacion.get_jobs_pendientes() == [job.id]
+        assert facturacion.procesar_job(job.id) is True
+    finally:
+        app.config.pop('FACTURACION_JOB_TIMEOUT')
+    assert session.query(Planillas).count() == 3
+
+
+def test_job_usa_la_fecha_de_emision_del_proceso(session):
+    job = nuevo_job(session, 3)
+    fecha_emision = datetime(2026, 1, 31, 23, 59)
+    session.get(FacturacionJobs, job.id).fecha_emision = fecha_emision
+    session.commit()
+    FacturacionServices(session).procesar_job(job.id)
+    planillas = session.query(Planillas.fecha_emision, Planillas.periodo).all()
+    assert len(planillas) == 3
+    assert all(item.fecha_emision == fecha_emision and item.periodo == 202601 for item in planillas)
+
+
+def test_error_en_lote_marca_fallida_solo_la_lectura(session, monkeypatch):
+    job = nuevo_job(session, 3)
+    registrar_planillas = FacturacionServices.registrar_planillas
+    def registrar_con_error(self, lecturas, tarifa, fecha_emision):
+        if any(item['id_servicio'] == 2 for item in lecturas):
+            raise Exception('Error de la DB')
+        return registrar_planillas(self, lecturas, tarifa, fecha_emision)
+    monkeypatch.setattr(FacturacionServices, 'registrar_planillas', registrar_con_error)
+    assert FacturacionServices(session).procesar_job(job.id) is True
+    estados = dict(session.query(FacturacionLecturas.id_servicio, FacturacionLecturas.estado).all())
+    assert estados == {1:lecturaEstados.registrada, 2:lecturaEstados.fallida, 3:lecturaEstados.registrada}
+    assert session.get(FacturacionJobs, job.id).estado == facturacionEstados.finalizado
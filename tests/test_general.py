@@ -0,0 +1,6 @@
+def test_stats_cobros_conexion_limita_el_rango(client):
+    response = client.get('/api/general/get/stats/cobros/conexion?desde=2000-01-01&hasta=2026-12-31')
+    assert response.status_code == 400
+    response = client.get('/api/general/get/stats/cobros/conexion?desde=2025-01-01&hasta=2026-12-31')
+    assert response.status_code == 200
+    assert sorted(response.get_json()['success']['anios']) == ['2025', '2026']
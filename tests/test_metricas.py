@@ -0,0 +1,19 @@
+import logging
+import os
+
+
+def test_metricas_por_proceso_sin_parametros_en_el_log(app, client, caplog):
+    app.config['METRICS_SLOW_QUERY'] = 0
+    try:
+        with caplog.at_level(logging.WARNING, logger=app.logger.name):
+            response = client.get('/api/clientes/get/all', buffered=True)
+            assert response.status_code == 200
+    finally:
+        app.config['METRICS_SLOW_QUERY'] = 0.5
+    lentas = [item for item in caplog.records if item.getMessage().startswith('Consulta lenta')]
+    assert len(lentas) > 0
+    # Solo la duracion y la sentencia, sin los parametros de la consulta
+    assert all(len(item.args) == 2 for item in lentas)
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert f'endpoint="/api/clientes/get/all",pid="{os.getpid()}"' in response.get_data(as_text=True)
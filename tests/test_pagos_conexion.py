@@ -0,0 +1,26 @@
+from datetime import datetime
+from app.models import PagosConexion
+from app.common.enums import conexionEnums
+from tests.conftest import crear_servicios
+
+
+def test_cuotas_solo_se_consultan_en_los_financiamientos(client, session, contar_consultas):
+    crear_servicios(session, 2)
+    for id_servicio, tipo in [(1, conexionEnums.contado), (2, conexionEnums.financiamiento)]:
+        pago = PagosConexion()
+        pago.tipo = tipo
+        pago.id_servicio = id_servicio
+        pago.fecha_emision = datetime(2026, 1, id_servicio)
+        pago.total = 100
+        pago.entrada = 40
+        session.add(pago)
+    session.commit()
+    for url, consultas_cuotas in [
+        ('/api/pagos/contado/get/all?limite=10', 0),
+        ('/api/pagos/contado/get/all', 0),
+        ('/api/pagos/financiamiento/get/all?limite=10', 1)
+    ]:
+        response, sentencias = contar_consultas(lambda: client.get(url))
+        assert response.status_code == 200
+        assert len(response.get_json()['success']) == 1
+        assert len([item for item in sentencias if 'FROM cuotas_conexion' in item]) == consultas_cuotas
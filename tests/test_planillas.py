@@ -0,0 +1,19 @@
+from app.common.facturacion import FacturacionServices
+from tests.conftest import crear_servicios
+
+
+def test_lote_con_error_de_la_db_falla_solo_la_lectura(client, session, monkeypatch):
+    crear_servicios(session, 3)
+    registrar_planillas = FacturacionServices.registrar_planillas
+    def registrar_con_error(self, lecturas, tarifa, fecha_emision):
+        if any(item['id_servicio'] == 2 for item in lecturas):
+            raise Exception('Error de la DB')
+        return registrar_planillas(self, lecturas, tarifa, fecha_emision)
+    monkeypatch.setattr(FacturacionServices, 'registrar_planillas', registrar_con_error)
+    response = client.post('/api/planillas/new/lote', json={
+        'lecturas':[{'id_servicio':i, 'lectura_actual':10} for i in range(1, 4)]
+    })
+    assert response.status_code == 200
+    data = response.get_json()['success']
+    assert data['registradas'] == 2 and data['fallidas'] == 1
+    assert [item['id_servicio'] for item in data['resultados'] if item['error'] is not None] == [2]
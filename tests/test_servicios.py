@@ -0,0 +1,19 @@
+from tests.conftest import crear_servicios
+
+
+def test_get_all_servicios_consultas_fijas(client, session, contar_consultas):
+    """
+    GET /servicios/get/all ejecuta el mismo N° de sentencias con 1 y con 50 servicios
+    """
+    crear_servicios(session, 1)
+    # Cargar el usuario de la sesion en la cache antes de contar las sentencias
+    client.get('/api/servicios/get/all').get_data()
+    response, sentencias_uno = contar_consultas(lambda: client.get('/api/servicios/get/all'))
+    assert response.status_code == 200
+    assert len(response.get_json()['success']) == 1
+
+    crear_servicios(session, 49, inicio=1)
+    response, sentencias_cincuenta = contar_consultas(lambda: client.get('/api/servicios/get/all'))
+    assert response.status_code == 200
+    assert len(response.get_json()['success']) == 50
+    assert len(sentencias_cincuenta) == len(sentencias_uno)
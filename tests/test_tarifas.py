@@ -0,0 +1,9 @@
+from app.common.tarifas import Tarifa
+
+
+def test_calcular_lote_igual_a_calcular():
+    tarifa = Tarifa(10, 2, 3, 0.5)
+    consumos = [0, 9, 10, 11, 12, 25, 100]
+    assert tarifa.calcular_lote(consumos) == [tarifa.calcular(consumo) for consumo in consumos]
+    assert tarifa.calcular(10) == 3
+    assert tarifa.calcular(14) == 4